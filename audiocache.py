@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CACHE_DIR = "tts_cache"
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # ~25 minutes of 22 kHz speech
+FRAGMENT_GAP_MS = 60                 # Pause stitched between templated fragments
+
+# Numbers are the only variable slots in the templated replies (time, date, temperature, minutes)
+NUMBER_SLOT = re.compile(r'\s*(\d+)\s*')
+
+def voice_fingerprint(model_path, config):
+    """Identifies the voice: model file identity plus the exact synthesis config."""
+    try:
+        st = os.stat(model_path)
+        model_id = f"{os.path.basename(model_path)}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        model_id = os.path.basename(model_path)
+    blob = model_id + json.dumps(config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def split_fragments(sentence):
+    """'अभी समय 3 बजकर 45 मिनट...' -> ['अभी समय', '3', 'बजकर', '45', 'मिनट...']"""
+    return [part for part in NUMBER_SLOT.split(sentence) if part.strip()]
+
+# ==========================================
+# CONTENT-ADDRESSED PCM CACHE (DISK + LRU)
+# ==========================================
+class PCMCache:
+    """Rendered PCM keyed by sha1(voice fingerprint + text), one file per entry.
+
+    Lives on disk so it survives restarts; file mtimes carry the LRU order
+    between runs and the total size is capped at max_bytes. Hits, misses and
+    the size on disk go to `stats` (pcm_cache_* in the metrics textfile).
+    """
+
+    def __init__(self, fingerprint, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, stats=STATS):
+        self.fingerprint = fingerprint
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+        self.stats.gauge("pcm_cache_bytes", self.total_bytes)
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pcm"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                files.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.fingerprint}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def get(self, text):
+        key = self.key(text)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                self.stats.incr("pcm_cache_misses")
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                pcm = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            self.stats.incr("pcm_cache_misses")
+            return None
+        with self.lock:
+            self.hits += 1
+        self.stats.incr("pcm_cache_hits")
+        return pcm
+
+    def put(self, text, pcm):
+        key = self.key(text)
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp_path, self._path(key))
+
+        with self.lock:
+            self.total_bytes += len(pcm) - self.entries.pop(key, 0)
+            self.entries[key] = len(pcm)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+            total_bytes = self.total_bytes
+        self.stats.gauge("pcm_cache_bytes", total_bytes)
+
+    def __contains__(self, text):
+        return self.key(text) in self.entries
+
+# ==========================================
+# CACHE-FRONTED VOICE
+# ==========================================
+class CachedVoice:
+    """Same submit() interface as PiperEngine, but checks the PCM cache first.
+
+    Sentences with numbers are assembled from cached fragments so every
+    possible time or temperature doesn't need its own rendered copy.
+    """
+
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.sample_rate = engine.sample_rate
+        self.cache = cache or PCMCache(voice_fingerprint(engine.model_path, engine.config))
+        gap_samples = self.sample_rate * FRAGMENT_GAP_MS // 1000
+        self.gap = b"\x00\x00" * gap_samples
+
+    def _fetch(self, text):
+        """Future for one cacheable unit: served from disk or rendered and stored."""
+        pcm = self.cache.get(text)
+        if pcm is not None:
+            future = Future()
+            future.set_result(pcm)
+            return future
+
+        future = self.engine.submit(text)
+
+        def store(done):
+            if done.exception() is None and done.result():
+                self.cache.put(text, done.result())
+        future.add_done_callback(store)
+        return future
+
+    def submit(self, text):
+        fragments = split_fragments(text)
+        if len(fragments) <= 1:
+            return self._fetch(text)
+
+        parts = [self._fetch(fragment) for fragment in fragments]
+        result = Future()
+        remaining = [len(parts)]
+        lock = threading.Lock()
+
+        def assemble(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                result.set_result(self.gap.join(part.result() for part in parts))
+            except Exception as e:
+                result.set_exception(e)
+
+        for part in parts:
+            part.add_done_callback(assemble)
+        return result
+
+    def synthesize(self, text):
+        return self.submit(text).result()
+
+    def prewarm(self, phrases):
+        """Renders every phrase (or its fragments) not already on disk. Returns how many were new."""
+        units = []
+        for phrase in phrases:
+            fragments = split_fragments(phrase)
+            units.extend(fragments if len(fragments) > 1 else [phrase])
+        missing = [unit for unit in dict.fromkeys(units) if unit not in self.cache]
+        for future in [self._fetch(unit) for unit in missing]:
+            future.result()
+        return len(missing)
@@ -0,0 +1,823 @@
+import os
+import sys
+import time
+import tempfile
+import statistics
+import subprocess
+from contextlib import contextmanager
+
+# ==========================================
+# OFFLINE PERFORMANCE BENCHMARKS
+# Usage: python benchmark.py <name> [args...]
+# ==========================================
+def report(label, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(f"{label:<36} n={len(samples_ms):<5} "
+          f"mean={statistics.mean(samples_ms):8.2f} ms  "
+          f"p50={statistics.median(samples_ms):8.2f} ms  p95={p95:8.2f} ms")
+
+# ==========================================
+# TTS: PIPER SUBPROCESS VS RESIDENT ENGINE
+# ==========================================
+TTS_PHRASES = [
+    "हाँ क्वार्क, बताइये?",
+    "ठीक है, बत्ती चालू कर दी गई है।",
+    "अभी समय 3 बजकर 45 मिनट हो रहा है।",
+]
+
+def bench_tts(rounds="5"):
+    import tts
+    rounds = int(rounds)
+    out_file = os.path.join(tempfile.gettempdir(), "bench_response.wav")
+
+    # 1. Current path: one fresh piper process (and model load) per reply
+    cold = []
+    for _ in range(rounds):
+        for text in TTS_PHRASES:
+            start = time.perf_counter()
+            subprocess.run(
+                [tts.PIPER_EXE, "-m", tts.PIPER_MODEL, "--output_file", out_file],
+                input=text.encode("utf-8"),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True
+            )
+            cold.append((time.perf_counter() - start) * 1000)
+
+    # 2. Resident engine: first call pays the model load, the rest are warm
+    start = time.perf_counter()
+    engine = tts.PiperEngine().start()
+    engine.synthesize(TTS_PHRASES[0])
+    first = (time.perf_counter() - start) * 1000
+
+    warm = []
+    for _ in range(rounds):
+        for text in TTS_PHRASES:
+            start = time.perf_counter()
+            engine.synthesize(text)
+            warm.append((time.perf_counter() - start) * 1000)
+    engine.close()
+
+    report("subprocess per reply (cold)", cold)
+    report("resident engine first call", [first])
+    report("resident engine (warm)", warm)
+    print(f"speedup (p50): {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+# ==========================================
+# TTS: WHOLE-REPLY VS SENTENCE STREAMING
+# ==========================================
+STREAM_REPLY = ("ठीक है, बत्ती चालू कर दी गई है। ठीक है, पंखा चालू कर दिया गया है। "
+                "अभी कमरे का तापमान 26 डिग्री सेल्सियस है।")
+
+class RealtimeSink:
+    """Stands in for the speaker: 'plays' PCM by sleeping for its duration."""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def write(self, pcm):
+        time.sleep(len(pcm) / 2 / self.sample_rate)
+
+    def drain(self):
+        pass
+
+def bench_stream(rounds="5"):
+    import tts
+    engine = tts.PiperEngine().start()
+    sink = RealtimeSink(engine.sample_rate)
+    engine.synthesize(STREAM_REPLY)
+
+    whole_first, whole_total, stream_first, stream_total = [], [], [], []
+    for _ in range(int(rounds)):
+        start = time.perf_counter()
+        pcm = engine.synthesize(STREAM_REPLY)
+        whole_first.append((time.perf_counter() - start) * 1000)
+        sink.write(pcm)
+        whole_total.append((time.perf_counter() - start) * 1000)
+
+        stats = tts.speak(STREAM_REPLY, voice=engine, output=sink)
+        stream_first.append(stats["first_audio_ms"])
+        stream_total.append(stats["total_ms"])
+    engine.close()
+
+    report("whole reply: first audio", whole_first)
+    report("whole reply: total", whole_total)
+    report("streaming: first audio", stream_first)
+    report("streaming: total", stream_total)
+
+# ==========================================
+# MEMORY: FLAT JSON VS INDEXED EVENT STORE
+# ==========================================
+def _legacy_events(count):
+    from datetime import datetime, timedelta
+    base = datetime.now() - timedelta(days=365)
+    events = []
+    for i in range(count):
+        events.append({
+            "type": "alarm",
+            "trigger_time": (base + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "message": "आपका अलार्म का समय हो गया है।",
+            "status": "done" if i < count - 100 else "pending"
+        })
+    return events
+
+def bench_memory(count="100000"):
+    import json
+    import threading
+    from datetime import datetime, timedelta
+    from eventstore import EventStore, Scheduler
+    count = int(count)
+    work_dir = tempfile.mkdtemp(prefix="bench_memory_")
+    json_path = os.path.join(work_dir, "memory.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(_legacy_events(count), f, ensure_ascii=False, indent=4)
+
+    # 1. Old path: the daemon tick (every 10 s) and one save_event
+    tick, insert = [], []
+    for _ in range(3):
+        start = time.perf_counter()
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        now = datetime.now()
+        for event in data:
+            if event["status"] == "pending":
+                datetime.strptime(event["trigger_time"], "%Y-%m-%d %H:%M:%S") <= now
+        tick.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.append({"type": "alarm", "trigger_time": now.strftime("%Y-%m-%d %H:%M:%S"),
+                     "message": "x", "status": "pending"})
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        insert.append((time.perf_counter() - start) * 1000)
+
+    # 2. New path: migrate, then fill with the same number of *pending* rows (worst case)
+    store = EventStore(os.path.join(work_dir, "memory.db"))
+    start = time.perf_counter()
+    migrated = store.migrate_json(json_path)
+    migrate_ms = (time.perf_counter() - start) * 1000
+
+    future = datetime.now() + timedelta(days=30)
+    store.db.execute("BEGIN")
+    store.db.executemany("INSERT INTO events (type, trigger_ts, message) VALUES (?, ?, ?)",
+                         [("alarm", future.timestamp() + i, "x") for i in range(count)])
+    store.db.execute("COMMIT")
+
+    fired = threading.Event()
+    fired_at = []
+    def on_fire(message):
+        fired_at.append(time.time())
+        fired.set()
+
+    scheduler = Scheduler(store, on_fire)
+    start = time.perf_counter()
+    scheduler.start()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # The migrated events are long overdue and fire straight away
+    while len(fired_at) < migrated:
+        time.sleep(0.01)
+
+    new_insert, lateness = [], []
+    for _ in range(20):
+        fired.clear()
+        trigger_time = datetime.now() + timedelta(seconds=0.05)
+        start = time.perf_counter()
+        scheduler.schedule("alarm", trigger_time, "x")
+        new_insert.append((time.perf_counter() - start) * 1000)
+        fired.wait(5)
+        lateness.append((fired_at[-1] - trigger_time.timestamp()) * 1000)
+    scheduler.stop()
+    store.close()
+
+    print(f"{count} historic events, {migrated} pending migrated in {migrate_ms:.1f} ms")
+    report("json: daemon tick", tick)
+    report("json: save_event", insert)
+    report("store: scheduler start (heap load)", [load_ms])
+    report("store: schedule()", new_insert)
+    report("store: fire lateness", lateness)
+
+# ==========================================
+# INTENTS: PER-INTENT LOOP VS FLAT PHRASE INDEX
+# ==========================================
+INTENT_QUERIES = ["बत्ती जलाओ", "पंखा बंद कर दो", "अभी टाइम क्या हो रहा है",
+                  "आवाज़ थोड़ी कम करो", "कल सुबह मीटिंग याद दिलाना"]
+
+FILLER_WORDS = ["जी", "ज़रा", "प्लीज", "अभी", "भाई", "जल्दी", "तुरंत", "थोड़ा", "यार", "ना",
+                "कमरे", "की", "का", "में", "वाली", "सारी", "पूरी", "बड़ी", "छोटी", "नीचे",
+                "ऊपर", "बाहर", "अंदर", "वाला", "मेरी", "मेरा", "हमारी", "दोबारा", "फटाफट", "हां"]
+
+def _grow_registry(base, per_intent):
+    """Pads every intent to per_intent distinct phrases by adding filler words to its own phrases."""
+    import random
+    rng = random.Random(7)
+    grown = {}
+    for intent, phrases in base.items():
+        variants = list(phrases)
+        seen = {frozenset(p.split()) for p in variants}
+        while len(variants) < per_intent:
+            words = rng.choice(phrases).split() + rng.sample(FILLER_WORDS, rng.randint(1, 3))
+            if frozenset(words) not in seen:
+                seen.add(frozenset(words))
+                variants.append(" ".join(words))
+        grown[intent] = variants
+    return grown
+
+def bench_intents(rounds="20"):
+    import intentparser
+    from rapidfuzz import process, fuzz
+    base = {intent: list(phrases) for intent, phrases in intentparser.COMMAND_REGISTRY.items()}
+
+    for per_intent in (10, 100, 1000, 2000):
+        registry = _grow_registry(base, per_intent)
+        old, new = [], []
+        for _ in range(int(rounds)):
+            for query in INTENT_QUERIES:
+                start = time.perf_counter()
+                for intent, phrases in registry.items():
+                    process.extractOne(query, phrases, scorer=fuzz.token_set_ratio)
+                old.append((time.perf_counter() - start) * 1000)
+
+        intentparser.COMMAND_REGISTRY.clear()
+        intentparser.COMMAND_REGISTRY.update(registry)
+        intentparser.REGISTRY_VERSION += 1
+        intentparser.get_phrase_index()
+        for _ in range(int(rounds)):
+            for query in INTENT_QUERIES:
+                start = time.perf_counter()
+                intentparser.match_phrases([query])
+                new.append((time.perf_counter() - start) * 1000)
+
+        total = sum(len(phrases) for phrases in registry.values())
+        report(f"loop  {total:>6} phrases", old)
+        report(f"index {total:>6} phrases ({len(intentparser.get_phrase_index().phrases)} unique)", new)
+
+# ==========================================
+# FRONT-END: RAW REGEX VS FOLDED TOKEN-ID MATCHING
+# ==========================================
+def _legacy_normalize(text):
+    import re
+    text = re.sub(r'[^\w\sऀ-ॿ]', '', text)
+    return text.lower().strip()
+
+def _legacy_split(text):
+    import re
+    parts = re.split(r'\s+(और|तथा|फिर|and)\s+', text)
+    return [p.strip() for p in parts if p.strip() not in ['और', 'तथा', 'फिर', 'and'] and p.strip()]
+
+def _respelled_utterances(registry, count):
+    """Registry phrases as a recognizer or a typist might spell them, joined 1-3 per utterance."""
+    import random
+    from textnorm import HINGLISH_WORDS
+    rng = random.Random(11)
+    romanized = {target: word for word, target in HINGLISH_WORDS.items()}
+    items = [(intent, phrase) for intent, phrases in registry.items() for phrase in phrases]
+
+    def respell(phrase):
+        words = []
+        for word in phrase.split():
+            if word in romanized and rng.random() < 0.3:
+                word = romanized[word]
+            elif rng.random() < 0.3:
+                word = word.replace("ं", "ँ").replace("ज", "ज़").replace("ढ", "ढ़")
+            words.append(word)
+        if rng.random() < 0.4:
+            words.insert(rng.randint(0, len(words)), rng.choice(FILLER_WORDS))
+        return " ".join(words) + rng.choice(["", "", "।", "!", "?"])
+
+    utterances = []
+    for _ in range(count):
+        picked = rng.sample(items, rng.randint(1, 3))
+        utterances.append((" और ".join(respell(phrase) for _, phrase in picked), [intent for intent, _ in picked]))
+    return utterances
+
+def bench_normalize(count="20000"):
+    import intentparser
+    from rapidfuzz import process, fuzz
+    utterances = _respelled_utterances(intentparser.COMMAND_REGISTRY, int(count))
+
+    # 1. Old front-end: pattern strings per call, raw registry spellings, every phrase scored
+    legacy_keys, legacy_labels = [], []
+    for intent, phrases in intentparser.COMMAND_REGISTRY.items():
+        for phrase in phrases:
+            key = " ".join(sorted(set(_legacy_normalize(phrase).split())))
+            if key not in legacy_keys:
+                legacy_keys.append(key)
+                legacy_labels.append(intent)
+    old_correct = old_scored = 0
+    start = time.perf_counter()
+    for text, expected in utterances:
+        phrases = _legacy_split(_legacy_normalize(text))
+        keys = [" ".join(sorted(set(phrase.split()))) for phrase in phrases]
+        scores = process.cdist(keys, legacy_keys, scorer=fuzz.token_set_ratio, score_cutoff=intentparser.FUZZY_CUTOFF)
+        old_scored += len(keys)
+        labels = [legacy_labels[j] for j in scores.argmax(axis=1)]
+        old_correct += labels == expected
+    old_seconds = time.perf_counter() - start
+
+    # 2. Folded front-end: compiled patterns, canonical keys, exact token-id hits skip the scorer
+    index = intentparser.get_phrase_index()
+    new_correct = new_scored = 0
+    start = time.perf_counter()
+    for text, expected in utterances:
+        candidates = intentparser.fuzzy_candidates(text)
+        new_correct += [best for _, best, _ in candidates] == expected
+    new_seconds = time.perf_counter() - start
+    for text, _ in utterances:
+        new_scored += sum(index.lookup(intentparser.token_set_key(phrase)) is None
+                          for phrase in intentparser.split_commands(intentparser.normalize_text(text)))
+
+    n = len(utterances)
+    print(f"{n} utterances; registry {len(legacy_keys)} raw keys -> {len(index.phrases)} canonical, "
+          f"{len(index.token_ids)} token ids")
+    for label, seconds, scored, correct in (("regex + raw strings", old_seconds, old_scored, old_correct),
+                                            ("folded + token ids", new_seconds, new_scored, new_correct)):
+        print(f"{label:<36} {n / seconds:9.0f} utt/s  {scored:>7} phrases scored  "
+              f"{correct / n:6.1%} utterances fully correct")
+
+# ==========================================
+# CLASSIFIER: LLM CALL RATE ON HELD-OUT PHRASES
+# ==========================================
+POLITE_FORMS = {"करो": "कीजिए", "कर": "कीजिए", "दो": "दीजिए", "दे": "दीजिए"}
+
+def _spoken_variant(phrase, rng):
+    """A registry phrase as actually said: polite verb forms ("जलाओ" -> "जलाइए") and 1-3 filler words."""
+    words = []
+    for word in phrase.split():
+        if word in POLITE_FORMS:
+            word = POLITE_FORMS[word]
+        elif word.endswith("ाओ"):
+            word = word[:-2] + "ाइए"
+        words.append(word)
+    for filler in rng.sample(FILLER_WORDS, rng.randint(1, 3)):
+        words.insert(rng.randint(0, len(words)), filler)
+    return " ".join(words)
+
+def _route(phrase, asked):
+    """(tier, intent) for one phrase through intentparser.resolve_intent with the LLM scripted away.
+
+    The tier is "fuzzy" for a match that stands on its own, "classifier" when
+    the classifier answered or backed a looser relay match, and "llm" when the
+    phrase would have gone to Sarvam-1. `asked` is the list the scripted LLM appends to.
+    """
+    import intentparser
+    (best, score), = intentparser.match_phrases([phrase])
+    if intentparser.fuzzy_is_sure(best, score):
+        return "fuzzy", best
+    del asked[:]
+    intent = intentparser.resolve_intent(phrase, best, score)["intent"]
+    return ("llm" if asked else "classifier"), intent
+
+@contextmanager
+def _scripted_llm():
+    """Swaps intentparser.llm_intent_parser for one that records the phrase and declines."""
+    import intentparser
+    asked = []
+    real = intentparser.llm_intent_parser
+    intentparser.llm_intent_parser = lambda phrase: asked.append(phrase) or ("UNKNOWN_COMMAND", 0.0)
+    try:
+        yield asked
+    finally:
+        intentparser.llm_intent_parser = real
+
+def _tier_report(label, rounds):
+    """Routes held-out phrases through fuzzy -> classifier -> (LLM) and prints where they ended up.
+
+    `rounds` is a list of (training registry, [(phrase, intent), ...]); results are pooled.
+    """
+    import intentparser
+    import classifier
+    fuzzy = fuzzy_right = llm_before = llm_after = answered = answered_right = n = 0
+    latency, train_seconds = [], []
+    with _scripted_llm() as asked:
+        for registry, held_out in rounds:
+            intentparser.COMMAND_REGISTRY.clear()
+            intentparser.COMMAND_REGISTRY.update(registry)
+            intentparser.REGISTRY_VERSION += 1
+            start = time.perf_counter()
+            intentparser._classifier = classifier.train(intentparser.training_registry())
+            train_seconds.append(time.perf_counter() - start)
+
+            n += len(held_out)
+            for phrase, intent in held_out:
+                start = time.perf_counter()
+                tier, guess = _route(phrase, asked)
+                if tier == "fuzzy":
+                    fuzzy += 1
+                    fuzzy_right += guess == intent
+                    continue
+                latency.append((time.perf_counter() - start) * 1000)
+                llm_before += 1
+                if tier == "llm":
+                    llm_after += 1
+                else:
+                    answered += 1
+                    answered_right += guess == intent
+
+    print(f"{label}: {n} phrases over {len(rounds)} split(s), "
+          f"classifier trained in {sum(train_seconds) / len(train_seconds):.2f} s")
+    print(f"   fuzzy tier answered      {fuzzy:>5}  ({fuzzy_right / max(fuzzy, 1):.1%} correct)")
+    print(f"   classifier answered      {answered:>5}  ({answered_right / max(answered, 1):.1%} correct)")
+    print(f"   LLM call rate            {llm_before / n:.1%} -> {llm_after / n:.1%}  "
+          f"({1 - llm_after / max(llm_before, 1):.0%} fewer calls)")
+    if latency:
+        report("   classifier latency", latency)
+
+# Out-of-domain speech that shares no phrase with intentparser.OUT_OF_DOMAIN_PHRASES
+OUT_OF_DOMAIN_PROBES = ["बच्चों को बुलाओ", "मेरा नाम राहुल है", "राहुल को बुला दो", "दादी को दवाई दो",
+                        "आज खाने में क्या है", "मुझे प्यास लगी है", "गेट पर कौन है", "मैं थक गया हूँ",
+                        "उसको बोल दो", "कल क्रिकेट मैच है", "बस आने वाली है", "चाबी कहाँ रखी है"]
+
+def _reject_report(registry, probes):
+    """How many out-of-domain phrases the fuzzy and classifier tiers answer instead of passing on."""
+    import intentparser
+    import classifier
+    intentparser.COMMAND_REGISTRY.clear()
+    intentparser.COMMAND_REGISTRY.update(registry)
+    intentparser.REGISTRY_VERSION += 1
+    intentparser._classifier = classifier.train(intentparser.training_registry())
+    answered = {"fuzzy": [], "classifier": []}
+    with _scripted_llm() as asked:
+        for phrase in probes:
+            tier, intent = _route(phrase, asked)
+            if tier in answered and intent != "UNKNOWN_COMMAND":
+                answered[tier].append(intent)
+    print(f"out-of-domain: {len(probes)} phrases")
+    for tier, intents in answered.items():
+        relays = sum(intent in intentparser.ACTUATING_INTENTS for intent in intents)
+        print(f"   {tier + ' tier answered':<24} {len(intents):>5}  ({relays} would switch a relay)")
+
+def bench_classifier(holdout="0.25", splits="8"):
+    import random
+    import intentparser
+    rng = random.Random(13)
+    base = {intent: list(phrases) for intent, phrases in intentparser.COMMAND_REGISTRY.items()}
+
+    # 1. Everything in the registry, phrased the way people actually say it
+    spoken = [(_spoken_variant(phrase, rng), intent) for intent, phrases in base.items()
+              for phrase in phrases for _ in range(2)]
+    _tier_report("spoken variants", [(base, spoken)])
+
+    # 2. Wording the registry has never seen: a share of each intent's phrases held out of training
+    rounds = []
+    for _ in range(int(splits)):
+        kept, unseen = {}, []
+        for intent, phrases in base.items():
+            shuffled = rng.sample(phrases, len(phrases))
+            cut = max(1, int(len(phrases) * float(holdout)))
+            kept[intent] = shuffled[cut:]
+            unseen.extend((phrase, intent) for phrase in shuffled[:cut])
+            unseen.extend((_spoken_variant(phrase, rng), intent) for phrase in shuffled[:cut])
+        rounds.append((kept, unseen))
+    _tier_report("held-out wording", rounds)
+
+    # 3. Speech that is no command at all
+    _reject_report(base, OUT_OF_DOMAIN_PROBES)
+
+    intentparser.COMMAND_REGISTRY.clear()
+    intentparser.COMMAND_REGISTRY.update(base)
+    intentparser.REGISTRY_VERSION += 1
+    intentparser._classifier = None
+
+# ==========================================
+# VAD: WAKE RECOGNIZER CPU WITH THE GATE ON/OFF
+# ==========================================
+def _idle_room_chunks(seconds, chunk_samples=4000):
+    """Synthetic idle room: low noise, mains hum and the odd door knock."""
+    import numpy as np
+    rng = np.random.default_rng(3)
+    t = np.arange(chunk_samples) / 16000
+    chunks = []
+    for i in range(seconds * 16000 // chunk_samples):
+        audio = rng.normal(0, 40, chunk_samples) + 30 * np.sin(2 * np.pi * 50 * (t + i))
+        if i % 480 == 0:
+            audio[:400] += rng.normal(0, 3000, 400)
+        chunks.append(audio.astype(np.int16).tobytes())
+    return chunks
+
+def bench_vad(wav_path="", model_path="vosk"):
+    from vosk import Model, KaldiRecognizer
+    from pipeline import WAKE_GRAMMAR
+    from vad import EnergyVAD
+    from metrics import PipelineStats
+    from capture import WavReplaySource
+    if wav_path:
+        chunks = [pcm for _, pcm in WavReplaySource(None, wav_path, gap_seconds=0).chunks()]
+    else:
+        chunks = _idle_room_chunks(3600)
+    audio_seconds = len(chunks) * 4000 / 16000
+    model = Model(model_path)
+
+    for gated in (False, True):
+        recognizer = KaldiRecognizer(model, 16000, WAKE_GRAMMAR)
+        gate = EnergyVAD(stats=PipelineStats()) if gated else None
+        forwarded = 0
+        start = time.process_time()
+        for pcm in chunks:
+            for chunk in (gate.process(pcm) if gate else [pcm]):
+                forwarded += 1
+                recognizer.AcceptWaveform(chunk)
+            if gate and gate.closed:
+                recognizer.FinalResult()
+        cpu = time.process_time() - start
+        print(f"gate {'on ' if gated else 'off'}: {cpu:7.1f} s CPU for {audio_seconds / 3600:.2f} h of audio "
+              f"({cpu / audio_seconds * 100:5.2f}% of one core), "
+              f"{forwarded / max(len(chunks), 1):.1%} of chunks decoded")
+
+# ==========================================
+# TIME PARSING: DICT SCANS VS COMPILED TOKEN TABLE
+# ==========================================
+def _legacy_extract_minutes(phrase):
+    """main.extract_minutes before timeparse: a dict rebuilt and substring-scanned per call."""
+    time_map = {
+        "एक मिनट": 1, "1 मिनट": 1, "दो मिनट": 2, "2 मिनट": 2,
+        "तीन मिनट": 3, "3 मिनट": 3, "चार मिनट": 4, "4 मिनट": 4,
+        "पांच मिनट": 5, "पाँच मिनट": 5, "5 मिनट": 5,
+        "दस मिनट": 10, "10 मिनट": 10, "पंद्रह मिनट": 15, "15 मिनट": 15,
+        "बीस मिनट": 20, "20 मिनट": 20, "तीस मिनट": 30, "30 मिनट": 30,
+        "आधा घंटा": 30, "आधे घंटे": 30, "एक घंटा": 60, "एक घंटे": 60
+    }
+    for key, value in time_map.items():
+        if key in phrase:
+            return value
+    return None
+
+def _time_phrases(count):
+    """Alarm / reminder phrasings over every number word, digits, fractions and clock times."""
+    import random
+    from timeparse import NUMBER_WORDS
+    rng = random.Random(11)
+    numbers = [word for word in NUMBER_WORDS if NUMBER_WORDS[word] > 0] + [str(n) for n in range(1, 100)]
+    hours = [word for word in NUMBER_WORDS if 1 <= NUMBER_WORDS[word] <= 12]
+    templates = [
+        lambda: f"{rng.choice(numbers)} मिनट का अलार्म लगाओ",
+        lambda: f"{rng.choice(['एक', 'दो', 'डेढ़', 'ढाई', 'आधा'])} घंटे बाद याद दिलाना",
+        lambda: f"{rng.choice(numbers)} सेकंड का टाइमर",
+        lambda: f"{rng.choice(['साढ़े', 'सवा', 'पौने'])} {rng.choice(hours)} घंटे का टाइमर",
+        lambda: f"{rng.choice(['कल', 'परसों', 'आज'])} {rng.choice(['सुबह', 'शाम', 'रात', 'दोपहर'])} "
+                f"{rng.choice(['साढ़े ', 'सवा ', 'पौने ', ''])}{rng.choice(hours)} बजे मीटिंग याद दिलाना",
+        lambda: f"कल {rng.randint(1, 12)} बजकर {rng.randint(0, 59)} मिनट पर दवाई",
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+def bench_time(count="100000"):
+    from timeparse import parse_time, duration_minutes
+    phrases = _time_phrases(int(count))
+
+    for label, parse in (("legacy extract_minutes", _legacy_extract_minutes),
+                         ("timeparse.duration_minutes", duration_minutes),
+                         ("timeparse.parse_time (full)", parse_time)):
+        start = time.perf_counter()
+        results = [parse(phrase) for phrase in phrases]
+        elapsed = time.perf_counter() - start
+        if label.startswith("timeparse.parse_time"):
+            understood = sum(1 for r in results if r.seconds or r.hour is not None)
+        else:
+            understood = sum(1 for r in results if r)
+        print(f"{label:<30} {len(phrases) / elapsed:10.0f} phrases/s  "
+              f"{elapsed / len(phrases) * 1e6:6.2f} us/phrase  {understood / len(phrases):6.1%} with a time")
+
+# ==========================================
+# ROOMS: MEMORY PER ROOM & LATENCY VS CONCURRENT ROOMS
+# ==========================================
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def bench_rooms(wav_path, model_path="vosk", max_rooms="4", realtime="1"):
+    """Replays the same corpus in 1..max_rooms rooms at once over one shared Model."""
+    os.environ.setdefault("HINDIVA_MOCK_HARDWARE", "1")
+    from vosk import Model
+    import main
+    import tts
+    from rooms import RoomDispatcher, build_rooms
+    from metrics import STATS
+
+    tts.set_voice(tts.SilentVoice())
+    main.DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench_rooms_"), "memory.db")
+    realtime = realtime == "1"
+
+    base = _rss_mb()
+    model = Model(model_path)
+    print(f"Vosk model: {_rss_mb() - base:7.1f} MB RSS (loaded once, shared by every room)")
+
+    for count in range(1, int(max_rooms) + 1):
+        STATS.reset()
+        config = {"rooms": [{"name": f"room{i}", "input": f"wav:{wav_path}", "priority": i}
+                            for i in range(count)]}
+        before = _rss_mb()
+        dispatcher = RoomDispatcher().start()
+        rooms = build_rooms(config, model, dispatcher, realtime=realtime,
+                            output_factory=lambda room: tts.NullOutput(realtime=realtime))
+        start = time.perf_counter()
+        for room in rooms:
+            room.start()
+        for room in rooms:
+            room.thread.join()
+        dispatcher.join()
+        wall = time.perf_counter() - start
+        per_room = (_rss_mb() - before) / count
+        dispatcher.stop()
+
+        total = STATS.percentiles("room_command_total")
+        wait = STATS.percentiles("room_queue_wait")
+        print(f"{count} room(s): +{per_room:6.1f} MB RSS/room  {total['count']:4d} commands in {wall:6.1f} s  "
+              f"command p50={total['p50']:7.1f} ms p95={total['p95']:7.1f} ms  "
+              f"queue wait p95={wait['p95']:7.1f} ms  drops={STATS.counters.get('room_queue_drops', 0)}")
+
+# ==========================================
+# ACTUATORS: INLINE GPIO WRITES VS QUEUED, CACHED, COALESCED
+# ==========================================
+def bench_actuators(utterances="500", write_ms="2"):
+    import random
+    os.environ.setdefault("HINDIVA_MOCK_HARDWARE", "1")
+    from hardware import Actuators, MockRelay, RELAY_PINS
+    from metrics import PipelineStats
+
+    rng = random.Random(3)
+    devices = list(RELAY_PINS)
+    workload = [[(rng.choice(devices), rng.choice(["ON", "OFF"])) for _ in range(rng.randint(1, 3))]
+                for _ in range(int(utterances))]
+    commands = sum(len(utterance) for utterance in workload)
+
+    # 1. Old path: every command drives the pin on the calling thread
+    relays = {name: MockRelay(pin, float(write_ms) / 1000) for name, pin in RELAY_PINS.items()}
+    inline = []
+    for utterance in workload:
+        start = time.perf_counter()
+        for name, state in utterance:
+            relays[name].write(state == "ON")
+        inline.append((time.perf_counter() - start) * 1000)
+    report("inline writes (per utterance)", inline)
+    print(f"{'':<36} {sum(r.writes for r in relays.values())} pin writes for {commands} commands")
+
+    # 2. Actuator queue: the caller only records state; the worker skips no-ops and coalesces
+    stats = PipelineStats()
+    actuators = Actuators(stats=stats)
+    relays = {name: MockRelay(pin, float(write_ms) / 1000) for name, pin in RELAY_PINS.items()}
+    for name, relay in relays.items():
+        actuators.register(name, relay)
+    queued = []
+    for utterance in workload:
+        start = time.perf_counter()
+        with actuators.batch():
+            for name, state in utterance:
+                actuators.command(name, state)
+        queued.append((time.perf_counter() - start) * 1000)
+        actuators.flush()   # Utterances are seconds apart in real use
+    report("queued commands (per utterance)", queued)
+    report("relay write (worker side)", [ms * 1000 for ms in stats.latencies["relay_write"]])
+    print(f"{'':<36} {sum(r.writes for r in relays.values())} pin writes for {commands} commands "
+          f"({stats.counters['relay_skipped']} redundant skipped, {stats.counters['relay_coalesced']} coalesced "
+          f"in {stats.counters['relay_batches']} batches)")
+
+# ==========================================
+# MULTI-INTENT: SEQUENTIAL VS FAN-OUT
+# ==========================================
+MULTI_PHRASES = [
+    "बत्ती जलाओ", "पंखा बंद कर दो", "अभी टाइम क्या हो रहा है",   # Confident fuzzy, cheap handler
+    "कमरे का तापमान कितना है",                                # IO handler (sensor read)
+    "उमस से बुरा हाल है", "कमरे में घुटन हो रही है",            # Below FUZZY_THRESHOLD: LLM fallback
+]
+
+class PacedVoice:
+    """One render thread like the piper engine, taking a fixed time per sentence."""
+    sample_rate = 22050
+
+    def __init__(self, render_ms):
+        from concurrent.futures import ThreadPoolExecutor
+        self.render_seconds = render_ms / 1000
+        self.worker = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, text):
+        return self.worker.submit(self.synthesize, text)
+
+    def synthesize(self, text):
+        time.sleep(self.render_seconds)
+        return b"\0\0"
+
+def bench_multi(rounds="20", llm_ms="120", io_ms="40", render_ms="60"):
+    import io
+    import random
+    import contextlib
+    os.environ.setdefault("HINDIVA_MOCK_HARDWARE", "1")
+    import main
+    import tts
+    import hardware
+    import handlers
+    import intentparser
+
+    main.DB_FILE = os.path.join(tempfile.mkdtemp(prefix="bench_multi_"), "memory.db")
+
+    def slow_llm(phrase):
+        time.sleep(float(llm_ms) / 1000)
+        return "FAN_ON", 90.0
+
+    def slow_sensor():
+        time.sleep(float(io_ms) / 1000)
+        return 25
+
+    intentparser.llm_intent_parser = slow_llm
+    hardware.get_temperature = slow_sensor
+    voice = PacedVoice(float(render_ms))
+    output = tts.NullOutput()
+    rng = random.Random(5)
+
+    for count in range(1, 6):
+        utterances = [" और ".join(rng.sample(MULTI_PHRASES, count)) for _ in range(int(rounds))]
+        seq_first, seq_total, fan_first, fan_total = [], [], [], []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for text in utterances:
+                # 1. Old path: every phrase, then every handler, then the joined reply
+                start = time.perf_counter()
+                intent_list = [intentparser.resolve_intent(*c) for c in intentparser.fuzzy_candidates(text)]
+                replies = [handlers.respond(i["intent"], i["phrase"]) for i in intent_list]
+                resolved_ms = (time.perf_counter() - start) * 1000
+                stats = tts.speak(" ".join(replies), voice=voice, output=output)
+                seq_first.append(resolved_ms + stats["first_audio_ms"])
+                seq_total.append((time.perf_counter() - start) * 1000)
+
+                # 2. Fan-out: phrases resolve side by side, speech starts on the first reply
+                spoken = {}
+                start = time.perf_counter()
+
+                def speak(parts):
+                    spoken["offset_ms"] = (time.perf_counter() - start) * 1000
+                    spoken.update(tts.speak_parts(parts, voice=voice, output=output))
+
+                main.handle_command(text, speak=speak)
+                fan_first.append(spoken["offset_ms"] + spoken["first_audio_ms"])
+                fan_total.append((time.perf_counter() - start) * 1000)
+        report(f"{count} intents, sequential: first audio", seq_first)
+        report(f"{count} intents, fan-out: first audio", fan_first)
+        report(f"{count} intents, sequential: total", seq_total)
+        report(f"{count} intents, fan-out: total", fan_total)
+
+# ==========================================
+# BOOT: TIME TO LISTENING (FRESH INTERPRETER PER ROUND)
+# ==========================================
+# main.py's boot path up to the recognizer thread, then one command through the parser
+BOOT_PROBE = """
+import sys, time, threading
+start = time.perf_counter()
+import main, intentparser
+imported = time.perf_counter()
+threading.Thread(target=intentparser.warm_up, daemon=True).start()
+from vosk import Model
+model = Model(sys.argv[1])
+from vad import EnergyVAD
+from pipeline import VoiceSession, WAKE_WORDS
+from grammar import CommandGrammar
+VoiceSession(model, on_wake=main.on_wake, on_command=main.on_command, vad=EnergyVAD(),
+             single_stream=True, grammar=CommandGrammar(WAKE_WORDS))
+listening = time.perf_counter()
+intentparser.match_phrases(["बत्ती जलाओ ना"])
+print((imported - start) * 1000, (listening - start) * 1000, (time.perf_counter() - start) * 1000)
+"""
+
+def bench_boot(rounds="7", model_path="vosk"):
+    import snapshot
+    here = os.path.dirname(os.path.abspath(__file__))
+    for label, path in (("no snapshot", ""), ("snapshot", snapshot.SNAPSHOT_PATH)):
+        env = dict(os.environ, HINDIVA_SNAPSHOT=path)
+        if path:
+            subprocess.run([sys.executable, "snapshot.py"], cwd=here, env=env, capture_output=True)
+        subprocess.run([sys.executable, "-c", BOOT_PROBE, model_path], cwd=here, env=env,
+                       capture_output=True)   # Warms the page cache
+        imports, listening, first_command = [], [], []
+        for _ in range(int(rounds)):
+            out = subprocess.run([sys.executable, "-c", BOOT_PROBE, model_path], cwd=here, env=env,
+                                 capture_output=True, text=True, check=True).stdout.split()
+            imports.append(float(out[-3]))
+            listening.append(float(out[-2]))
+            first_command.append(float(out[-1]))
+        report(f"{label}: imports", imports)
+        report(f"{label}: time to listening", listening)
+        report(f"{label}: first command parsed", first_command)
+
+BENCHMARKS = {
+    "tts": bench_tts,
+    "stream": bench_stream,
+    "memory": bench_memory,
+    "intents": bench_intents,
+    "normalize": bench_normalize,
+    "classifier": bench_classifier,
+    "vad": bench_vad,
+    "time": bench_time,
+    "rooms": bench_rooms,
+    "actuators": bench_actuators,
+    "multi": bench_multi,
+    "boot": bench_boot,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmark.py <{'|'.join(BENCHMARKS)}> [args...]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
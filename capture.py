@@ -0,0 +1,217 @@
+import os
+import time
+import wave
+import socket
+import threading
+from collections import deque
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 4000      # 250 ms per chunk, same as the old stream.read(4000)
+RING_CHUNKS = 40          # 10 s of audio before the oldest chunk is overwritten
+
+# ==========================================
+# BOUNDED RING BUFFER
+# ==========================================
+class RingBuffer:
+    """Fixed-size FIFO of (captured_at, pcm) chunks between capture and recognition.
+
+    A full buffer drops its oldest chunk and counts an overrun, so the capture
+    side never blocks on a slow consumer.
+    """
+
+    def __init__(self, capacity=RING_CHUNKS, stats=STATS):
+        self.items = deque()
+        self.capacity = capacity
+        self.stats = stats
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def put(self, pcm):
+        with self.cond:
+            if len(self.items) >= self.capacity:
+                self.items.popleft()
+                self.stats.incr("ring_overruns")
+            self.items.append((time.monotonic(), pcm))
+            self.stats.gauge("ring_depth", len(self.items))
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Next chunk, or None once the buffer is closed and empty (or on timeout)."""
+        with self.cond:
+            # wait_for loops over spurious and stolen wake-ups and keeps one deadline across them
+            self.cond.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+# ==========================================
+# MICROPHONE CAPTURE (PYAUDIO CALLBACK)
+# ==========================================
+class MicSource:
+    """Captures on PyAudio's own callback thread; the callback only copies into the ring."""
+
+    def __init__(self, ring, rate=SAMPLE_RATE, chunk=CHUNK_SAMPLES, device_index=None):
+        self.ring = ring
+        self.rate = rate
+        self.chunk = chunk
+        self.device_index = device_index
+        self.audio = None
+        self.stream = None
+
+    def start(self):
+        import pyaudio
+        self._overflow_flag = pyaudio.paInputOverflow
+        self._continue = pyaudio.paContinue
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                      frames_per_buffer=self.chunk, input_device_index=self.device_index,
+                                      stream_callback=self._callback)
+        self.stream.start_stream()
+        return self
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & self._overflow_flag:
+            STATS.incr("input_overflows")
+        self.ring.put(in_data)
+        return (None, self._continue)
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.audio.terminate()
+            self.stream = None
+        self.ring.close()
+
+# ==========================================
+# LOCAL SOCKET CAPTURE (REMOTE ROOMS)
+# ==========================================
+class SocketSource:
+    """Accepts raw 16 kHz mono 16-bit PCM on a Unix socket, one sender at a time.
+
+    Lets a room's microphone live on another box (or another process, e.g.
+    `arecord -f S16_LE -r 16000 -c 1 | socat - UNIX-CONNECT:/tmp/hall.sock`).
+    A sender that disconnects just leaves the room silent until the next one.
+    """
+
+    def __init__(self, ring, path, chunk=CHUNK_SAMPLES):
+        self.ring = ring
+        self.path = path
+        self.chunk_bytes = chunk * 2
+        self.server = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(1)
+        self.thread = threading.Thread(target=self._run, name=f"socket-{os.path.basename(self.path)}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            with conn:
+                pending = b""
+                while not self.stopped.is_set():
+                    data = conn.recv(self.chunk_bytes)
+                    if not data:
+                        break
+                    pending += data
+                    while len(pending) >= self.chunk_bytes:
+                        self.ring.put(pending[:self.chunk_bytes])
+                        pending = pending[self.chunk_bytes:]
+        self.ring.close()
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)   # Wakes the blocked accept()
+            except OSError:
+                pass
+            self.server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        self.ring.close()
+
+# ==========================================
+# WAV REPLAY (OFFLINE CORPORA)
+# ==========================================
+def list_wavs(path):
+    """A single .wav, or every .wav in a directory in name order."""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith(".wav")]
+    return [path]
+
+class WavReplaySource:
+    """Drop-in for MicSource that plays 16 kHz mono WAV files into the ring.
+
+    Each file is followed by a stretch of silence so the recognizer can
+    endpoint before the next one. realtime=False feeds as fast as the consumer
+    drains it (blocking instead of overwriting, so nothing is dropped).
+    """
+
+    def __init__(self, ring, path, realtime=True, chunk=CHUNK_SAMPLES, gap_seconds=1.0):
+        self.ring = ring
+        self.files = list_wavs(path)
+        self.realtime = realtime
+        self.chunk = chunk
+        self.gap_chunks = int(gap_seconds * SAMPLE_RATE / chunk)
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def chunks(self):
+        """Yields (path, pcm) for every chunk of every file, followed by the silence gap."""
+        silence = b"\x00\x00" * self.chunk
+        for path in self.files:
+            with wave.open(path, "rb") as wav:
+                if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+                while True:
+                    pcm = wav.readframes(self.chunk)
+                    if not pcm:
+                        break
+                    yield path, pcm
+            for _ in range(self.gap_chunks):
+                yield path, silence
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="wav-replay", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        chunk_seconds = self.chunk / SAMPLE_RATE
+        next_due = time.monotonic()
+        for _, pcm in self.chunks():
+            if self.stopped.is_set():
+                break
+            if self.realtime:
+                next_due += chunk_seconds
+                time.sleep(max(0.0, next_due - time.monotonic()))
+            else:
+                while len(self.ring.items) >= self.ring.capacity and not self.stopped.is_set():
+                    time.sleep(0.001)
+            self.ring.put(pcm)
+        self.ring.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.ring.close()
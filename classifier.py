@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import zlib
+import struct
+import numpy as np
+from textnorm import normalize_text
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+HASH_BITS = 14             # 16384 feature buckets
+NGRAM_SIZES = (2, 3, 4)    # Character n-grams of each word, padded with spaces
+EPOCHS = 300
+LEARNING_RATE = 0.5
+L2 = 1e-4
+TEMPERATURES = np.geomspace(0.25, 4.0, 41)   # Searched on a held-back split for calibration
+
+MAGIC = b"HIC1"
+# magic, dim, classes, temperature, registry fingerprint, labels JSON length
+HEADER = struct.Struct("<4sIIfII")
+ALIGN = 64
+
+# ==========================================
+# HASHED CHARACTER N-GRAM FEATURES
+# ==========================================
+def features(phrase, bits=HASH_BITS):
+    """(bucket ids, L2-normalized weights) for one phrase; crc32 keeps buckets stable across runs."""
+    mask = (1 << bits) - 1
+    counts = {}
+    for word in normalize_text(phrase).split():
+        grams = [f"w:{word}"]
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        for gram in grams:
+            bucket = zlib.crc32(gram.encode("utf-8")) & mask
+            counts[bucket] = counts.get(bucket, 0) + 1
+    ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    if len(values):
+        values /= np.sqrt((values * values).sum())
+    return ids, values
+
+def registry_fingerprint(registry):
+    return zlib.crc32(json.dumps(registry, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+# ==========================================
+# CLASSIFIER
+# ==========================================
+class IntentClassifier:
+    """Softmax regression over hashed n-grams, temperature-calibrated.
+
+    predict() touches only the weight rows of the phrase's own buckets, so a
+    memory-mapped model answers in microseconds without paging in the rest.
+    `seen` marks buckets that occurred in training; `coverage` is how much of
+    a phrase's feature mass the model has ever seen, so an out-of-vocabulary
+    phrase is reported as unsure instead of getting a confident wrong label.
+    """
+
+    def __init__(self, labels, weights, bias, seen, temperature=1.0, fingerprint=0):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.seen = seen
+        self.temperature = float(temperature)
+        self.fingerprint = fingerprint
+        self.bits = int(np.log2(len(seen)))
+
+    def logits(self, phrase):
+        """(uncalibrated logits, coverage) for one phrase; logits are None when nothing in it was seen."""
+        ids, values = features(phrase, self.bits)
+        if not len(ids):
+            return None, 0.0
+        known = self.seen[ids] > 0
+        coverage = float((values * values)[known].sum())
+        if not coverage:
+            return None, 0.0
+        # Words the model never saw only dilute the vector; score the known part at full length
+        ids, values = ids[known], values[known] / np.sqrt(coverage)
+        return values @ self.weights[ids].astype(np.float32) + self.bias, coverage
+
+    def probabilities(self, phrase):
+        """(class probabilities, coverage) for one phrase."""
+        logits, coverage = self.logits(phrase)
+        if logits is None:
+            return np.full(len(self.labels), 1.0 / len(self.labels)), 0.0
+        logits = logits / self.temperature
+        probs = np.exp(logits - logits.max())
+        return probs / probs.sum(), coverage
+
+    def predict(self, phrase):
+        """(intent, probability 0-1, coverage 0-1)."""
+        probs, coverage = self.probabilities(phrase)
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best]), coverage
+
+    def save(self, path):
+        """One file: header, labels, then float16 weights, float32 bias and the seen mask, each aligned."""
+        labels = json.dumps(self.labels, ensure_ascii=False).encode("utf-8")
+        dim, classes = self.weights.shape
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, dim, classes, self.temperature, self.fingerprint, len(labels)))
+            f.write(labels)
+            for array in (self.weights.astype(np.float16), self.bias.astype(np.float32), self.seen.astype(np.uint8)):
+                f.write(b"\0" * (-f.tell() % ALIGN))
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps a saved model; None if the file is missing or not a model."""
+        try:
+            with open(path, "rb") as f:
+                magic, dim, classes, temperature, fingerprint, labels_len = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC:
+                    return None
+                labels = json.loads(f.read(labels_len).decode("utf-8"))
+        except (OSError, struct.error, ValueError):
+            return None
+
+        offset = HEADER.size + labels_len
+        arrays = []
+        for dtype, shape in ((np.float16, (dim, classes)), (np.float32, (classes,)), (np.uint8, (dim,))):
+            offset += -offset % ALIGN
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape))
+            offset += arrays[-1].nbytes
+        weights, bias, seen = arrays
+        return cls(labels, weights, np.asarray(bias), seen, temperature, fingerprint)
+
+# ==========================================
+# OFFLINE TRAINING
+# ==========================================
+def training_examples(registry, logged=()):
+    """(phrase, intent) pairs: every registry phrase, each with one word left out, and logged utterances."""
+    examples = []
+    for intent, phrases in registry.items():
+        for phrase in phrases:
+            examples.append((phrase, intent))
+            words = phrase.split()
+            if len(words) > 2:
+                examples.extend((" ".join(words[:i] + words[i + 1:]), intent) for i in range(len(words)))
+    examples.extend((phrase, intent) for phrase, intent in logged if intent in registry)
+    return examples
+
+def _fit(examples, labels, bits):
+    """Full-batch gradient descent on softmax cross-entropy.
+
+    Only a few thousand of the hash buckets ever occur, so the design matrix
+    is dense over those columns alone and scattered back into the full table.
+    """
+    index = {label: i for i, label in enumerate(labels)}
+    rows = [features(phrase, bits) for phrase, _ in examples]
+    y = np.array([index[intent] for _, intent in examples])
+    row_of = np.concatenate([np.full(len(ids), r) for r, (ids, _) in enumerate(rows)])
+    used, columns = np.unique(np.concatenate([ids for ids, _ in rows]), return_inverse=True)
+    n, classes = len(rows), len(labels)
+
+    x = np.zeros((n, len(used)), dtype=np.float32)
+    x[row_of, columns] = np.concatenate([values for _, values in rows])
+    w = np.zeros((len(used), classes), dtype=np.float32)
+    bias = np.zeros(classes, dtype=np.float32)
+    onehot = np.eye(classes, dtype=np.float32)[y]
+    # Every class carries the same total weight, however many examples it has
+    counts = np.bincount(y, minlength=classes)
+    weight = (n / (np.count_nonzero(counts) * counts[y]))[:, None].astype(np.float32)
+    for _ in range(EPOCHS):
+        logits = x @ w + bias
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        error = weight * (probs - onehot) / n
+        w -= LEARNING_RATE * (x.T @ error + L2 * w)
+        bias -= LEARNING_RATE * error.sum(axis=0)
+
+    weights = np.zeros((1 << bits, classes), dtype=np.float32)
+    weights[used] = w
+    seen = np.zeros(1 << bits, dtype=np.uint8)
+    seen[used] = 1
+    return weights, bias, seen
+
+def _calibrate(model, examples):
+    """Temperature with the lowest negative log-likelihood on examples the model never saw.
+
+    The logits are the ones predict() computes, unseen buckets dropped and the
+    rest renormalized, so the temperature describes the live gate. Examples with
+    no seen n-gram are skipped: predict() reports them as uniform at any temperature.
+    """
+    index = {label: i for i, label in enumerate(model.labels)}
+    logits, y = [], []
+    for phrase, intent in examples:
+        scores, _ = model.logits(phrase)
+        if scores is not None:
+            logits.append(scores)
+            y.append(index[intent])
+    if not logits:
+        return 1.0
+    logits = np.array(logits, dtype=np.float64)
+    y = np.array(y)
+
+    def nll(temperature):
+        scaled = logits / temperature
+        scaled -= scaled.max(axis=1, keepdims=True)
+        return -(scaled[np.arange(len(y)), y] - np.log(np.exp(scaled).sum(axis=1))).mean()
+
+    return float(min(TEMPERATURES, key=nll))
+
+def train(registry, logged=(), bits=HASH_BITS, seed=0):
+    """Trains on the registry (plus logged utterances) and calibrates on a held-back fifth of the phrases."""
+    labels = list(registry)
+    rng = np.random.default_rng(seed)
+    held_back = {intent: set(rng.choice(len(phrases), max(1, len(phrases) // 5), replace=False))
+                 for intent, phrases in registry.items() if len(phrases) > 1}
+    fit_registry = {intent: [p for i, p in enumerate(phrases) if i not in held_back.get(intent, ())]
+                    for intent, phrases in registry.items()}
+    calibration = [(registry[intent][i], intent) for intent, ids in held_back.items() for i in ids]
+
+    probe = IntentClassifier(labels, *_fit(training_examples(fit_registry, logged), labels, bits))
+    temperature = _calibrate(probe, calibration) if calibration else 1.0
+
+    weights, bias, seen = _fit(training_examples(registry, logged), labels, bits)
+    return IntentClassifier(labels, weights, bias, seen, temperature, registry_fingerprint(registry))
+
+if __name__ == "__main__":
+    # python classifier.py ["phrase" ...]: retrains from the registry, the reject class and the LLM's logged answers
+    import time
+    import intentparser
+    start = time.perf_counter()
+    model = intentparser.train_classifier()
+    print(f"Trained {len(model.labels)} intents in {time.perf_counter() - start:.1f} s "
+          f"(temperature {model.temperature:.2f}) -> {intentparser.CLASSIFIER_PATH} "
+          f"({os.path.getsize(intentparser.CLASSIFIER_PATH) / 1024:.0f} KiB)")
+    for phrase in sys.argv[1:] or ["ज़रा बत्ती जला दीजिए", "पंखे को बंद करिए", "बच्चों को बुलाओ"]:
+        intent, probability, coverage = model.predict(phrase)
+        print(f"   '{phrase}' -> {intent} ({probability:.0%}, coverage {coverage:.0%})")
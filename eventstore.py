@@ -0,0 +1,146 @@
+import os
+import json
+import heapq
+import sqlite3
+import threading
+from datetime import datetime
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+DB_PATH = "memory.db"
+LEGACY_JSON = "memory.json"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+MAX_WAIT_SECONDS = 30   # Longest sleep before the wall clock is read again (NTP steps, suspend)
+
+# ==========================================
+# INDEXED EVENT STORE (SQLITE, WAL MODE)
+# ==========================================
+class EventStore:
+    """Alarms and reminders in SQLite with an index on pending trigger times.
+
+    Trigger times are stored as epoch seconds so nothing is re-parsed on the
+    hot path. Fired events are deleted instead of piling up as 'done'.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS events (
+                               id INTEGER PRIMARY KEY,
+                               type TEXT NOT NULL,
+                               trigger_ts REAL NOT NULL,
+                               message TEXT NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_events_trigger ON events(trigger_ts)")
+
+    def add(self, event_type, trigger_time, message):
+        with self.lock:
+            cur = self.db.execute("INSERT INTO events (type, trigger_ts, message) VALUES (?, ?, ?)",
+                                  (event_type, trigger_time.timestamp(), message))
+            return cur.lastrowid
+
+    def pending(self):
+        """All pending events as (trigger_ts, id, message), oldest first."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT trigger_ts, id, message FROM events ORDER BY trigger_ts").fetchall()
+
+    def remove(self, event_id):
+        with self.lock:
+            self.db.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def migrate_json(self, json_path=LEGACY_JSON):
+        """One-time import of the old flat memory.json. Only pending events are kept."""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            data = []
+
+        rows = []
+        for event in data:
+            if event.get("status") != "pending":
+                continue
+            try:
+                ts = datetime.strptime(event["trigger_time"], TIME_FORMAT).timestamp()
+            except (KeyError, ValueError):
+                continue
+            rows.append((event.get("type", "reminder"), ts, event.get("message", "")))
+
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT INTO events (type, trigger_ts, message) VALUES (?, ?, ?)", rows)
+            self.db.execute("COMMIT")
+        os.replace(json_path, json_path + ".migrated")
+        return len(rows)
+
+# ==========================================
+# HEAP-DRIVEN SCHEDULER (NO POLLING)
+# ==========================================
+class Scheduler:
+    """Min-heap of pending events; the thread sleeps until the next one is due.
+
+    schedule() pushes onto the heap and notifies the condition, so an event
+    earlier than the current head wakes the thread immediately. Trigger times
+    are wall-clock, so no sleep is longer than MAX_WAIT_SECONDS: a clock that
+    jumps forward fires its alarms within that time, not when the old sleep ends.
+    """
+
+    def __init__(self, store, on_fire):
+        self.store = store
+        self.on_fire = on_fire
+        self.heap = []
+        self.cond = threading.Condition()
+        self.running = False
+
+    def schedule(self, event_type, trigger_time, message):
+        with self.cond:   # Stored and pushed together, so a concurrent start() cannot load it twice
+            event_id = self.store.add(event_type, trigger_time, message)
+            heapq.heappush(self.heap, (trigger_time.timestamp(), event_id, message))
+            self.cond.notify()
+        return event_id
+
+    def start(self):
+        with self.cond:
+            self.heap = self.store.pending()
+            heapq.heapify(self.heap)
+            self.running = True
+        thread = threading.Thread(target=self._run, name="timekeeper", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running:
+                    now = datetime.now().timestamp()
+                    if self.heap and self.heap[0][0] <= now:
+                        break
+                    timeout = min(self.heap[0][0] - now, MAX_WAIT_SECONDS) if self.heap else None
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                _, event_id, message = heapq.heappop(self.heap)
+
+            self.store.remove(event_id)
+            try:
+                self.on_fire(message)
+            except Exception as e:
+                print(f"⚠️ [MEMORY]: Alarm callback failed ({e})")
@@ -0,0 +1,60 @@
+import json
+import intentparser
+import timeparse
+import snapshot
+from textnorm import clean_text, split_commands
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Everything timeparse understands (numbers 0-99, units, days, periods, साढ़े/सवा/पौने)
+TIME_WORDS = timeparse.VOCABULARY
+EVENT_WORDS = ["बर्थडे", "जन्मदिन", "मीटिंग", "बैठक", "वैक्सीन", "टीका", "दवाई", "मेडिसिन"]
+JOIN_WORDS = ["और", "तथा", "फिर"]   # split_commands separators, so multi-command utterances survive
+
+# ==========================================
+# REGISTRY-DERIVED VOSK GRAMMAR
+# ==========================================
+class CommandGrammar:
+    """Vosk grammar over the command registry, rebuilt whenever its REGISTRY_VERSION moves.
+
+    The grammar lists every cleaned registry phrase (so common commands
+    decode as whole paths) plus every single word of the vocabulary and
+    "[unk]", so number/time combinations and chained commands still come through
+    and anything else shows up as [unk] rather than a forced wrong word.
+    """
+
+    def __init__(self, extra_words=()):
+        self.extra_words = list(extra_words)
+        self.version = None
+        self.spec = None
+        self.vocabulary = set()
+
+    def current(self):
+        """(registry version, grammar JSON string)."""
+        if self.version != intentparser.REGISTRY_VERSION:
+            self._build(intentparser.REGISTRY_VERSION)
+        return self.version, self.spec
+
+    def _build(self, version):
+        self.spec, self.vocabulary = snapshot.cached(
+            "grammar", (intentparser.COMMAND_REGISTRY, TIME_WORDS, EVENT_WORDS, JOIN_WORDS, self.extra_words),
+            self._compile)
+        self.version = version
+
+    def _compile(self):
+        """(grammar JSON string, vocabulary set) for the registry as it is now."""
+        phrases = []
+        seen = set()
+        for registry_phrases in intentparser.COMMAND_REGISTRY.values():
+            for phrase in registry_phrases:
+                # Surface spellings: Vosk only knows the words its lexicon spells
+                for part in split_commands(clean_text(phrase)):
+                    if part not in seen:
+                        seen.add(part)
+                        phrases.append(part)
+
+        vocabulary = {word for phrase in phrases for word in phrase.split()}
+        vocabulary.update(TIME_WORDS, EVENT_WORDS, JOIN_WORDS, self.extra_words)
+        words = sorted(vocabulary - seen)
+        return json.dumps(phrases + words + ["[unk]"], ensure_ascii=False), vocabulary
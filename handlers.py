@@ -0,0 +1,200 @@
+import os
+import sys
+import threading
+from datetime import datetime
+from string import Formatter
+
+import hardware
+import timeparse
+from intentparser import register_phrases
+from metrics import STATS
+
+# ==========================================
+# HANDLER KINDS
+# ==========================================
+PURE = "pure"           # No side effects, reply depends only on the phrase: cached
+IO = "io"               # Sensor / subprocess / disk work: main.resolve_replies runs it on the phrase pool
+BLOCKING = "blocking"   # Runs on the command thread in utterance order ("जलाओ फिर बुझाओ" must not reorder)
+PURE_CACHE_SIZE = 1024
+
+# ==========================================
+# INTENT HANDLERS
+# ==========================================
+class Handler:
+    """Everything one intent does, declared in one place.
+
+    slots:   {name: extractor(phrase)} filled before the action runs.
+    action:  callable(**slots) performing the side effect; may return more
+             template values, including "variant" to pick one of several replies.
+    reply:   a str.format template, or {variant: template}.
+    phrases: extra registry phrases (added via register_phrases on registration).
+    """
+
+    def __init__(self, intent, reply, slots=None, action=None, kind=BLOCKING, phrases=()):
+        self.intent = intent
+        self.reply = reply
+        self.slots = slots or {}
+        self.action = action
+        self.kind = kind
+        self.phrases = list(phrases)
+
+    def __call__(self, phrase):
+        values = {name: extract(phrase) for name, extract in self.slots.items()}
+        if self.action:
+            extra = self.action(**values)
+            if isinstance(extra, dict):
+                values.update(extra)
+        template = self.reply[values["variant"]] if isinstance(self.reply, dict) else self.reply
+        return template.format(**values)
+
+    def templates(self):
+        return list(self.reply.values()) if isinstance(self.reply, dict) else [self.reply]
+
+HANDLERS = {}
+FALLBACK = Handler(None, "माफ़ कीजिए, मुझे समझ नहीं आया।", kind=PURE)
+
+_pure_cache = {}
+_pure_lock = threading.Lock()
+
+def register(handler):
+    HANDLERS[handler.intent] = handler
+    if handler.phrases:
+        register_phrases(handler.intent, handler.phrases)
+    return handler
+
+def get_handler(intent):
+    return HANDLERS.get(intent, FALLBACK)
+
+def respond(intent, phrase):
+    """Runs one intent's handler on the calling thread and returns its reply."""
+    with STATS.timer("handler", detail=intent):
+        return _respond(intent, phrase)
+
+def _respond(intent, phrase):
+    handler = get_handler(intent)
+    if handler.kind == PURE:
+        key = (intent, phrase)
+        with _pure_lock:
+            if key in _pure_cache:
+                STATS.incr("pure_reply_hits")
+                return _pure_cache[key]
+        reply = handler(phrase)
+        with _pure_lock:
+            if len(_pure_cache) >= PURE_CACHE_SIZE:
+                _pure_cache.clear()
+            _pure_cache[key] = reply
+        return reply
+    return handler(phrase)
+
+def reply_templates():
+    """The fixed text of every reply template (the parts between {slots}), for voice pre-warming."""
+    parts = []
+    for handler in list(HANDLERS.values()) + [FALLBACK]:
+        for template in handler.templates():
+            field = None
+            for literal, next_field, _, _ in Formatter().parse(template):
+                if field == "duration":
+                    # A spoken duration ends in a unit word, which stays in front of the following text
+                    parts.extend(timeparse.SPOKEN_UNITS)
+                    parts.extend(f"{unit} {literal.strip()}" for unit in timeparse.SPOKEN_UNITS)
+                elif literal.strip():
+                    parts.append(literal.strip())
+                field = next_field
+    return parts
+
+# ==========================================
+# SLOT EXTRACTORS & SIDE EFFECTS
+# ==========================================
+HINDI_DAYS = ["सोमवार", "मंगलवार", "बुधवार", "बृहस्पतिवार", "शुक्रवार", "शनिवार", "रविवार"]
+DAY_NAMES = {0: "आज", 1: "कल", 2: "परसों"}
+EVENT_KEYWORDS = [
+    (("बर्थडे", "जन्मदिन"), "जन्मदिन"),
+    (("मीटिंग", "बैठक"), "मीटिंग"),
+    (("वैक्सीन", "टीका"), "वैक्सीनेशन"),
+    (("दवाई", "मेडिसिन"), "दवाई खाने"),
+]
+
+def event_name(phrase):
+    for keywords, name in EVENT_KEYWORDS:
+        if any(keyword in phrase for keyword in keywords):
+            return name
+    return "रिमाइंडर"
+
+def relay(device, state):
+    def action():
+        hardware.control_appliance(device, state)
+    return action
+
+def clock():
+    now = datetime.now()
+    return {"hour": now.hour % 12 or 12, "minute": now.minute, "day": now.day,
+            "weekday": HINDI_DAYS[now.weekday()]}
+
+def temperature():
+    return {"temp": hardware.get_temperature()}
+
+def volume(step):
+    def action():
+        if sys.platform != "win32":
+            os.system(f"pactl set-sink-volume @DEFAULT_SINK@ {step}")
+    return action
+
+# ==========================================
+# BUILT-IN HANDLER TABLE
+# ==========================================
+def register_builtin(save_event, save_scheduled_event):
+    """Registers the stock intents; the two callables are main's offline memory engine."""
+
+    def set_alarm(minutes, duration):
+        if minutes:
+            save_event("alarm", minutes, "आपका अलार्म का समय हो गया है।")
+            return {"variant": "timed"}
+        save_event("alarm", 1, "अलार्म का समय हो गया है!")
+        return {"variant": "demo"}
+
+    def set_reminder(minutes, duration, when, event):
+        if minutes and not when.day_offset:
+            save_event("reminder", minutes, f"आपके {duration} पूरे हो गए हैं।")
+            return {"variant": "timed"}
+        save_scheduled_event("reminder", timeparse.resolve_datetime(when),
+                             f"ध्यान दें! आपका {event} का समय हो गया है।")
+        return {"variant": "scheduled", "day": DAY_NAMES.get(when.day_offset or 0, "आज")}
+
+    for handler in [
+        # --- Home Automation ---
+        Handler("LIGHT_ON", "ठीक है, बत्ती चालू कर दी गई है।", action=relay("LIGHT", "ON")),
+        Handler("LIGHT_OFF", "ठीक है, मैंने बत्ती बंद कर दी है।", action=relay("LIGHT", "OFF")),
+        Handler("FAN_ON", "ठीक है, पंखा चालू कर दिया गया है।", action=relay("FAN", "ON")),
+        Handler("FAN_OFF", "ठीक है, पंखा बंद कर दिया गया है।", action=relay("FAN", "OFF")),
+        Handler("AC_ON", "ठीक है, एसी चालू कर दिया गया है।", action=relay("AC", "ON")),
+
+        # --- Time, Date & Weather ---
+        Handler("TIME_ASK", "अभी समय {hour} बजकर {minute} मिनट हो रहा है।", action=clock),
+        Handler("DATE_ASK", "आज {day} तारीख है।", action=clock),
+        Handler("DAY_ASK", "आज {weekday} है।", action=clock),
+        Handler("WEATHER_ASK", "आज मौसम साफ है और तापमान {temp} डिग्री है।", action=temperature, kind=IO),
+        Handler("TEMP_ASK", "अभी कमरे का तापमान {temp} डिग्री सेल्सियस है।", action=temperature, kind=IO),
+        Handler("RAIN_ASK", "आज बारिश की कोई संभावना नहीं है।", kind=PURE),
+
+        # --- Reminders & Alarms ---
+        Handler("ALARM_SET", {
+            "timed": "ठीक है, मैंने {duration} का अलार्म सेट कर दिया है।",
+            "demo": "आपने समय नहीं बताया, इसलिए मैंने एक मिनट का डेमो अलार्म सेट कर दिया है।",
+        }, slots={"minutes": timeparse.duration_minutes, "duration": timeparse.duration_words},
+           action=set_alarm, kind=IO),
+        Handler("REMINDER_SET", {
+            "timed": "ठीक है, मैंने {duration} का रिमाइंडर सेट कर दिया है।",
+            "scheduled": "ठीक है, मैंने {day} के लिए आपके {event} का रिमाइंडर सेव कर लिया है।",
+        }, slots={"minutes": timeparse.duration_minutes, "duration": timeparse.duration_words,
+                  "when": timeparse.parse_time, "event": event_name},
+           action=set_reminder, kind=IO),
+
+        # --- Volume Control ---
+        Handler("ALARM_STOP", "अलार्म बंद कर दिया गया है।", kind=PURE),
+        Handler("VOLUME_UP", "मैंने आवाज़ बढ़ा दी है।", action=volume("+15%"), kind=IO),
+        Handler("VOLUME_DOWN", "मैंने आवाज़ कम कर दी है।", action=volume("-15%"), kind=IO),
+
+        # --- Fallbacks ---
+        Handler("UNKNOWN_COMMAND", "माफ़ कीजिए, मैं केवल घर के उपकरणों को नियंत्रित कर सकती हूँ।", kind=PURE),
+    ]:
+        register(handler)
@@ -1,23 +1,26 @@
+import os
 import random
 import time
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from metrics import STATS
 
 # ==========================================
 # OS DETECTION & HARDWARE INIT
 # ==========================================
+# HINDIVA_MOCK_HARDWARE=1 forces the simulated path even on a Pi (replay runs, benchmarks)
+FORCE_MOCK = os.environ.get("HINDIVA_MOCK_HARDWARE") == "1"
+
 try:
+    if FORCE_MOCK:
+        raise ImportError("mock hardware requested")
     from gpiozero import OutputDevice
     import Adafruit_DHT
     
     ON_PI = True
     print("[SYSTEM] Hardware Layer: Raspberry Pi detected. GPIO Active.")
     
-    # Define GPIO Pins (BCM Numbering)
-    # Most 5V Relay modules are "Active Low". 
-    # If your relays work backwards (turn off when you say ON), change active_high to True.
-    RELAY_LIGHT = OutputDevice(17, active_high=False, initial_value=False) 
-    RELAY_FAN = OutputDevice(27, active_high=False, initial_value=False)
-    RELAY_AC = OutputDevice(22, active_high=False, initial_value=False)
-    
     DHT_SENSOR = Adafruit_DHT.DHT11
     DHT_PIN = 4 # Connected to BCM GPIO 4
 
@@ -26,36 +29,272 @@ except ImportError:
     print("[WARNING] Hardware Layer: Windows detected. Simulating GPIO for testing.")
 
 # ==========================================
-# APPLIANCE CONTROL
+# APPLIANCE CONTROL (ACTUATOR REGISTRY & COMMAND QUEUE)
 # ==========================================
+# Relay GPIO Pins (BCM Numbering)
+RELAY_PINS = {"LIGHT": 17, "FAN": 27, "AC": 22}
+# Most 5V Relay modules are "Active Low".
+# If your relays work backwards (turn off when you say ON), change this to True.
+RELAY_ACTIVE_HIGH = False
+MOCK_WRITE_SECONDS = 0.002    # What a mock relay write "costs" (a gpiozero write is ~1-2 ms)
+
+class GPIORelay:
+    def __init__(self, pin, active_high=RELAY_ACTIVE_HIGH):
+        self.pin = pin
+        self.device = OutputDevice(pin, active_high=active_high, initial_value=False)
+
+    def write(self, on):
+        self.device.on() if on else self.device.off()
+
+class MockRelay:
+    """Off-Pi relay: takes as long as a real write and counts how often it was driven."""
+
+    def __init__(self, pin, write_seconds=MOCK_WRITE_SECONDS):
+        self.pin = pin
+        self.write_seconds = write_seconds
+        self.writes = 0
+
+    def write(self, on):
+        if self.write_seconds:
+            time.sleep(self.write_seconds)
+        self.writes += 1
+
+class Actuators:
+    """Relays by name, their cached state and a coalescing command queue drained by one worker.
+
+    command() only records the wanted state and returns at once. The worker
+    takes everything pending as one batch: several commands for the same relay
+    collapse into the last one, and relays already in the wanted state are not
+    written at all. Inside `with batch():` the worker waits, so every relay of a
+    multi-command utterance switches together.
+    """
+
+    def __init__(self, stats=STATS):
+        self.stats = stats
+        self.devices = {}
+        self.applied = {}      # What the relay pins are actually set to
+        self.commanded = {}    # What was last asked for (applied or still pending)
+        self.pending = {}
+        self.holds = 0
+        self.busy = False
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def register(self, name, backend, state="OFF"):
+        with self.cond:
+            self.devices[name] = backend
+            self.applied[name] = state
+            self.commanded[name] = state
+
+    def state(self, name):
+        with self.cond:
+            return self.commanded.get(name)
+
+    def command(self, name, state):
+        """Queues a relay change; returns the previously commanded state (None for unknown devices)."""
+        with self.cond:
+            if name not in self.devices:
+                print(f"[HW-ERROR] Unknown device '{name}'")
+                return None
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="actuators", daemon=True)
+                self.thread.start()
+            previous = self.commanded[name]
+            self.commanded[name] = state
+            if name in self.pending:
+                self.stats.incr("relay_coalesced")
+            self.pending[name] = state
+            self.cond.notify_all()
+        return previous
+
+    @contextmanager
+    def batch(self):
+        with self.cond:
+            self.holds += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.holds -= 1
+                self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until every queued command has reached the pins."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending and not self.holds)
+                batch, self.pending = self.pending, {}
+                self.busy = True
+            try:
+                self._apply(batch)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def _apply(self, batch):
+        self.stats.incr("relay_batches")
+        for name, state in batch.items():
+            if self.applied[name] == state:
+                self.stats.incr("relay_skipped")
+                continue
+            try:
+                with self.stats.timer("relay_write"):
+                    self.devices[name].write(state == "ON")
+            except Exception as e:
+                self.stats.incr("relay_errors")
+                print(f"[HW-ERROR] {name} relay write failed ({e})")
+                continue
+            self.applied[name] = state
+            self.stats.incr("relay_writes")
+            print(f"[{'GPIO' if ON_PI else 'MOCK'}-EXEC] {name} relay set to {state}")
+
+ACTUATORS = Actuators()
+for _name, _pin in RELAY_PINS.items():
+    ACTUATORS.register(_name, GPIORelay(_pin) if ON_PI else MockRelay(_pin))
+
+def get_state(device):
+    return ACTUATORS.state(device)
+
+def batch():
+    """Groups the relay commands of one utterance into a single switch-over."""
+    return ACTUATORS.batch()
+
 def control_appliance(device, state):
-    """Turns physical relays ON or OFF."""
-    if ON_PI:
-        if device == "LIGHT":
-            RELAY_LIGHT.on() if state == "ON" else RELAY_LIGHT.off()
-        elif device == "FAN":
-            RELAY_FAN.on() if state == "ON" else RELAY_FAN.off()
-        elif device == "AC":
-            RELAY_AC.on() if state == "ON" else RELAY_AC.off()
-        print(f"[GPIO-EXEC] {device} relay set to {state}")
-    else:
-        print(f"[MOCK-EXEC] {device} turned {state}")
+    """Turns physical relays ON or OFF (queued). Returns the state the device was in before."""
+    return ACTUATORS.command(device, state)
 
 # ==========================================
-# SENSOR READINGS
+# SENSOR READINGS (BACKGROUND POLLER)
 # ==========================================
+SENSOR_POLL_SECONDS = 10      # DHT11 needs >= 1 s between reads; room temperature moves slower than this
+SENSOR_HISTORY = 360          # Samples kept (an hour at the default interval)
+SENSOR_MAX_AGE = 120          # Older than this and the reading is reported as stale
+FALLBACK_TEMPERATURE = 25     # Safe answer if the physical wire is loose during the demo
+
+Reading = namedtuple("Reading", ["temperature", "humidity", "age", "stale"])
+
+class DHTSensor:
+    """One DHT11 attempt per call; the poller's next tick is the retry, so nothing ever sleeps here."""
+
+    def read(self):
+        humidity, temperature = Adafruit_DHT.read(DHT_SENSOR, DHT_PIN)
+        return humidity, temperature
+
+class MockSensor:
+    """Off-Pi stand-in: a slow random walk around room temperature, optionally slow or flaky."""
+
+    def __init__(self, start=26.0, fail_rate=0.0, read_seconds=0.0, seed=None):
+        self.temperature = start
+        self.fail_rate = fail_rate
+        self.read_seconds = read_seconds
+        self.rng = random.Random(seed)
+
+    def read(self):
+        if self.read_seconds:
+            time.sleep(self.read_seconds)
+        if self.rng.random() < self.fail_rate:
+            return None, None
+        self.temperature = min(28.0, max(24.0, self.temperature + self.rng.uniform(-0.3, 0.3)))
+        return 50.0, self.temperature
+
+class SensorPoller:
+    """Samples a sensor on its own thread into a small time-series ring buffer.
+
+    latest() never touches the sensor: it returns the newest sample with its
+    age, flagged stale past max_age, so a voice reply never waits on the DHT.
+    """
+
+    def __init__(self, sensor, interval=SENSOR_POLL_SECONDS, history=SENSOR_HISTORY, max_age=SENSOR_MAX_AGE,
+                 stats=STATS):
+        self.sensor = sensor
+        self.interval = interval
+        self.max_age = max_age
+        self.stats = stats
+        self.samples = deque(maxlen=history)   # (monotonic time, temperature, humidity)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="sensor-poller", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.poll()
+            self.stopped.wait(self.interval)
+
+    def poll(self):
+        start = time.perf_counter()
+        try:
+            humidity, temperature = self.sensor.read()
+        except Exception:
+            humidity, temperature = None, None
+        self.stats.observe("sensor_read", time.perf_counter() - start)
+
+        with self.lock:
+            if temperature is None:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.stats.incr("sensor_failures")
+                return False
+            self.consecutive_failures = 0
+            self.samples.append((time.monotonic(), temperature, humidity))
+        self.stats.incr("sensor_reads")
+        return True
+
+    def latest(self):
+        """Newest Reading, or None before the first successful sample."""
+        with self.lock:
+            if not self.samples:
+                return None
+            taken_at, temperature, humidity = self.samples[-1]
+        age = time.monotonic() - taken_at
+        return Reading(temperature, humidity, age, age > self.max_age)
+
+    def history(self):
+        """[(age seconds, temperature, humidity)], oldest first."""
+        now = time.monotonic()
+        with self.lock:
+            return [(now - taken_at, temperature, humidity) for taken_at, temperature, humidity in self.samples]
+
+    def stop(self):
+        self.stopped.set()
+
+_poller = None
+_poller_lock = threading.Lock()
+
+def set_sensor(sensor, interval=SENSOR_POLL_SECONDS):
+    """Swaps in another sensor (e.g. MockSensor(fail_rate=0.5)) and restarts polling."""
+    global _poller
+    with _poller_lock:
+        if _poller is not None:
+            _poller.stop()
+        _poller = SensorPoller(sensor, interval).start()
+    return _poller
+
+def get_poller():
+    """The running poller, started on first use with the real DHT11 or the mock."""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = SensorPoller(DHTSensor() if ON_PI else MockSensor()).start()
+        return _poller
+
 def get_temperature():
-    """Reads live data from DHT11 sensor."""
-    if ON_PI:
-        # DHT11 sensors can occasionally drop a reading, read_retry tries up to 15 times safely
-        humidity, temperature = Adafruit_DHT.read_retry(DHT_SENSOR, DHT_PIN)
-        if temperature is not None:
-            print(f"[GPIO-READ] Sensor read {temperature} C")
-            return int(temperature)
-        else:
-            print("[GPIO-ERROR] Failed to read sensor. Using fallback.")
-            return 25 # Safe fallback if the physical wire is loose during the demo
-    else:
-        mock_temp = random.randint(24, 28)
-        print(f"[MOCK-READ] Read {mock_temp} C")
-        return mock_temp
\ No newline at end of file
+    """Latest polled DHT11 temperature; returns immediately, never reads the sensor itself."""
+    reading = get_poller().latest()
+    if reading is None or reading.stale:
+        STATS.incr("sensor_fallbacks")
+        print("[SENSOR-ERROR] No fresh reading. Using fallback.")
+        return FALLBACK_TEMPERATURE
+    print(f"[SENSOR-READ] {reading.temperature:.1f} C ({reading.age:.0f} s old)")
+    return int(reading.temperature)
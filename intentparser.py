@@ -1,21 +1,67 @@
 import os
-import re
-from rapidfuzz import process, fuzz
+import json
+import time
+import threading
+from collections import OrderedDict
+import snapshot
+from metrics import STATS
+from textnorm import normalize_text, split_commands, CHAR_FOLDS, HINGLISH_WORDS
 
 # ==========================================
 # LOCAL AI ENGINE INITIALIZATION (SARVAM-1)
 # ==========================================
-try:
-    from llama_cpp import Llama
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    MODEL_PATH = os.path.join(BASE_DIR, "llm_model", "sarvam.gguf")
-    print("🚀 [BRAIN] Booting Sarvam-1 Neural Engine...")
-    # n_ctx=512 limits RAM usage so the Raspberry Pi 4 doesn't crash
-    llm = Llama(model_path=MODEL_PATH, n_ctx=512, n_threads=4, verbose=False)
-    print("✅ [BRAIN] Sarvam-1 Loaded Successfully!\n")
-except Exception as e:
-    print(f"⚠️ [BRAIN WARNING]: Could not load Sarvam AI ({e}). Running in Regex-only mode.\n")
-    llm = None
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "llm_model", "sarvam.gguf")
+
+class LLMLoader:
+    """Loads Sarvam-1 on a background thread behind a readiness handle.
+
+    The model is only needed for the rare low-confidence phrase, so nothing
+    waits for it: get() returns None until it is ready and callers fall back
+    to fuzzy-only results.
+    """
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self.load_seconds = None
+        self.loaded = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._load, name="sarvam-loader", daemon=True)
+                self.thread.start()
+        return self
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            from llama_cpp import Llama
+            print("🚀 [BRAIN] Booting Sarvam-1 Neural Engine in the background...")
+            # n_ctx=512 limits RAM usage so the Raspberry Pi 4 doesn't crash. The weights are
+            # mmapped read-only: they live in the page cache, shared with anything else mapping the gguf
+            self.model = Llama(model_path=self.model_path, n_ctx=512, n_threads=4, use_mmap=True, verbose=False)
+            self.load_seconds = time.perf_counter() - start
+            print(f"✅ [BRAIN] Sarvam-1 Loaded Successfully! ({self.load_seconds:.1f} s)\n")
+        except Exception as e:
+            print(f"⚠️ [BRAIN WARNING]: Could not load Sarvam AI ({e}). Running in Regex-only mode.\n")
+        finally:
+            self.loaded.set()
+
+    def ready(self):
+        return self.loaded.is_set() and self.model is not None
+
+    def get(self, wait=False):
+        """The model, or None while it is still loading (or failed). Starts loading on first use."""
+        self.start()
+        if wait:
+            self.loaded.wait()
+        return self.model if self.loaded.is_set() else None
+
+llm_loader = LLMLoader()
 
 # ==========================================
 # TIER 0: THE TITANIUM DEVANAGARI TAXONOMY
@@ -36,7 +82,7 @@ COMMAND_REGISTRY = {
     ],
     "FAN_ON": [
         "पंखा चलाओ", "फैन ऑन करो", "पंखा चालू करो", "फैन चला दो", 
-        "पंखा ऑन कर do", "पंखा खोल दो", "फैन चालू कर दो", "हवा चलाओ",
+        "पंखा ऑन कर दो", "पंखा खोल दो", "फैन चालू कर दो", "हवा चलाओ",
         "पंखा चला दे", "फैन ऑन कर दे", "पंखा ऑन कर", "फैन चलाना"
     ],
     "FAN_OFF": [
@@ -102,84 +148,561 @@ COMMAND_REGISTRY = {
     ]
 }
 
+# Everyday speech that is none of the above. The classifier learns it as UNKNOWN_COMMAND, so an
+# out-of-domain phrase lands there instead of on whichever intent shares the most n-grams.
+OUT_OF_DOMAIN_PHRASES = [
+    "मम्मी को बुलाओ", "पापा को बुला दो", "भैया को आवाज़ दो", "दीदी को फोन लगाओ", "दरवाज़ा खोलो",
+    "पानी लाओ", "चाय बना दो", "खाना लगा दो", "खाना खा लो", "दूध गरम कर दो",
+    "मेरा नाम अमित है", "तुम्हारा नाम क्या है", "तुम कौन हो", "मैं ठीक हूँ", "तुम कैसे हो",
+    "नमस्ते", "धन्यवाद", "शुक्रिया", "हाँ ठीक है", "नहीं रहने दो",
+    "कोई बात नहीं", "एक चुटकुला सुनाओ", "गाना गाओ", "कहानी सुनाओ", "मुझे भूख लगी है",
+    "मुझे नींद आ रही है", "बाज़ार चलते हैं", "गाड़ी निकालो", "कपड़े धो दो", "बर्तन साफ करो",
+    "किताब पढ़ो", "होमवर्क कर लो", "स्कूल जाना है", "ऑफिस के लिए देर हो गई", "बच्चे सो गए",
+    "कुत्ते को खाना दो", "बिल्ली बाहर है", "मैं घर आ गया", "वह कल आएगा", "उसका फोन बंद है",
+    "क्रिकेट का स्कोर क्या है", "भारत की राजधानी क्या है", "दो और दो कितने होते हैं", "मुझे पैसे चाहिए",
+    "सब्ज़ी ले आओ", "जल्दी आओ", "इधर आओ", "बाहर जाओ", "यह क्या है", "मुझे कुछ नहीं पता",
+]
+
 # ==========================================
-# UTILITY FUNCTIONS
+# FLATTENED PHRASE INDEX (BUILT ONCE)
 # ==========================================
-def normalize_text(text):
-    text = re.sub(r'[^\w\s\u0900-\u097F]', '', text)
-    return text.lower().strip()
+FUZZY_THRESHOLD = 60   # Below this the phrase goes to the LLM fallback
+# Relay intents need a closer match: out-of-domain speech ("चाय बना दो" -> FAN_ON) scores up to 70
+# against them. Between the two thresholds the classifier has to agree with the fuzzy tier
+FUZZY_ACTUATE_THRESHOLD = 75
+FUZZY_CUTOFF = 40      # Candidates under this are clearly losing and are not scored further
+CDIST_WORKERS = -1     # Spread the phrases of one utterance over all cores...
+CDIST_PARALLEL_MIN = 500   # ...once the registry is this big; below it a row scores in well under 1 ms
+                           # and starting the thread pool costs more than it saves
+PREFILTER_MIN = 2000   # Registry size where the bigram prefilter starts paying for itself
+PREFILTER_TOP_K = 64   # Candidates per phrase that get the real fuzzy score
+
+def token_set_key(text):
+    """token_set_ratio ignores word order and repeats, so this is all it ever sees of a phrase.
+
+    Registry phrases and queries both go through normalize_text, so spelling
+    variants (आवाज़/आवाज, पाँच/पांच, "light on"/"लाइट ऑन") share one key.
+    """
+    return " ".join(sorted(set(normalize_text(text).split())))
+
+def char_bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def index_tables(registry):
+    """(phrases, labels, token_ids, exact): the plain tables behind PhraseIndex, cheap to snapshot."""
+    phrases, labels, token_ids, exact = [], [], {}, {}
+    for intent, registry_phrases in registry.items():
+        for phrase in registry_phrases:
+            key = token_set_key(phrase)
+            if not key:
+                continue
+            ids = tuple(sorted(token_ids.setdefault(token, len(token_ids)) for token in key.split()))
+            if ids not in exact:
+                exact[ids] = len(phrases)
+                phrases.append(key)
+                labels.append(intent)
+    return phrases, labels, token_ids, exact
+
+class PhraseIndex:
+    """Every registry phrase, pre-normalized, in one flat list with a parallel intent-label list.
+
+    Phrases with the same canonical token set are stored once (the first
+    intent in registry order wins a tie, exactly as the per-intent loop did).
+    Every registry token gets an integer id; a query whose token-id set is
+    exactly a registry phrase's resolves with one dict lookup and never
+    reaches the scorer. Large registries also get a character-bigram inverted
+    index so a query only fuzzy-scores the few phrases it actually overlaps with.
+    """
+
+    def __init__(self, tables, version):
+        self.version = version
+        self.phrases, self.labels, self.token_ids, self.exact = tables
+
+        self.postings = None
+        if len(self.phrases) >= PREFILTER_MIN:
+            import numpy as np
+            postings = {}
+            self.sizes = np.zeros(len(self.phrases))
+            for i, phrase in enumerate(self.phrases):
+                grams = char_bigrams(phrase)
+                self.sizes[i] = max(len(grams), 1)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(i)
+            self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def candidates(self, key):
+        """Ids of the PREFILTER_TOP_K phrases with the highest bigram containment either way."""
+        import numpy as np
+        grams = char_bigrams(key)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.phrases))
+        overlap = np.maximum(hits / self.sizes, hits / max(len(grams), 1))
+        k = min(PREFILTER_TOP_K, len(self.phrases))
+        return np.sort(np.argpartition(-overlap, k - 1)[:k])
+
+    def lookup(self, key):
+        """Index of the registry phrase with exactly this token set, or None."""
+        ids = []
+        for token in key.split():
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                return None
+            ids.append(token_id)
+        return self.exact.get(tuple(sorted(ids)))
+
+REGISTRY_VERSION = 0
+_phrase_index = None
+
+def register_phrases(intent, phrases):
+    """Adds phrases (and possibly a new intent) to the registry; the index rebuilds on next use."""
+    global REGISTRY_VERSION
+    COMMAND_REGISTRY.setdefault(intent, []).extend(phrases)
+    REGISTRY_VERSION += 1
+
+def get_phrase_index():
+    """The index for the current registry; its tables come from the boot snapshot when they still match."""
+    global _phrase_index
+    if _phrase_index is None or _phrase_index.version != REGISTRY_VERSION:
+        tables = snapshot.cached("phrase_index", (COMMAND_REGISTRY, CHAR_FOLDS, HINGLISH_WORDS),
+                                 lambda: index_tables(COMMAND_REGISTRY))
+        _phrase_index = PhraseIndex(tables, REGISTRY_VERSION)
+    return _phrase_index
+
+def match_phrases(phrases):
+    """Scores every phrase of an utterance against the registry in one cdist call.
+
+    Returns one (best_intent, score) pair per phrase; best_intent is None when
+    nothing cleared FUZZY_CUTOFF.
+    """
+    from rapidfuzz import process, fuzz
+    index = get_phrase_index()
+    keys = [token_set_key(phrase) for phrase in phrases]
 
-def split_commands(text):
-    parts = re.split(r'\s+(और|तथा|फिर|and)\s+', text)
-    commands = [p.strip() for p in parts if p.strip() not in ['और', 'तथा', 'फिर', 'and'] and p.strip()]
-    return commands
+    # Exact canonical matches need no scoring at all
+    ranked = [None] * len(keys)
+    for i, key in enumerate(keys):
+        j = index.lookup(key)
+        if j is not None:
+            ranked[i] = (j, 100.0)
+    pending = [i for i, match in enumerate(ranked) if match is None]
+
+    if pending and index.postings is None:
+        parallel = len(pending) > 1 and len(index.phrases) >= CDIST_PARALLEL_MIN
+        scores = process.cdist([keys[i] for i in pending], index.phrases, scorer=fuzz.token_set_ratio,
+                               score_cutoff=FUZZY_CUTOFF, workers=CDIST_WORKERS if parallel else 1)
+        for row, (i, j) in enumerate(zip(pending, scores.argmax(axis=1))):
+            ranked[i] = (int(j), float(scores[row, j]))
+    else:
+        for i in pending:
+            ids = index.candidates(keys[i])
+            if not len(ids):
+                ranked[i] = (0, 0.0)
+                continue
+            scores = process.cdist([keys[i]], [index.phrases[j] for j in ids], scorer=fuzz.token_set_ratio,
+                                   score_cutoff=FUZZY_CUTOFF)[0]
+            best = scores.argmax()
+            ranked[i] = (int(ids[best]), float(scores[best]))
+
+    return [(index.labels[j] if score > 0 else None, score) for j, score in ranked]
+
+def intent_lead(phrase):
+    """(best_intent, score, lead) for one phrase, lead being the margin over the best other intent.
+
+    A partial hypothesis like "बत्ती" scores 100 for both LIGHT_ON and LIGHT_OFF;
+    the lead is what tells speculative dispatch it is not yet safe to act.
+    """
+    from rapidfuzz import process, fuzz
+    index = get_phrase_index()
+    key = token_set_key(phrase)
+    ids = range(len(index.phrases)) if index.postings is None else index.candidates(key)
+    if not len(ids):
+        return None, 0.0, 0.0
+    scores = process.cdist([key], [index.phrases[i] for i in ids], scorer=fuzz.token_set_ratio,
+                           score_cutoff=FUZZY_CUTOFF)[0]
+    best = int(scores.argmax())
+    if scores[best] == 0:
+        return None, 0.0, 0.0
+    label = index.labels[ids[best]]
+    rival = max((float(score) for score, i in zip(scores, ids) if index.labels[i] != label), default=0.0)
+    return label, float(scores[best]), float(scores[best]) - rival
 
 # ==========================================
-# THE LLM FALLBACK PARSER
+# LLM RESULT CACHE (PERSISTED LRU)
 # ==========================================
-def llm_intent_parser(phrase):
-    """Forces Sarvam-1 to act strictly as a fallback intent classifier."""
-    if not llm: return "UNKNOWN_COMMAND"
-    print(f"   [SARVAM-1] Analyzing heavy slang: '{phrase}'...")
-    
+LLM_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.json")
+LLM_CACHE_SIZE = 512
+
+LLM_STATS = {"calls": 0, "cache_hits": 0, "cache_misses": 0, "not_ready": 0,
+             "prompt_tokens_evaluated": 0, "prefix_tokens_reused": 0, "decode_tokens": 0}
+
+class IntentCache:
+    """normalized phrase -> [intent, confidence], least recently used evicted first, saved to disk."""
+
+    def __init__(self, path=LLM_CACHE_FILE, max_size=LLM_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def get(self, phrase):
+        if phrase not in self.entries:
+            return None
+        self.entries.move_to_end(phrase)
+        return self.entries[phrase]
+
+    def put(self, phrase, intent):
+        self.entries[phrase] = intent
+        self.entries.move_to_end(phrase)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+llm_cache = IntentCache()
+
+def llm_stats():
+    """Counters plus the derived hit rate and tokens evaluated per real model call."""
+    stats = dict(LLM_STATS)
+    stats["hit_rate"] = stats["cache_hits"] / stats["calls"] if stats["calls"] else 0.0
+    misses = stats["cache_misses"] or 1
+    stats["tokens_per_call"] = (stats["prompt_tokens_evaluated"] + stats["decode_tokens"]) / misses
+    return stats
+
+# ==========================================
+# PROMPT PREFIX REUSE (KV STATE)
+# ==========================================
+def build_prompt_prefix():
     # Join all valid commands dynamically so the AI knows its options
     valid_commands_str = ", ".join(COMMAND_REGISTRY.keys())
-    
-    prompt = f"""You are the central intelligence of an offline smart home system. 
+    return f"""You are the central intelligence of an offline smart home system. 
 Classify the following Hindi/Hinglish user phrase into EXACTLY ONE of these hardware commands: 
 [{valid_commands_str}, UNKNOWN_COMMAND]
 
-Phrase: {phrase}
-Command:"""
-    
-    output = llm(prompt, max_tokens=15, stop=["\n", "Phrase:"], echo=False)
-    result = output['choices'][0]['text'].strip().upper()
-    
-    for cmd in COMMAND_REGISTRY.keys():
-        if cmd in result:
-            print(f"   [SARVAM-1] Successfully mapped to -> {cmd}")
-            return cmd
-            
-    return "UNKNOWN_COMMAND"
+Phrase:"""
+
+_prefix = {"text": None, "tokens": None, "state": None}
+
+def _eval_prompt(llm, phrase):
+    """Evaluates the prompt for one phrase, reusing the fixed prefix's KV state.
+
+    The prefix is tokenized and evaluated once; per call the context is
+    rewound to the end of the prefix and only the phrase tokens are evaluated.
+    """
+    prefix_text = build_prompt_prefix()
+    if _prefix["text"] != prefix_text:
+        tokens = llm.tokenize(prefix_text.encode("utf-8"))
+        llm.reset()
+        llm.eval(tokens)
+        _prefix.update(text=prefix_text, tokens=tokens, state=llm.save_state())
+
+    prefix_tokens = _prefix["tokens"]
+    n_prefix = len(prefix_tokens)
+    if llm.n_tokens < n_prefix or list(llm.input_ids[:n_prefix]) != prefix_tokens:
+        llm.load_state(_prefix["state"])
+    llm.n_tokens = n_prefix   # eval() drops the KV cells past this point
+
+    suffix_tokens = llm.tokenize(f" {phrase}\nCommand:".encode("utf-8"), add_bos=False)
+    llm.eval(suffix_tokens)
+    LLM_STATS["prefix_tokens_reused"] += n_prefix
+    LLM_STATS["prompt_tokens_evaluated"] += len(suffix_tokens)
 
 # ==========================================
-# THE HYBRID ENGINE (FUZZY + AI)
+# CONSTRAINED LABEL SCORING
 # ==========================================
-def parse_multiple_intents(text):
-    normalized_text = normalize_text(text)
-    command_phrases = split_commands(normalized_text)
-    
-    results = []
-    
-    for phrase in command_phrases:
-        best_match = None
-        highest_score = 0
-        
-        # 1. Try RapidFuzz First (Fast & Lightweight)
-        for intent, phrases in COMMAND_REGISTRY.items():
-            match = process.extractOne(phrase, phrases, scorer=fuzz.token_set_ratio)
-            if match:
-                score = match[1]
-                if score > highest_score:
-                    highest_score = score
-                    best_match = intent
-                    
-        if highest_score >= 60:  
-            results.append({"intent": best_match, "confidence": round(highest_score, 2), "phrase": phrase})
-        else:
-            # 2. Trigger AI Fallback (If RapidFuzz is confused)
-            llm_intent = llm_intent_parser(phrase)
-            if llm_intent != "UNKNOWN_COMMAND":
-                results.append({"intent": llm_intent, "confidence": 99.9, "phrase": phrase})
+LLM_LOCK = threading.Lock()   # Serializes every use of the llama context and the cache
+LLM_MIN_CONFIDENCE = 50.0   # Below this the LLM's pick is treated as UNKNOWN_COMMAND
+
+_label_trie = {"labels": None, "root": None, "end": None}
+
+def _collapse(node):
+    """Replaces every subtree that leads to a single label with that label.
+
+    The None child marks where a label ends. It stays in place when the node
+    also continues into longer labels, so a label whose tokens are a prefix
+    of another's can still be chosen.
+    """
+    labels = set()
+    def collect(n):
+        for key, child in n.items():
+            if key is None:
+                labels.add(child)
             else:
-                results.append({"intent": "UNKNOWN_COMMAND", "confidence": round(highest_score, 2), "phrase": phrase})
-            
-    return results
+                collect(child)
+    collect(node)
+    if len(labels) == 1:
+        return labels.pop()
+    return {key: child if key is None else _collapse(child) for key, child in node.items()}
+
+def get_label_trie(llm, labels=None):
+    """(trie, end token): token trie of every allowed answer (the registry keys plus UNKNOWN_COMMAND)
+    and the token that stands for its None end markers, the newline that closes an answer."""
+    labels = labels or list(COMMAND_REGISTRY.keys()) + ["UNKNOWN_COMMAND"]
+    if _label_trie["labels"] != labels:
+        root = {}
+        for label in labels:
+            node = root
+            for token in llm.tokenize(f" {label}".encode("utf-8"), add_bos=False):
+                node = node.setdefault(token, {})
+            node[None] = label
+        _label_trie.update(labels=labels, root=_collapse(root), end=llm.tokenize(b"\n", add_bos=False)[-1])
+    return _label_trie["root"], _label_trie["end"]
+
+def _next_token_logits(llm):
+    """Logits for the token after the last one evaluated, read straight from the llama context.
+
+    Llama.eval() only copies logits into llm.scores when the context was built
+    with logits_all=True, which would hold n_ctx x n_vocab floats for the one
+    row this needs; without it llm.scores stays zero.
+    """
+    import numpy as np
+    import llama_cpp
+    logits = llama_cpp.llama_get_logits_ith(llm._ctx.ctx, -1)
+    return np.ctypeslib.as_array(logits, shape=(llm.n_vocab(),))
+
+def _score_labels(llm, labels=None):
+    """Greedy decode restricted to the label trie.
+
+    Only branch points cost a decode step: the next-token logits are
+    softmaxed over the allowed children (ending the label scores as the end
+    token), and the product of those choices is the label's probability
+    under the constrained decoder.
+    """
+    import numpy as np
+    node, end = get_label_trie(llm, labels)
+    probability = 1.0
+    pending = []
+    while isinstance(node, dict):
+        options = list(node)
+        if len(options) == 1:
+            # No choice here; evaluate it together with the next branch point
+            pending.append(options[0])
+            node = node[options[0]]
+            continue
+        if pending:
+            llm.eval(pending)
+            LLM_STATS["decode_tokens"] += len(pending)
+            pending = []
+        token_ids = [end if option is None else option for option in options]
+        logits = np.asarray(_next_token_logits(llm), dtype=np.float64)[token_ids]
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        probability *= float(probs[best])
+        node = node[options[best]]
+        if options[best] is not None:
+            pending.append(options[best])
+    return node, probability
+
+# ==========================================
+# THE LLM FALLBACK PARSER
+# ==========================================
+def llm_intent_parser(phrase):
+    """Forces Sarvam-1 to pick exactly one registry label; returns (intent, confidence %)."""
+    key = " ".join(phrase.split())
+    # One llama context and one cache file: phrases resolved on parallel workers take turns here
+    with LLM_LOCK:
+        LLM_STATS["calls"] += 1
+
+        cached = llm_cache.get(key)
+        if isinstance(cached, list):
+            LLM_STATS["cache_hits"] += 1
+            print(f"   [SARVAM-1] Cache hit: '{phrase}' -> {cached[0]}")
+            return cached[0], cached[1]
+
+        llm = llm_loader.get()
+        if llm is None:
+            if not llm_loader.loaded.is_set():
+                LLM_STATS["not_ready"] += 1
+                print(f"   [SARVAM-1] Still loading, fuzzy-only result for '{phrase}'")
+            return "UNKNOWN_COMMAND", 0.0
+        LLM_STATS["cache_misses"] += 1
+
+        print(f"   [SARVAM-1] Analyzing heavy slang: '{phrase}'...")
+        with STATS.timer("llm_fallback"):
+            _eval_prompt(llm, key)
+            intent, probability = _score_labels(llm)
+        confidence = round(probability * 100, 2)
+        print(f"   [SARVAM-1] Mapped to -> {intent} ({confidence}%)")
+
+        llm_cache.put(key, [intent, confidence])
+        return intent, confidence
+
+# ==========================================
+# TIER 2: N-GRAM CLASSIFIER (BETWEEN FUZZY AND LLM)
+# ==========================================
+CLASSIFIER_PATH = os.path.join(BASE_DIR, "intent_classifier.bin")
+CLASSIFIER_MIN_PROBABILITY = 0.50   # Calibrated probability the classifier needs to answer on its own
+CLASSIFIER_AGREE_PROBABILITY = 0.25 # ...and to back a relay match between the two fuzzy thresholds
+CLASSIFIER_MIN_COVERAGE = 0.40      # Share of the phrase's n-gram mass seen in training
+# Intents that switch a relay: the classifier only gets to pick one if the fuzzy tier's best guess agrees
+ACTUATING_INTENTS = {"LIGHT_ON", "LIGHT_OFF", "FAN_ON", "FAN_OFF", "AC_ON"}
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_classifier_trainer = None   # Background retrain after a registry change
+
+def logged_utterances():
+    """Phrases the LLM has already labelled with confidence (UNKNOWN_COMMAND included), from its persisted cache."""
+    return [(phrase, entry[0]) for phrase, entry in list(llm_cache.entries.items())
+            if isinstance(entry, list) and entry[1] >= LLM_MIN_CONFIDENCE]
+
+def training_registry():
+    """COMMAND_REGISTRY plus the reject class the classifier is trained and fingerprinted on."""
+    return {**COMMAND_REGISTRY, "UNKNOWN_COMMAND": OUT_OF_DOMAIN_PHRASES}
+
+def train_classifier(path=CLASSIFIER_PATH):
+    """Retrains from COMMAND_REGISTRY, OUT_OF_DOMAIN_PHRASES and the LLM's logged answers and saves the weights."""
+    global _classifier
+    from classifier import IntentClassifier, train
+    model = train(training_registry(), logged_utterances())
+    try:
+        model.save(path)
+        model = IntentClassifier.load(path)
+    except OSError as e:
+        print(f"⚠️ [CLASSIFIER]: Could not save {path} ({e}); keeping it in memory")
+    with _classifier_lock:
+        _classifier = model
+    return model
+
+def get_classifier(wait=False):
+    """The memory-mapped classifier, or None while it retrains on a changed registry.
+
+    Retraining runs on a background thread, like the Sarvam-1 load, so the
+    command that notices a new plugin phrase is not held up by it; wait=True
+    (boot warm-up, build step) blocks until the model is ready instead.
+    """
+    global _classifier, _classifier_trainer
+    from classifier import IntentClassifier, registry_fingerprint
+    fingerprint = registry_fingerprint(training_registry())
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = IntentClassifier.load(CLASSIFIER_PATH)
+        if _classifier is not None and _classifier.fingerprint == fingerprint:
+            return _classifier
+        if _classifier_trainer is None or not _classifier_trainer.is_alive():
+            print("   [CLASSIFIER] Training on the current registry in the background...")
+            _classifier_trainer = threading.Thread(target=train_classifier, name="classifier-trainer", daemon=True)
+            _classifier_trainer.start()
+        trainer = _classifier_trainer
+    if not wait:
+        return None
+    trainer.join()
+    return _classifier
+
+def classifier_prediction(phrase):
+    """(intent, probability 0-1, coverage 0-1) from the classifier, or None while it retrains."""
+    model = get_classifier()
+    if model is None:
+        return None
+    with STATS.timer("classifier"):
+        return model.predict(phrase)
+
+def classify_intent(phrase, fuzzy_match=None, prediction=None):
+    """(intent, probability %) from the middle tier, or (None, probability %) when it is unsure.
+
+    Out-of-domain phrases and relay intents the fuzzy tier's best guess
+    (`fuzzy_match`) does not back up are left to the LLM. `prediction` is a
+    classifier_prediction() the caller already made for this phrase.
+    """
+    prediction = prediction or classifier_prediction(phrase)
+    if prediction is None:
+        STATS.incr("classifier_not_ready")
+        return None, 0.0
+    intent, probability, coverage = prediction
+    if probability < CLASSIFIER_MIN_PROBABILITY or coverage < CLASSIFIER_MIN_COVERAGE:
+        STATS.incr("classifier_unsure")
+        return None, round(probability * 100, 2)
+    if intent == "UNKNOWN_COMMAND":
+        STATS.incr("classifier_rejects")
+        return None, round(probability * 100, 2)
+    if intent in ACTUATING_INTENTS and intent != fuzzy_match:
+        STATS.incr("classifier_unbacked")
+        return None, round(probability * 100, 2)
+    STATS.incr("classifier_hits")
+    return intent, round(probability * 100, 2)
+
+# ==========================================
+# THE HYBRID ENGINE (FUZZY + CLASSIFIER + AI)
+# ==========================================
+def fuzzy_candidates(text):
+    """(phrase, best_intent, score) for every phrase of an utterance, from one cdist pass."""
+    command_phrases = split_commands(normalize_text(text))
+    if not command_phrases:
+        return []
+    return [(phrase, best_match, highest_score)
+            for phrase, (best_match, highest_score) in zip(command_phrases, match_phrases(command_phrases))]
+
+def fuzzy_is_sure(best_match, highest_score):
+    """Whether a fuzzy match stands without asking another tier (relay intents need a closer one)."""
+    threshold = FUZZY_ACTUATE_THRESHOLD if best_match in ACTUATING_INTENTS else FUZZY_THRESHOLD
+    return highest_score >= threshold
+
+def resolve_intent(phrase, best_match, highest_score):
+    """The intent dict for one phrase: the fuzzy match when it is confident, else the
+    classifier's when it is, else the LLM's pick."""
+    fuzzy = {"intent": best_match, "confidence": round(highest_score, 2), "phrase": phrase}
+    prediction = None
+    # 1. Trust RapidFuzz when it is sure; a looser relay match stands only if the classifier agrees
+    if fuzzy_is_sure(best_match, highest_score):
+        return fuzzy
+    if highest_score >= FUZZY_THRESHOLD:
+        prediction = classifier_prediction(phrase)
+        if prediction is not None and prediction[0] == best_match and prediction[1] >= CLASSIFIER_AGREE_PROBABILITY:
+            STATS.incr("fuzzy_backed")
+            return fuzzy
+        STATS.incr("fuzzy_unbacked")
+
+    # 2. Sub-millisecond n-gram classifier
+    classified, probability = classify_intent(phrase, best_match, prediction)
+    if classified is not None:
+        return {"intent": classified, "confidence": probability, "phrase": phrase}
+
+    # 3. Trigger AI Fallback (If both cheaper tiers are confused)
+    llm_intent, llm_confidence = llm_intent_parser(phrase)
+    if llm_intent != "UNKNOWN_COMMAND" and llm_confidence >= LLM_MIN_CONFIDENCE:
+        return {"intent": llm_intent, "confidence": llm_confidence, "phrase": phrase}
+    return {"intent": "UNKNOWN_COMMAND", "confidence": round(highest_score, 2), "phrase": phrase}
+
+def parse_multiple_intents(text):
+    return [resolve_intent(*candidate) for candidate in fuzzy_candidates(text)]
+
+def warm_up():
+    """Imports rapidfuzz/numpy and loads the phrase index and classifier ahead of the first command.
+
+    main.py runs this beside the Vosk model load, whose native loader does not hold the GIL.
+    """
+    import rapidfuzz.process
+    get_phrase_index()
+    get_classifier(wait=True)
 
 if __name__ == "__main__":
+    # With main.py (or modelhost.py) running, ask its already-loaded models instead of loading Sarvam-1 again
+    from modelhost import ModelClient
+    host = ModelClient.connect("intentparser")
     test_query = "यहाँ सांस घुट रही है कुछ चालू कर और कल का अलार्म लगाओ"
     print(f"\n🗣️ Input: '{test_query}'")
-    result = parse_multiple_intents(test_query)
+    if host is not None:
+        result = host.classify(test_query)
+    else:
+        llm_loader.get(wait=True)
+        result = parse_multiple_intents(test_query)
     print("\n✅ Extracted Intents:")
     for res in result:
-        print(f" - Command: '{res['phrase']}' -> Intent: {res['intent']} (Confidence: {res['confidence']}%)")
\ No newline at end of file
+        print(f" - Command: '{res['phrase']}' -> Intent: {res['intent']} (Confidence: {res['confidence']}%)")
+
+    if host is not None:
+        print("\n🔗 Resolved by the model host (its LLM counters are in its metrics)")
+        host.close()
+    else:
+        stats = llm_stats()
+        print(f"\n📊 LLM: {stats['calls']} calls, hit rate {stats['hit_rate']:.0%}, "
+              f"{stats['tokens_per_call']:.1f} tokens evaluated per model call "
+              f"({stats['prefix_tokens_reused']} prefix tokens reused)")
@@ -1,48 +1,69 @@
 import os
 import sys
-import json
-import pyaudio
-import subprocess
 import threading
 import time
-import re
+PROCESS_START = time.perf_counter()   # Before the imports below, so time-to-listening counts them
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from vosk import Model, KaldiRecognizer
-from intentparser import parse_multiple_intents
+from intentparser import fuzzy_candidates, fuzzy_is_sure, resolve_intent, warm_up, llm_loader, LLM_STATS
 import hardware 
+import tts
+import handlers
+import snapshot
+from eventstore import EventStore, Scheduler
+from capture import RingBuffer, MicSource, WavReplaySource
+from pipeline import VoiceSession, WAKE_WORDS
+from speculate import Speculator
+from grammar import CommandGrammar
+from metrics import STATS, MetricsWriter, Profiler
+from modelhost import ModelHost, print_memory_report
 
 # ==========================================
 # CONFIGURATION & BLUETOOTH OPTIMIZATION
 # ==========================================
 VOSK_MODEL_PATH = "vosk"
-PIPER_MODEL = "hi_IN-pratham-medium.onnx"
-WAKE_WORDS = ["सुनो", "नमस्ते"]
-
-if sys.platform == "win32":
-    PIPER_EXE = "piper\\piper.exe"
-    PLAY_CMD = "start /wait response.wav"
-else:
-    PIPER_EXE = "./piper/piper"
-    PLAY_CMD = "paplay response.wav" 
+VAD_GATE = True   # Only wake the Kaldi decoder for chunks that sound like speech
+SINGLE_STREAM = True   # "सुनो बत्ती जलाओ" in one breath; a chime replaces the spoken acknowledgement
+SPECULATE = True   # Switch relays on stable partial results instead of waiting for the endpoint
+COMMAND_GRAMMAR = True   # Decode commands against the registry vocabulary; free-form only on [unk]
+WAKE_ACK = "हाँ क्वार्क, बताइये?"
+METRICS_FILE = os.environ.get("HINDIVA_METRICS_FILE", "metrics.prom")   # Prometheus textfile; "" turns it off
+METRICS_SECONDS = 15
+PROFILE_FILE = "hindiva.prof"          # `python main.py --profile`: cProfile of every pipeline thread...
+TRACE_FILE = "hindiva_trace.json"      # ...plus the recent spans as Chrome trace events
+MODEL_HOST = True   # Serve the loaded models to mictest/speaker/intentparser on modelhost.SOCKET_PATH
 
 # ==========================================
 # TEXT-TO-SPEECH (PIPER)
 # ==========================================
-def speak_hindi(text):
-    print(f"⚙️ Synthesizing: '{text}'")
-    command = [PIPER_EXE, "-m", PIPER_MODEL, "--output_file", "response.wav"]
-    try:
-        subprocess.run(
-            command, 
-            input=text.encode('utf-8'),
-            stdout=subprocess.DEVNULL, 
-            stderr=subprocess.DEVNULL,
-            check=True
-        )
-        os.system(PLAY_CMD)
-        print("✅ Audio played.\n")
-    except subprocess.CalledProcessError:
-        print("❌ Piper TTS Engine failed to synthesize audio.")
+# Set while the speaker is busy so the recognizer drops what the mic hears of it
+SPEAKING = threading.Event()
+SPEECH_LOCK = threading.Lock()
+
+def speak_hindi(text, output=None, muted=SPEAKING, lock=SPEECH_LOCK):
+    """Speaks on `output` (the default speaker), muting the recognizer that listens next to it.
+
+    `text` may also be a list of futures of reply text, spoken in order as each resolves.
+    """
+    if isinstance(text, str):
+        print(f"⚙️ Synthesizing: '{text}'")
+    else:
+        print(f"⚙️ Synthesizing {len(text)} replies as they resolve...")
+    with lock:
+        muted.set()
+        try:
+            if isinstance(text, str):
+                stats = tts.speak(text, output=output)
+            else:
+                stats = tts.speak_parts(text, output=output)
+            STATS.observe("tts_first_audio", stats["first_audio_ms"] / 1000)
+            STATS.observe("tts_total", stats["total_ms"] / 1000)
+            print(f"✅ Audio played. (first audio {stats['first_audio_ms']:.0f} ms, "
+                  f"total {stats['total_ms']:.0f} ms, {stats['sentences']} sentences)\n")
+        except (RuntimeError, OSError):
+            print("❌ Piper TTS Engine failed to synthesize audio.")
+        finally:
+            muted.clear()
 
 def trigger_alarm(message):
     print(f"\n⏰ [SYSTEM ALARM]: {message}")
@@ -51,330 +72,346 @@ def trigger_alarm(message):
 # ==========================================
 # 🧠 OFFLINE MEMORY ENGINE (ALARM & REMINDERS)
 # ==========================================
-DB_FILE = "memory.json"
+DB_FILE = "memory.db"
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def fire_event(message):
+    print(f"\n⏰ [ALARM TRIGGERED]: {message}")
+    trigger_alarm(message)
+
+def get_scheduler():
+    """Opens the event store (migrating an old memory.json once) and its scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            store = EventStore(DB_FILE)
+            migrated = store.migrate_json()
+            if migrated:
+                print(f"💾 [MEMORY]: Migrated {migrated} pending events from memory.json")
+            _scheduler = Scheduler(store, fire_event)
+    return _scheduler
 
 def save_event(event_type, minutes_from_now, message):
-    """Calculates exact future time from minutes and writes it to hard drive."""
+    """Calculates exact future time from minutes and writes it to the event store."""
     trigger_time = datetime.now() + timedelta(minutes=minutes_from_now)
-    
-    try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = []
-
-    data.append({
-        "type": event_type,
-        "trigger_time": trigger_time.strftime("%Y-%m-%d %H:%M:%S"),
-        "message": message,
-        "status": "pending"
-    })
-    
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        
+    get_scheduler().schedule(event_type, trigger_time, message)
     print(f"💾 [MEMORY]: Saved {event_type} for {trigger_time.strftime('%H:%M')}")
 
 def save_scheduled_event(event_type, exact_trigger_time, message):
-    """Saves a specific future date/time to the offline JSON memory."""
-    try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = []
-
-    data.append({
-        "type": event_type,
-        "trigger_time": exact_trigger_time.strftime("%Y-%m-%d %H:%M:%S"),
-        "message": message,
-        "status": "pending"
-    })
-    
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        
+    """Saves a specific future date/time to the offline event store."""
+    get_scheduler().schedule(event_type, exact_trigger_time, message)
     print(f"💾 [MEMORY]: Scheduled {event_type} for {exact_trigger_time.strftime('%Y-%m-%d %H:%M')}")
 
-def timekeeper_daemon():
-    """Runs in the background forever. Checks the clock every 10 seconds."""
-    while True:
-        try:
-            with open(DB_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            now = datetime.now()
-            db_updated = False
-
-            for event in data:
-                if event["status"] == "pending":
-                    trigger_time = datetime.strptime(event["trigger_time"], "%Y-%m-%d %H:%M:%S")
-                    
-                    if now >= trigger_time:
-                        print(f"\n⏰ [ALARM TRIGGERED]: {event['message']}")
-                        trigger_alarm(event["message"]) 
-                        event["status"] = "done"
-                        db_updated = True
-
-            if db_updated:
-                with open(DB_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
-
-        except Exception as e:
-            pass 
+# ==========================================
+# 100% OFFLINE RESPONSE GENERATOR
+# ==========================================
+# What each intent does lives in the handler table (handlers.py)
+handlers.register_builtin(save_event, save_scheduled_event)
 
-        time.sleep(10)
+def generate_response(intent, phrase):
+    return handlers.respond(intent, phrase)
 
 # ==========================================
-# OFFLINE NLP EXTRACTORS
+# PRE-RENDERED PHRASES (AUDIO CACHE WARM-UP)
 # ==========================================
-def extract_minutes(phrase):
-    time_map = {
-        "एक मिनट": 1, "1 मिनट": 1, "दो मिनट": 2, "2 मिनट": 2, 
-        "तीन मिनट": 3, "3 मिनट": 3, "चार मिनट": 4, "4 मिनट": 4, 
-        "पांच मिनट": 5, "पाँच मिनट": 5, "5 मिनट": 5, 
-        "दस मिनट": 10, "10 मिनट": 10, "पंद्रह मिनट": 15, "15 मिनट": 15, 
-        "बीस मिनट": 20, "20 मिनट": 20, "तीस मिनट": 30, "30 मिनट": 30, 
-        "आधा घंटा": 30, "आधे घंटे": 30, "एक घंटा": 60, "एक घंटे": 60
-    }
-    for key, value in time_map.items():
-        if key in phrase:
-            return value
-    return None
-
-def extract_long_term_event(phrase):
-    """Parses exact Hindi times (digits or words) and calculates the future datetime."""
-    now = datetime.now()
-    days_to_add = 0
-    
-    if "कल" in phrase: days_to_add = 1
-    elif "परसों" in phrase: days_to_add = 2
-    
-    target_date = now + timedelta(days=days_to_add)
-    
-    hour = None
-    minute = 0
-    
-    time_match = re.search(r'(\d{1,2})(?:\s*बजकर\s*(\d{1,2})\s*मिनट|:(\d{2})|\s*बजे)', phrase)
-    
-    if time_match:
-        hour = int(time_match.group(1))
-        if time_match.group(2): 
-            minute = int(time_match.group(2))
-        elif time_match.group(3): 
-            minute = int(time_match.group(3))
-    else:
-        hindi_numbers = {
-            "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, 
-            "छह": 6, "सात": 7, "आठ": 8, "नौ": 9, "दस": 10, "ग्यारह": 11, "बारह": 12
-        }
-        for word, num in hindi_numbers.items():
-            if f"{word} बजे" in phrase:
-                hour = num
-                break
-
-    if hour is not None:
-        if "साढ़े" in phrase: minute = 30
-        elif "सवा" in phrase: minute = 15
-        elif "पौने" in phrase:
-            hour = hour - 1 if hour > 1 else 12
-            minute = 45
-
-    if hour is not None:
-        if hour < 12 and any(word in phrase for word in ["शाम", "रात", "दोपहर"]):
-            hour += 12
-        elif hour == 12 and "सुबह" in phrase:
-            hour = 0
-    else:
-        hour = 10 
-        if "सुबह" in phrase: hour = 9
-        elif "दोपहर" in phrase: hour = 13
-        elif "शाम" in phrase: hour = 18
-        elif "रात" in phrase: hour = 21
-
-    event = "रिमाइंडर" 
-    if "बर्थडे" in phrase or "जन्मदिन" in phrase: event = "जन्मदिन"
-    elif "मीटिंग" in phrase or "बैठक" in phrase: event = "मीटिंग"
-    elif "वैक्सीन" in phrase or "टीका" in phrase: event = "वैक्सीनेशन"
-    elif "दवाई" in phrase or "मेडिसिन" in phrase: event = "दवाई खाने"
-    
-    trigger_time = target_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    
-    if trigger_time <= now:
-        trigger_time += timedelta(days=1)
-        
-    return event, trigger_time
+def reply_phrases():
+    """Collects the fixed parts of every handler's reply templates and the numbers
+    that fill them, so the voice cache can be pre-warmed."""
+    phrases = [WAKE_ACK] + handlers.reply_templates()
+    phrases.extend(str(n) for n in range(61))
+    return list(dict.fromkeys(phrases))
+
+def prewarm_voice():
+    rendered = tts.get_voice().prewarm(reply_phrases())
+    print(f"🔊 [VOICE]: Phrase cache warm ({rendered} new phrases rendered).")
 
 # ==========================================
-# 100% OFFLINE RESPONSE GENERATOR
+# COMMAND HANDLING (RESPONDER WORKERS)
 # ==========================================
-def generate_response(intent, phrase):
-    now = datetime.now()
-    
-    # --- Home Automation ---
-    if intent == "LIGHT_ON": 
-        hardware.control_appliance("LIGHT", "ON")
-        return "ठीक है, बत्ती चालू कर दी गई है।" 
-    elif intent == "LIGHT_OFF": 
-        hardware.control_appliance("LIGHT", "OFF")
-        return "ठीक है, मैंने बत्ती बंद कर दी है।" 
-    elif intent == "FAN_ON": 
-        hardware.control_appliance("FAN", "ON")
-        return "ठीक है, पंखा चालू कर दिया गया है।" 
-    elif intent == "FAN_OFF": 
-        hardware.control_appliance("FAN", "OFF")
-        return "ठीक है, पंखा बंद कर दिया गया है।" 
-    elif intent == "AC_ON": 
-        hardware.control_appliance("AC", "ON")
-        return "ठीक है, एसी चालू कर दिया गया है।"
-        
-    # --- Time, Date & Weather ---
-    elif intent == "TIME_ASK":
-        hour = now.hour % 12 or 12
-        return f"अभी समय {hour} बजकर {now.minute} मिनट हो रहा है।"
-    elif intent == "DATE_ASK":
-        return f"आज {now.day} तारीख है।" 
-    elif intent == "DAY_ASK":
-        hindi_days = ["सोमवार", "मंगलवार", "बुधवार", "बृहस्पतिवार", "शुक्रवार", "शनिवार", "रविवार"]
-        return f"आज {hindi_days[now.weekday()]} है।"
-    elif intent == "WEATHER_ASK": 
-        live_temp = hardware.get_temperature()
-        return f"आज मौसम साफ है और तापमान {live_temp} डिग्री है।" 
-    elif intent == "TEMP_ASK": 
-        live_temp = hardware.get_temperature()
-        return f"अभी कमरे का तापमान {live_temp} डिग्री सेल्सियस है।"
-    elif intent == "RAIN_ASK": 
-        return "आज बारिश की कोई संभावना नहीं है।"
-        
-    # --- Reminders & Alarms ---
-    elif intent == "ALARM_SET":
-        minutes = extract_minutes(phrase)
-        if minutes:
-            save_event("alarm", minutes, "आपका अलार्म का समय हो गया है।")
-            return f"ठीक है, मैंने {minutes} मिनट का अलार्म सेट कर दिया है।"
-        else:
-            save_event("alarm", 1, "अलार्म का समय हो गया है!")
-            return "आपने समय नहीं बताया, इसलिए मैंने एक मिनट का डेमो अलार्म सेट कर दिया है।"
-
-    elif intent == "REMINDER_SET":
-        minutes = extract_minutes(phrase)
-        if minutes and "कल" not in phrase and "परसों" not in phrase:
-            save_event("reminder", minutes, f"आपके {minutes} मिनट पूरे हो गए हैं।")
-            return f"ठीक है, मैंने {minutes} मिनट का रिमाइंडर सेट कर दिया है।"
-        
-        event, exact_time = extract_long_term_event(phrase)
-        message = f"ध्यान दें! आपका {event} का समय हो गया है।"
-        
-        save_scheduled_event("reminder", exact_time, message)
-        
-        day_str = "आज"
-        if "कल" in phrase: day_str = "कल"
-        elif "परसों" in phrase: day_str = "परसों"
-        
-        return f"ठीक है, मैंने {day_str} के लिए आपके {event} का रिमाइंडर सेव कर लिया है।"
-
-    # --- Volume Control ---
-    elif intent == "ALARM_STOP": return "अलार्म बंद कर दिया गया है।"
-    elif intent == "VOLUME_UP": 
-        if sys.platform != "win32":
-            os.system("pactl set-sink-volume @DEFAULT_SINK@ +15%")
-        return "मैंने आवाज़ बढ़ा दी है।"
-    elif intent == "VOLUME_DOWN": 
-        if sys.platform != "win32":
-            os.system("pactl set-sink-volume @DEFAULT_SINK@ -15%")
-        return "मैंने आवाज़ कम कर दी है।"
-        
-    # --- Fallbacks ---
-    elif intent == "UNKNOWN_COMMAND": return "माफ़ कीजिए, मैं केवल घर के उपकरणों को नियंत्रित कर सकती हूँ।"
-    else: return "माफ़ कीजिए, मुझे समझ नहीं आया।"
+RESPONDERS = ThreadPoolExecutor(max_workers=2, thread_name_prefix="responder")
+SPECULATOR = Speculator(generate_response, synthesize=lambda text: tts.get_voice().submit(text))
+
+def acknowledge_wake():
+    speak_hindi(WAKE_ACK)
+    print("Listening for command...")
+
+def play_chime(output=None, muted=SPEAKING, lock=SPEECH_LOCK):
+    with lock:
+        muted.set()
+        try:
+            output = output or tts.get_output()
+            output.write(tts.chime_pcm(output.sample_rate))
+            output.drain()
+        except OSError:
+            pass
+        finally:
+            muted.clear()
+
+def on_wake():
+    # Mute straight away; the acknowledgement is about to play
+    SPEAKING.set()
+    RESPONDERS.submit(play_chime if SINGLE_STREAM else acknowledge_wake)
+
+def on_command(transcribed_text, woke_at=None):
+    # take() must run here, on the recognizer thread, before the next utterance's partials arrive
+    speculation = SPECULATOR.take() if SPECULATE else None
+    RESPONDERS.submit(handle_command, transcribed_text, woke_at, speculation, trace=STATS.current_trace())
+
+PHRASE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="phrase")
+
+def resolve_phrase(candidate, speculation=None, multi=False, trace=None, after=()):
+    """(intent_data, reply) for one phrase of an utterance.
+
+    A BLOCKING handler (relays) only runs once the earlier phrases' futures in
+    `after` are done, so actions keep the order they were spoken in.
+    """
+    with STATS.tracing(trace if trace is not None else STATS.current_trace()):
+        return _resolve_phrase(candidate, speculation, multi, after)
+
+def _resolve_phrase(candidate, speculation, multi, after):
+    intent_data = resolve_intent(*candidate)
+    intent, phrase = intent_data['intent'], intent_data['phrase']
+    print(f"🧠 [Brain]: Mapped '{phrase}' to '{intent}' ({intent_data['confidence']}%)")
+    if after and handlers.get_handler(intent).kind == handlers.BLOCKING:
+        wait(after)
+
+    reply_text = speculation.claim(intent) if speculation else None
+    if reply_text is None:
+        reply_text = handlers.respond(intent, phrase)
+    if intent == "UNKNOWN_COMMAND" and multi:
+        reply_text = ""
+    return intent_data, reply_text
+
+def resolve_replies(candidates, speculation=None):
+    """Fans the phrases of one utterance out and returns their (intent_data, reply) futures in order.
+
+    Confident fuzzy matches with cheap handlers resolve right here, in
+    utterance order, so "जलाओ फिर बुझाओ" never reorders; phrases that need the
+    LLM or an IO handler run on the phrase pool. Every action fires as soon as
+    its own phrase resolves instead of waiting for its siblings, except that a
+    relay action waits for every earlier phrase still on the pool, which may
+    yet turn out to switch the same device.
+    """
+    multi = len(candidates) > 1
+    futures = []
+    pooled = []   # Earlier phrases still resolving on the pool
+    with hardware.batch():
+        for candidate in candidates:
+            _, best_match, score = candidate
+            kind = handlers.get_handler(best_match).kind if fuzzy_is_sure(best_match, score) else None
+            if kind == handlers.PURE or (kind == handlers.BLOCKING and not pooled):
+                future = Future()
+                try:
+                    future.set_result(resolve_phrase(candidate, speculation, multi))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = PHRASE_POOL.submit(resolve_phrase, candidate, speculation, multi, STATS.current_trace(),
+                                            list(pooled))
+                pooled.append(future)
+            futures.append(future)
+    return futures
+
+def when_all(futures, callback):
+    """Calls callback() once, on whichever thread completes the last of `futures`."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(done)
+
+def reply_of(future):
+    """A future of just the reply text of a resolve_phrase() future."""
+    reply = Future()
+
+    def done(resolved):
+        try:
+            reply.set_result(resolved.result()[1])
+        except Exception as e:
+            reply.set_exception(e)
+
+    future.add_done_callback(done)
+    return reply
+
+def save_snapshot(warmup):
+    """Writes the tables boot had to rebuild into the snapshot once the warm-up has built its share."""
+    warmup.join()
+    if snapshot.save():
+        print("💾 [SNAPSHOT]: Rebuilt tables saved for the next boot.")
+
+def llm_counters():
+    return {f"llm_{name}": value for name, value in LLM_STATS.items()}
+
+def handle_command(transcribed_text, woke_at=None, speculation=None, speak=speak_hindi, trace=None):
+    """Intent -> response -> speech for one finished utterance, off the recognizer thread.
+
+    Each phrase is resolved and acted on independently and the speaker starts
+    on the first reply while later ones are still being computed. Relay
+    actions already taken on partial results are kept if a confident final
+    intent claims them and rolled back before any final intent runs
+    otherwise. `speak` lets a room answer on its own speaker. `trace` is the utterance's trace id
+    when it was handed over from the recognizer thread.
+    Returns the parsed intent list (empty on failure).
+    """
+    if trace is not None:
+        with STATS.tracing(trace):
+            return handle_command(transcribed_text, woke_at, speculation, speak)
+    command_start = time.perf_counter()
+    intent_list = []
+    try:
+        print(f"\n🗣️ [Quark]: {transcribed_text}")
+        with STATS.timer("intent"):
+            candidates = fuzzy_candidates(transcribed_text)
+        if speculation:
+            # Confident phrases claim their speculated action below; every other one is undone
+            # now, before a final command on the same device can run
+            speculation.retain({best for _, best, score in candidates if fuzzy_is_sure(best, score)})
+        response_start = time.perf_counter()
+        futures = resolve_replies(candidates, speculation)
+
+        trace = STATS.current_trace()
+
+        def resolved():
+            # Runs on whichever thread finished last
+            with STATS.tracing(trace):
+                STATS.observe("response", time.perf_counter() - response_start)
+                if woke_at is not None:
+                    STATS.observe("wake_to_action", time.perf_counter() - woke_at)
+            if speculation:
+                speculation.rollback_unclaimed([future.result()[0]["intent"] for future in futures
+                                                if future.exception() is None])
+        when_all(futures, resolved)
+
+        if futures:
+            speak([reply_of(future) for future in futures])
+
+        results = [future.result() for future in futures]
+        intent_list = [intent_data for intent_data, _ in results]
+        final_spoken_response = " ".join(reply_text for _, reply_text in results if reply_text)
+        print(f"🤖 [Assistant]: {final_spoken_response}")
+        print("\n💤 Going back to sleep...")
+    except Exception as e:
+        STATS.incr("command_errors")
+        print(f"❌ [PIPELINE]: Failed to handle '{transcribed_text}' ({e})")
+    STATS.observe("command_total", time.perf_counter() - command_start)
+    return intent_list
+
+def recognizer_loop(ring, session):
+    """Consumes captured chunks in order until the ring is closed."""
+    while True:
+        item = ring.get()
+        if item is None:
+            break
+        captured_at, data = item
+        STATS.observe("buffer_wait", time.monotonic() - captured_at)
+        session.feed(data)
 
 # ==========================================
 # MAIN AUDIO PIPELINE
 # ==========================================
 if __name__ == "__main__":
+    boot_start = time.perf_counter()
+    boot_times = {"Imports": boot_start - PROCESS_START}
+    profiler = Profiler().start() if "--profile" in sys.argv else None
+
+    # The LLM is only needed for rare low-confidence phrases, so it loads while everything else boots
+    print("Loading Hybrid Intent Parser (Brain) in the background...")
+    llm_loader.start()
+    # numpy, rapidfuzz, the phrase index and the classifier load while Vosk reads its model
+    warmup = threading.Thread(target=warm_up, name="intent-warmup", daemon=True)
+    warmup.start()
+    hardware.get_poller()   # First sensor sample lands while the models load
+
     print("Loading Vosk Acoustic Model (Ears)...")
     if not os.path.exists(VOSK_MODEL_PATH):
         print(f"Error: Vosk model not found at '{VOSK_MODEL_PATH}'.")
         sys.exit(1)
         
-    model = Model(VOSK_MODEL_PATH)
-    wake_word_grammar = '["नमस्ते", "सुनो", "[unk]"]'
-    wake_recognizer = KaldiRecognizer(model, 16000, wake_word_grammar)
-    main_recognizer = KaldiRecognizer(model, 16000)
-    
-    audio = pyaudio.PyAudio()
+    stage_start = time.perf_counter()
+    models = ModelHost(VOSK_MODEL_PATH)
+    model = models.vosk()
+    from vad import EnergyVAD   # numpy, by now imported by the warm-up thread
+    session = VoiceSession(model, on_wake=on_wake, on_command=on_command, muted=SPEAKING,
+                           vad=EnergyVAD() if VAD_GATE else None, single_stream=SINGLE_STREAM,
+                           on_partial=SPECULATOR.on_partial if SPECULATE else None,
+                           grammar=CommandGrammar(WAKE_WORDS) if COMMAND_GRAMMAR else None)
+    boot_times["Vosk model"] = time.perf_counter() - stage_start
     
-    stream = audio.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-    stream.start_stream()
+    # Capture runs on PyAudio's callback thread, recognition on its own thread.
+    # `python main.py --replay <wav-or-dir>` feeds recorded audio through the same path instead.
+    stage_start = time.perf_counter()
+    ring = RingBuffer()
+    if "--replay" in sys.argv:
+        mic = WavReplaySource(ring, sys.argv[sys.argv.index("--replay") + 1]).start()
+    else:
+        mic = MicSource(ring).start()
+    recognizer_thread = threading.Thread(target=recognizer_loop, args=(ring, session),
+                                         name="recognizer", daemon=True)
+    recognizer_thread.start()
+    listening_at = time.perf_counter()
+    boot_times["PyAudio"] = listening_at - stage_start
 
-    print("Loading Hybrid Intent Parser (Brain)... Done.")
+    print("Loading Piper TTS Engine (Voice)...")
+    stage_start = time.perf_counter()
+    tts.get_voice()
+    boot_times["TTS (Piper)"] = time.perf_counter() - stage_start
     print("Loading Piper TTS Engine (Voice)... Done.")
+    threading.Thread(target=prewarm_voice, daemon=True).start()
     
+    if MODEL_HOST:
+        models.serve()
+    threading.Thread(target=save_snapshot, args=(warmup,), name="snapshot", daemon=True).start()
+
     print("Starting Offline Memory Daemon...")
-    time_thread = threading.Thread(target=timekeeper_daemon, daemon=True)
-    time_thread.start()
+    get_scheduler().start()
+    metrics = MetricsWriter(METRICS_FILE, METRICS_SECONDS, extra=llm_counters).start() if METRICS_FILE else None
+
+    print("\n⏱️ Boot time breakdown:")
+    for stage, seconds in boot_times.items():
+        print(f"   {stage:<16} {seconds:6.2f} s")
+    if llm_loader.loaded.is_set():
+        llm_time = f"{llm_loader.load_seconds:6.2f} s" if llm_loader.ready() else "  unavailable"
+    else:
+        llm_time = "  still loading (fuzzy-only until ready)"
+    print(f"   {'LLM (Sarvam-1)':<16} {llm_time}")
+    print(f"   {'Listening after':<16} {listening_at - PROCESS_START:6.2f} s")
+    print(f"   {'Total':<16} {time.perf_counter() - PROCESS_START:6.2f} s")
     
     print("\n" + "=" * 50)
     print(f"🟢 SOVEREIGN SENTRY: ONLINE & AIR-GAPPED ({sys.platform})")
-    print("Say 'Namaste' or 'Suno' to wake me up.")
+    print("Say 'Namaste' or 'Suno' to wake me up" + (", or 'Suno' + your command in one go." if SINGLE_STREAM else "."))
     print("Press Ctrl+C to shut down.")
     print("=" * 50 + "\n")
 
-    is_awake = False
-
+    interrupted = False
     try:
-        while True:
-            data = stream.read(4000, exception_on_overflow=False)
-
-            if not is_awake:
-                if wake_recognizer.AcceptWaveform(data):
-                    result = json.loads(wake_recognizer.Result())
-                    text = result.get('text', '')
-                    if any(word in text for word in WAKE_WORDS):
-                        print("\n🔔 [Wake Word Detected]: Waking up system...")
-                        stream.stop_stream()
-                        speak_hindi("हाँ क्वार्क, बताइये?") 
-                        stream.start_stream()
-                        is_awake = True
-                        print("Listening for command...")
-            else:
-                if main_recognizer.AcceptWaveform(data):
-                    result = json.loads(main_recognizer.Result())
-                    transcribed_text = result.get('text', '')
-                    if transcribed_text:
-                        print(f"\n🗣️ [Quark]: {transcribed_text}")
-                        intent_list = parse_multiple_intents(transcribed_text)
-                        combined_replies = []
-                        
-                        for intent_data in intent_list:
-                            detected_intent = intent_data['intent']
-                            phrase = intent_data['phrase']
-                            confidence = intent_data['confidence']
-                            
-                            print(f"🧠 [Brain]: Mapped '{phrase}' to '{detected_intent}' ({confidence}%)")
-                            
-                            reply_text = generate_response(detected_intent, phrase)
-                            
-                            if detected_intent == "UNKNOWN_COMMAND" and len(intent_list) > 1: continue
-                            combined_replies.append(reply_text)
-                                
-                        final_spoken_response = " ".join(combined_replies)
-                        print(f"🤖 [Assistant]: {final_spoken_response}")
-                        
-                        if final_spoken_response.strip():
-                            stream.stop_stream()
-                            speak_hindi(final_spoken_response)
-                            stream.start_stream()
-                        
-                        print("\n💤 Going back to sleep...")
-                        is_awake = False
-                        
-                else:
-                    partial = json.loads(main_recognizer.PartialResult())
-                    if partial.get('partial'):
-                        print(f"Processing... {partial['partial']}", end='\r')
-
+        # Only returns on its own when a --replay source runs out
+        while recognizer_thread.is_alive():
+            recognizer_thread.join(timeout=1)
     except KeyboardInterrupt:
-        print("\n\nShutting down system safely...")
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
\ No newline at end of file
+        interrupted = True
+
+    print("\n\nShutting down system safely...")
+    mic.stop()
+    recognizer_thread.join(timeout=2)
+    RESPONDERS.shutdown(wait=not interrupted)
+    print_memory_report(models.memory_report())
+    models.stop()
+    tts.shutdown()
+    if metrics:
+        metrics.stop()
+    if profiler:
+        threads = profiler.dump(PROFILE_FILE)
+        spans = STATS.write_trace(TRACE_FILE)
+        print(f"🔬 [PROFILE]: {threads} profile(s) -> {PROFILE_FILE}, {spans} spans -> {TRACE_FILE}")
+    STATS.summary()
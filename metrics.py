@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import bisect
+import cProfile
+import itertools
+import threading
+from collections import deque, defaultdict, namedtuple
+from contextlib import contextmanager
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SPAN_RING = 4096   # Most recent spans kept in memory (a few minutes of conversation)
+# Histogram bucket upper bounds in seconds: chunk decodes at the bottom, LLM fallbacks at the top
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# One timed stage of one utterance; start/end are perf_counter() seconds
+Span = namedtuple("Span", ["trace", "stage", "start", "end", "thread", "detail"])
+
+# ==========================================
+# PIPELINE COUNTERS & STAGE LATENCIES
+# ==========================================
+class PipelineStats:
+    """Thread-safe counters, gauges and per-stage latency windows for the voice loop.
+
+    Every observation also lands in a cumulative histogram (for export) and,
+    while the calling thread is inside a trace, in the span ring. A trace is
+    one utterance: the recognizer opens it on the wake word and each thread
+    that works on the command joins it with tracing(trace_id).
+    """
+
+    def __init__(self, window=1024, span_ring=SPAN_RING, buckets=HISTOGRAM_BUCKETS):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.buckets = buckets
+        self.histograms = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])   # [bucket counts], sum
+        self.spans = deque(maxlen=span_ring)
+        self.trace_ids = itertools.count(1)
+        self.local = threading.local()
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def gauge(self, name, value):
+        """Current value plus a high-water mark under name + '_max'."""
+        with self.lock:
+            self.gauges[name] = value
+            self.gauges[name + "_max"] = max(value, self.gauges.get(name + "_max", value))
+
+    def observe(self, stage, seconds, end=None, detail=None):
+        trace = getattr(self.local, "trace", None)
+        with self.lock:
+            self.latencies[stage].append(seconds)
+            histogram = self.histograms[stage]
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+            if trace is not None:
+                end = end if end is not None else time.perf_counter()
+                self.spans.append(Span(trace, stage, end - seconds, end, threading.current_thread().name, detail))
+
+    @contextmanager
+    def timer(self, stage, detail=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.observe(stage, end - start, end, detail)
+
+    # --- Traces (one per utterance) ---
+    def begin_trace(self):
+        """Starts a new trace on the calling thread and returns its id."""
+        self.local.trace = next(self.trace_ids)
+        return self.local.trace
+
+    def end_trace(self):
+        self.local.trace = None
+
+    def current_trace(self):
+        return getattr(self.local, "trace", None)
+
+    @contextmanager
+    def tracing(self, trace):
+        """Attributes this thread's observations to `trace` (e.g. on a worker pool) for the block."""
+        previous = getattr(self.local, "trace", None)
+        self.local.trace = trace
+        try:
+            yield
+        finally:
+            self.local.trace = previous
+
+    def recent_spans(self, trace=None):
+        with self.lock:
+            spans = list(self.spans)
+        return spans if trace is None else [span for span in spans if span.trace == trace]
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.latencies.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    # --- Export ---
+    def prometheus(self, extra_counters=None, prefix="hindiva"):
+        """Prometheus text exposition: counters, gauges and one histogram per stage."""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {stage: (list(counts), total) for stage, (counts, total) in self.histograms.items()}
+        counters.update(extra_counters or {})
+
+        lines = []
+        for name, value in sorted(counters.items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        for name, value in sorted(gauges.items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        metric = f"{prefix}_stage_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, extra_counters=None):
+        """Atomically replaces `path` (node_exporter textfile collector format)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(extra_counters))
+        os.replace(tmp_path, path)
+
+    def write_trace(self, path):
+        """The span ring as Chrome trace events (chrome://tracing, Perfetto, speedscope)."""
+        events = [{"name": span.stage, "cat": "pipeline", "ph": "X", "pid": 1, "tid": span.thread,
+                   "ts": span.start * 1e6, "dur": (span.end - span.start) * 1e6,
+                   "args": {"trace": span.trace, **({"detail": span.detail} if span.detail else {})}}
+                  for span in self.recent_spans()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+
+    def percentiles(self, stage):
+        """count / mean / p50 / p95 / p99 in milliseconds for one stage."""
+        with self.lock:
+            samples = sorted(self.latencies.get(stage, ()))
+        if not samples:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+        pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+        return {"count": len(samples), "mean": sum(samples) / len(samples) * 1000,
+                "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+    def summary(self):
+        print("📊 [STATS]")
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            stages = list(self.latencies)
+        for name, value in sorted(counters.items()):
+            print(f"   {name:<22} {value}")
+        for name, value in sorted(gauges.items()):
+            print(f"   {name:<22} {value}")
+        for stage in stages:
+            p = self.percentiles(stage)
+            print(f"   {stage:<22} n={p['count']:<6} p50={p['p50']:8.1f} ms  "
+                  f"p95={p['p95']:8.1f} ms  p99={p['p99']:8.1f} ms")
+
+STATS = PipelineStats()
+
+# ==========================================
+# PERIODIC EXPORT & PROFILING
+# ==========================================
+class MetricsWriter:
+    """Rewrites a Prometheus text file every `interval` seconds from a daemon thread.
+
+    `extra` is a callable returning more counters (e.g. intentparser.llm_stats)
+    that live outside PipelineStats.
+    """
+
+    def __init__(self, path, interval=15.0, stats=STATS, extra=None):
+        self.path = path
+        self.interval = interval
+        self.stats = stats
+        self.extra = extra
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self.thread.start()
+        return self
+
+    def write(self):
+        try:
+            self.stats.write_prometheus(self.path, self.extra() if self.extra else None)
+        except OSError as e:
+            print(f"⚠️ [METRICS]: Could not write {self.path} ({e})")
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        self.write()
+
+# Before 3.12 a cProfile.Profile only sees the thread that enabled it; from 3.12 on it runs on
+# sys.monitoring, is process-wide, and a second enable() raises "Another profiling tool is already active"
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+class Profiler:
+    """cProfile across the calling thread and every thread started after start().
+
+    dump() writes one merged .prof (snakeviz, flameprof, `python -m pstats`).
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.lock = threading.Lock()
+
+    def _bootstrap(self, *_):
+        # First profile event in a new thread: swap this hook for a real profiler
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        if PER_THREAD_PROFILES:
+            threading.setprofile(self._bootstrap)
+        self._bootstrap()
+        return self
+
+    def dump(self, path):
+        """Writes the merged profile; returns how many profiles went into it (one per thread before 3.12)."""
+        import pstats
+        if PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        with self.lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            profile.create_stats()
+        # A thread that ended before its first profiled call leaves an empty profile pstats refuses
+        profiles = [profile for profile in profiles if profile.stats]
+        if not profiles:
+            return 0
+        merged = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            merged.add(profile)
+        merged.dump_stats(path)
+        return len(profiles)
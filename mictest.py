@@ -2,17 +2,25 @@ import pyaudio
 import json
 import sys
 import os
-from vosk import Model, KaldiRecognizer
+from modelhost import ModelClient
 
 # Universal path handling for Windows and Linux
 MODEL_PATH = "model"
 
-if not os.path.exists(MODEL_PATH):
-    print(f"❌ Error: Model folder not found at {MODEL_PATH}")
-    sys.exit(1)
+# With main.py (or modelhost.py) running, decode on its Vosk model instead of loading a second copy
+host = ModelClient.connect("mictest")
+if host is not None:
+    print("🔗 Using the model host's Vosk model")
+    recognizer = host.recognizer(16000)
+else:
+    from vosk import Model, KaldiRecognizer
 
-model = Model(MODEL_PATH) 
-recognizer = KaldiRecognizer(model, 16000)
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Error: Model folder not found at {MODEL_PATH}")
+        sys.exit(1)
+
+    model = Model(MODEL_PATH) 
+    recognizer = KaldiRecognizer(model, 16000)
 
 audio = pyaudio.PyAudio()
 
@@ -41,4 +49,6 @@ except KeyboardInterrupt:
     print("\nStopping...")
     stream.stop_stream()
     stream.close()
-    audio.terminate()
\ No newline at end of file
+    audio.terminate()
+    if host is not None:
+        host.close()
\ No newline at end of file
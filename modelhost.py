@@ -0,0 +1,438 @@
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import threading
+import itertools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SOCKET_PATH = os.environ.get("HINDIVA_MODEL_HOST", "/tmp/hindiva-models.sock")
+VOSK_MODEL_PATH = "vosk"
+SAMPLE_RATE = 16000
+
+# Every message: header length, payload length, UTF-8 JSON header, raw payload (PCM in either direction)
+FRAME = struct.Struct("<II")
+MAX_HEADER = 1 << 20
+
+def send_message(sock, header, payload=b""):
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(FRAME.pack(len(data), len(payload)) + data + payload)
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 16))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock):
+    """(header dict, payload bytes), or (None, None) once the peer has hung up."""
+    frame = _recv_exactly(sock, FRAME.size)
+    if frame is None:
+        return None, None
+    header_len, payload_len = FRAME.unpack(frame)
+    if header_len > MAX_HEADER:
+        raise ValueError(f"header of {header_len} bytes")
+    header = _recv_exactly(sock, header_len)
+    payload = _recv_exactly(sock, payload_len) if payload_len else b""
+    if header is None or payload is None:
+        return None, None
+    return json.loads(header.decode("utf-8")), payload
+
+# ==========================================
+# MEMORY ACCOUNTING (/proc, LINUX ONLY)
+# ==========================================
+def proc_memory(pid="self"):
+    """Resident set of a process in MB: total, anonymous (private heap) and file-backed (shareable)."""
+    fields = {"VmRSS:": "rss_mb", "RssAnon:": "anon_mb", "RssFile:": "file_mb", "RssShmem:": "shmem_mb"}
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                name = line.split(None, 1)[0]
+                if name in fields:
+                    memory[fields[name]] = round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return memory
+
+def mapped_memory(path, pid="self"):
+    """(resident MB, proportional MB) of one file's mappings; Pss < Rss means other processes share the pages."""
+    target = os.path.realpath(path)
+    rss = pss = 0
+    inside = False
+    try:
+        with open(f"/proc/{pid}/smaps") as f:
+            for line in f:
+                parts = line.split()
+                if "-" in parts[0] and not parts[0].endswith(":"):
+                    inside = len(parts) >= 6 and parts[5] == target
+                elif inside and parts[0] == "Rss:":
+                    rss += int(parts[1])
+                elif inside and parts[0] == "Pss:":
+                    pss += int(parts[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(rss / 1024, 1), round(pss / 1024, 1)
+
+# ==========================================
+# MODEL HOST (ONE COPY OF EACH MODEL PER BOX)
+# ==========================================
+class ModelHost:
+    """Loads Vosk, Piper and the intent models once and serves them over a Unix socket.
+
+    main.py runs one around its own models, so mictest, speaker and the
+    intentparser self-test attach to the copies already in memory instead of
+    loading their own; `python modelhost.py` runs one on its own. Each client
+    connection gets a thread and its own recognizers; the Vosk model, the
+    piper engine (with its PCM cache) and the LLM are shared. The gguf and the
+    classifier are memory-mapped, so their pages also stay shared with any
+    other process that maps the same files.
+    """
+
+    def __init__(self, vosk_path=VOSK_MODEL_PATH):
+        self.vosk_path = vosk_path
+        self.lock = threading.Lock()        # Client table
+        self.load_lock = threading.Lock()   # Held for the seconds a model takes to load
+        self.model = None
+        self.loads = {}   # model name -> {"load_s": ..., "rss_mb": growth while loading}
+        self.clients = {}
+        self.client_ids = 0
+        self.server = None
+        self.path = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    # --- Models ---
+    def vosk(self):
+        """The shared Vosk model, loaded on first use."""
+        with self.load_lock:
+            if self.model is None:
+                from vosk import Model
+                before = proc_memory().get("rss_mb", 0.0)
+                start = time.perf_counter()
+                self.model = Model(self.vosk_path)
+                # Approximate: other threads may be allocating while Kaldi reads the model
+                self.loads["vosk"] = {"load_s": round(time.perf_counter() - start, 2),
+                                      "rss_mb": round(proc_memory().get("rss_mb", 0.0) - before, 1)}
+        return self.model
+
+    def voice(self):
+        import tts
+        return tts.get_voice()
+
+    def classify(self, text):
+        import intentparser
+        return intentparser.parse_multiple_intents(text)
+
+    # --- Serving ---
+    def serve(self, path=SOCKET_PATH):
+        """Starts accepting clients on `path`; False if another host already answers there,
+        or if the platform has no Unix sockets (Windows), where every process loads its own models."""
+        if not hasattr(socket, "AF_UNIX"):
+            print("⚠️ [MODEL HOST]: No Unix sockets on this platform; models are not shared")
+            return False
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                print(f"⚠️ [MODEL HOST]: {path} is already served by another process")
+                return False
+            except OSError:
+                os.unlink(path)   # Left behind by a host that died
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(path)
+            server.listen(8)
+        except OSError as e:
+            server.close()
+            print(f"⚠️ [MODEL HOST]: Could not listen on {path} ({e}); models are not shared")
+            return False
+        self.path, self.server = path, server
+        self.thread = threading.Thread(target=self._accept_loop, name="model-host", daemon=True)
+        self.thread.start()
+        print(f"🔗 [MODEL HOST]: Sharing models on {path}")
+        return True
+
+    def _accept_loop(self):
+        while not self.stopped.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(conn,), name="model-client", daemon=True).start()
+
+    def _serve_client(self, conn):
+        try:
+            pid = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                      struct.calcsize("3i")))[0]
+        except (AttributeError, OSError):
+            pid = None
+        with self.lock:
+            self.client_ids += 1
+            client_id = self.client_ids
+            client = self.clients[client_id] = {
+                "name": "?", "pid": pid, "connected_at": time.time(), "requests": defaultdict(int),
+                "bytes_in": 0, "bytes_out": 0, "recognizers": {}, "recognizer_ids": itertools.count(1)}
+        try:
+            with conn:
+                while not self.stopped.is_set():
+                    header, payload = recv_message(conn)
+                    if header is None:
+                        break
+                    try:
+                        reply, data = self._handle(client, header, payload)
+                    except Exception as e:
+                        reply, data = {"error": f"{type(e).__name__}: {e}"}, b""
+                    with self.lock:
+                        client["requests"][header.get("op", "?")] += 1
+                        client["bytes_in"] += len(payload)
+                        client["bytes_out"] += len(data)
+                    send_message(conn, reply, data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                del self.clients[client_id]
+
+    def _handle(self, client, header, payload):
+        op = header.get("op")
+        if op == "hello":
+            client["name"] = header.get("client", "?")
+            client["pid"] = client["pid"] or header.get("pid")
+            return {"ok": True}, b""
+
+        if op == "recognizer":
+            from vosk import KaldiRecognizer
+            model = self.vosk()
+            grammar = header.get("grammar")
+            rate = header.get("rate", SAMPLE_RATE)
+            recognizer = KaldiRecognizer(model, rate, grammar) if grammar else KaldiRecognizer(model, rate)
+            recognizer_id = next(client["recognizer_ids"])
+            client["recognizers"][recognizer_id] = recognizer
+            return {"id": recognizer_id}, b""
+        if op == "accept":
+            recognizer = client["recognizers"][header["id"]]
+            # The reply carries the result the caller will ask for next, saving a round trip
+            if recognizer.AcceptWaveform(payload):
+                return {"final": True, "result": recognizer.Result()}, b""
+            return {"final": False, "result": recognizer.PartialResult()}, b""
+        if op == "final":
+            return {"result": client["recognizers"][header["id"]].FinalResult()}, b""
+        if op == "grammar":
+            client["recognizers"][header["id"]].SetGrammar(header["grammar"])
+            return {"ok": True}, b""
+        if op == "close_recognizer":
+            client["recognizers"].pop(header["id"], None)
+            return {"ok": True}, b""
+
+        if op == "voice":
+            return {"sample_rate": self.voice().sample_rate}, b""
+        if op == "synthesize":
+            return {"ok": True}, self.voice().submit(header["text"]).result()
+
+        if op == "classify":
+            return {"intents": self.classify(header["text"])}, b""
+
+        if op == "memory":
+            return self.memory_report(), b""
+        raise ValueError(f"unknown op {op!r}")
+
+    # --- Memory report ---
+    def memory_report(self):
+        """Host process, each model and each connected client, in MB."""
+        import tts
+        import intentparser
+        models = {}
+        if "vosk" in self.loads:
+            models["vosk"] = dict(self.loads["vosk"])
+        piper_pid = tts.engine_pid()
+        if piper_pid is not None:
+            # Piper is its own process: its whole resident set is the voice
+            models["piper"] = {"pid": piper_pid, **proc_memory(piper_pid)}
+        if intentparser.llm_loader.ready():
+            mapped = mapped_memory(intentparser.llm_loader.model_path)
+            models["llm"] = {"load_s": round(intentparser.llm_loader.load_seconds, 2),
+                             **({"mapped_rss_mb": mapped[0], "mapped_pss_mb": mapped[1]} if mapped else {})}
+        mapped = mapped_memory(intentparser.CLASSIFIER_PATH)
+        if mapped and mapped[0]:
+            models["classifier"] = {"mapped_rss_mb": mapped[0], "mapped_pss_mb": mapped[1]}
+
+        with self.lock:
+            clients = [{"name": c["name"], "pid": c["pid"], "connected_s": round(time.time() - c["connected_at"], 1),
+                        "requests": dict(c["requests"]), "recognizers": len(c["recognizers"]),
+                        "bytes_in": c["bytes_in"], "bytes_out": c["bytes_out"],
+                        **(proc_memory(c["pid"]) if c["pid"] else {})}
+                       for c in self.clients.values()]
+        return {"host": {"pid": os.getpid(), **proc_memory()}, "models": models, "clients": clients}
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)   # Wakes the blocked accept()
+            except OSError:
+                pass
+            self.server.close()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+def print_memory_report(report):
+    host = report["host"]
+    print(f"🧠 [MEMORY] Host pid {host['pid']}: {host.get('rss_mb', '?')} MB resident "
+          f"({host.get('anon_mb', '?')} MB private, {host.get('file_mb', '?')} MB file-backed)")
+    for name, model in report["models"].items():
+        print(f"   {name:<12} " + ", ".join(f"{key}={value}" for key, value in model.items()))
+    for client in report["clients"]:
+        requests = ", ".join(f"{op}×{count}" for op, count in client["requests"].items())
+        print(f"   client {client['name']:<12} pid={client['pid']} rss={client.get('rss_mb', '?')} MB "
+              f"up {client['connected_s']} s, {client['recognizers']} recognizer(s), "
+              f"{client['bytes_in'] / 1024:.0f} KiB in / {client['bytes_out'] / 1024:.0f} KiB out ({requests})")
+
+# ==========================================
+# CLIENT SIDE
+# ==========================================
+class RemoteRecognizer:
+    """KaldiRecognizer's interface, decoding on the model host."""
+
+    def __init__(self, client, recognizer_id):
+        self.client = client
+        self.id = recognizer_id
+        self.result = self.partial = json.dumps({"partial": ""})
+
+    def AcceptWaveform(self, data):
+        reply, _ = self.client.request({"op": "accept", "id": self.id}, bytes(data))
+        if reply["final"]:
+            self.result = reply["result"]
+        else:
+            self.partial = reply["result"]
+        return reply["final"]
+
+    def Result(self):
+        return self.result
+
+    def PartialResult(self):
+        return self.partial
+
+    def FinalResult(self):
+        return self.client.request({"op": "final", "id": self.id})[0]["result"]
+
+    def SetGrammar(self, grammar):
+        self.client.request({"op": "grammar", "id": self.id, "grammar": grammar})
+
+    def close(self):
+        self.client.request({"op": "close_recognizer", "id": self.id})
+
+class ModelClient:
+    """One connection to a model host. Also stands in for the voice (tts.set_voice(client)).
+
+    Requests are serialized on the one socket; submit() renders on a single
+    worker so sentences come back in order while the caller plays earlier ones.
+    """
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="host-voice")
+        self._sample_rate = None
+        self.request({"op": "hello", "client": name, "pid": os.getpid()})
+
+    @classmethod
+    def connect(cls, name, path=SOCKET_PATH):
+        """A client, or None when no host is listening (callers then load their own models)."""
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock, name)
+
+    def request(self, header, payload=b""):
+        with self.lock:
+            send_message(self.sock, header, payload)
+            reply, data = recv_message(self.sock)
+        if reply is None:
+            raise RuntimeError("Model host closed the connection.")
+        if "error" in reply:
+            raise RuntimeError(f"Model host: {reply['error']}")
+        return reply, data
+
+    def recognizer(self, rate=SAMPLE_RATE, grammar=None):
+        reply, _ = self.request({"op": "recognizer", "rate": rate, "grammar": grammar})
+        return RemoteRecognizer(self, reply["id"])
+
+    @property
+    def sample_rate(self):
+        if self._sample_rate is None:
+            self._sample_rate = self.request({"op": "voice"})[0]["sample_rate"]
+        return self._sample_rate
+
+    def synthesize(self, text):
+        return self.request({"op": "synthesize", "text": text})[1]
+
+    def submit(self, text):
+        """Future resolving to PCM bytes, like PiperEngine.submit()."""
+        return self.renderer.submit(self.synthesize, text)
+
+    def classify(self, text):
+        return self.request({"op": "classify", "text": text})[0]["intents"]
+
+    def memory(self):
+        return self.request({"op": "memory"})[0]
+
+    def close(self):
+        self.renderer.shutdown(wait=False)
+        self.sock.close()
+
+# ==========================================
+# STANDALONE DAEMON
+# ==========================================
+# python modelhost.py            load Vosk, Piper and the LLM once and serve them
+# python modelhost.py --report   print the memory report of the running host
+if __name__ == "__main__":
+    if "--report" in sys.argv:
+        client = ModelClient.connect("report")
+        if client is None:
+            print(f"No model host listening on {SOCKET_PATH}")
+            sys.exit(1)
+        print_memory_report(client.memory())
+        client.close()
+        sys.exit(0)
+
+    import tts
+    import intentparser
+    if not os.path.exists(VOSK_MODEL_PATH):
+        print(f"Error: Vosk model not found at '{VOSK_MODEL_PATH}'.")
+        sys.exit(1)
+    host = ModelHost()
+    intentparser.llm_loader.start()
+    threading.Thread(target=intentparser.warm_up, name="intent-warmup", daemon=True).start()
+    print("Loading Vosk Acoustic Model (Ears)...")
+    host.vosk()
+    print("Loading Piper TTS Engine (Voice)...")
+    host.voice()
+    if not host.serve():
+        sys.exit(1)
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    print_memory_report(host.memory_report())
+    host.stop()
+    tts.shutdown()
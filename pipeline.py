@@ -0,0 +1,188 @@
+import json
+import time
+import threading
+from collections import deque
+from vosk import KaldiRecognizer
+from capture import SAMPLE_RATE
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+WAKE_WORDS = ["सुनो", "नमस्ते"]
+WAKE_GRAMMAR = '["नमस्ते", "सुनो", "[unk]"]'
+UTTERANCE_CHUNKS = 120    # Audio kept for a free-form re-decode (30 s at 250 ms chunks)
+
+# ==========================================
+# WAKE WORD -> COMMAND SESSION
+# ==========================================
+class VoiceSession:
+    """Wake-word then command recognition over a stream of 16 kHz PCM chunks.
+
+    feed() only decodes; what happens on a wake word or a finished command is
+    up to the on_wake / on_command callbacks, which should hand the work off
+    rather than block the recognizer. Chunks are discarded while `muted` is set
+    so the assistant never transcribes its own voice. An optional voice
+    activity gate keeps silence away from the wake recognizer while asleep.
+
+    With single_stream=True there is no separate wake recognizer: one
+    free-form recognizer decodes continuously and a command spoken in the same
+    breath as the wake word ("सुनो बत्ती जलाओ") is taken from the words after it.
+    on_command receives the text and the perf_counter() time of the wake word.
+    on_partial, if given, sees every partial command hypothesis before endpointing.
+
+    Passing a grammar.CommandGrammar constrains the command recognizer to the
+    registry vocabulary. A final result containing [unk] is decoded again from
+    the buffered utterance audio by a free-form recognizer.
+    """
+
+    def __init__(self, model, on_wake, on_command, muted=None, vad=None, single_stream=False,
+                 on_partial=None, grammar=None, stats=STATS):
+        self.model = model
+        self.single_stream = single_stream
+        self.wake_recognizer = None if single_stream else KaldiRecognizer(model, SAMPLE_RATE, WAKE_GRAMMAR)
+        self.grammar = grammar
+        self.free_recognizer = None
+        self.utterance = deque(maxlen=UTTERANCE_CHUNKS)
+        if grammar is not None:
+            self.grammar_version, spec = grammar.current()
+            self.main_recognizer = KaldiRecognizer(model, SAMPLE_RATE, spec)
+        else:
+            self.main_recognizer = KaldiRecognizer(model, SAMPLE_RATE)
+        self.on_wake = on_wake
+        self.on_command = on_command
+        self.on_partial = on_partial
+        self.muted = muted or threading.Event()
+        self.vad = vad
+        self.stats = stats
+        self.is_awake = False
+        self.woke_at = None
+
+    def feed(self, data):
+        if self.muted.is_set():
+            self.stats.incr("chunks_muted")
+            return
+        self.stats.incr("chunks_decoded")
+
+        if self.single_stream:
+            self._feed_single_stream(data)
+        elif not self.is_awake:
+            chunks = self.vad.process(data) if self.vad else [data]
+            for chunk in chunks:
+                with self.stats.timer("wake_decode"):
+                    final = self.wake_recognizer.AcceptWaveform(chunk)
+                if final and self._check_wake(self.wake_recognizer.Result()):
+                    return
+            if self.vad and self.vad.closed:
+                # The gate shut mid-utterance; flush whatever the decoder was holding
+                self._check_wake(self.wake_recognizer.FinalResult())
+        else:
+            self.utterance.append(data)
+            with self.stats.timer("command_decode"):
+                final = self.main_recognizer.AcceptWaveform(data)
+            if final:
+                transcribed_text = self._final_text(self.main_recognizer.Result())
+                if transcribed_text:
+                    self._dispatch(transcribed_text)
+            else:
+                partial = json.loads(self.main_recognizer.PartialResult())
+                if partial.get('partial'):
+                    print(f"Processing... {partial['partial']}", end='\r')
+                    if self.on_partial:
+                        self.on_partial(partial['partial'])
+
+    def _check_wake(self, result_json):
+        text = json.loads(result_json).get('text', '')
+        if not any(word in text for word in WAKE_WORDS):
+            return False
+        self._wake()
+        return True
+
+    def _feed_single_stream(self, data):
+        # The gate only applies while asleep; after a bare wake word every chunk counts
+        gated = self.vad is not None and not self.is_awake
+        for chunk in (self.vad.process(data) if gated else [data]):
+            self.utterance.append(chunk)
+            with self.stats.timer("stream_decode"):
+                final = self.main_recognizer.AcceptWaveform(chunk)
+            if final:
+                self._on_stream_text(self._final_text(self.main_recognizer.Result()))
+            elif self.on_partial:
+                words = self._command_words(json.loads(self.main_recognizer.PartialResult()).get('partial', ''))
+                if words:
+                    self.on_partial(" ".join(words))
+        if gated and self.vad.closed:
+            self._on_stream_text(self._final_text(self.main_recognizer.FinalResult()))
+
+    def _final_text(self, result_json):
+        """Text of a finished command-recognizer result, re-decoded free-form if the grammar gave up."""
+        text = json.loads(result_json).get('text', '')
+        words = text.split()
+        if self.grammar is not None and "[unk]" in words:
+            # Background chatter in single-stream mode is all [unk]; only recover real commands
+            if self.is_awake or not self.single_stream or any(word in WAKE_WORDS for word in words):
+                text = self._free_decode()
+            else:
+                text = " ".join(word for word in words if word != "[unk]")
+        self.utterance.clear()
+        if self.grammar is not None:
+            self._sync_grammar()
+        return text
+
+    def _free_decode(self):
+        self.stats.incr("grammar_fallbacks")
+        if self.free_recognizer is None:
+            self.free_recognizer = KaldiRecognizer(self.model, SAMPLE_RATE)
+        texts = []
+        with self.stats.timer("fallback_decode"):
+            for chunk in self.utterance:
+                if self.free_recognizer.AcceptWaveform(chunk):
+                    texts.append(json.loads(self.free_recognizer.Result()).get('text', ''))
+            texts.append(json.loads(self.free_recognizer.FinalResult()).get('text', ''))
+        return " ".join(text for text in texts if text)
+
+    def _sync_grammar(self):
+        # Between utterances: pick up phrases registered since the recognizer was built
+        version, spec = self.grammar.current()
+        if version != self.grammar_version:
+            self.main_recognizer.SetGrammar(spec)
+            self.grammar_version = version
+            self.stats.incr("grammar_rebuilds")
+
+    def _command_words(self, text):
+        """The command part of a single-stream hypothesis, or None if no wake word was heard."""
+        words = text.split()
+        if self.is_awake:
+            # Second breath after a bare "सुनो": the whole utterance is the command
+            return [word for word in words if word not in WAKE_WORDS]
+        for i, word in enumerate(words):
+            if word in WAKE_WORDS:
+                return words[i + 1:]
+        return None
+
+    def _on_stream_text(self, text):
+        command = self._command_words(text)
+        if command is None:
+            return
+        if not self.is_awake:
+            self._wake()
+            if not command:
+                return
+            self.stats.incr("inline_commands")
+        if command:
+            self._dispatch(" ".join(command))
+
+    def _wake(self):
+        print("\n🔔 [Wake Word Detected]: Waking up system...")
+        self.is_awake = True
+        self.woke_at = time.perf_counter()
+        # Everything this utterance does, on any thread, is traced under one id from here
+        self.stats.begin_trace()
+        if self.vad:
+            self.vad.reset()
+        self.on_wake()
+
+    def _dispatch(self, command):
+        self.is_awake = False
+        self.on_command(command, self.woke_at)
+        self.stats.end_trace()
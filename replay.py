@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Replays must never click real relays
+os.environ.setdefault("HINDIVA_MOCK_HARDWARE", "1")
+
+from vosk import Model
+import main
+import tts
+import hardware
+import intentparser
+from capture import WavReplaySource, SAMPLE_RATE
+from pipeline import VoiceSession, WAKE_WORDS
+from grammar import CommandGrammar
+from vad import EnergyVAD
+from speculate import Speculator
+from metrics import STATS, Profiler
+
+# ==========================================
+# OFFLINE REPLAY HARNESS & LATENCY REPORT
+# ==========================================
+# Usage: python replay.py <wav-or-dir> [--realtime] [--no-tts] [--out report.json]
+#                         [--metrics replay.prom] [--profile]
+#        python replay.py --check-speculation --check-ordering --check-labels
+#
+# Every 16 kHz mono WAV goes through the live chain: wake recognizer ->
+# KaldiRecognizer -> parse_multiple_intents -> generate_response -> TTS.
+# If the corpus directory holds an expected.json ({"file.wav": ["LIGHT_ON", ...]})
+# the report also includes intent accuracy.
+REPORT_STAGES = ["wake_decode", "command_decode", "stream_decode", "fallback_decode", "intent", "response",
+                 "tts_first_audio", "tts_total", "command_total", "wake_to_action", "speculative_lead"]
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def load_expected(corpus, expected_path=None):
+    path = expected_path or (os.path.join(corpus, "expected.json") if os.path.isdir(corpus) else None)
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def replay(corpus, model, realtime=False, use_vad=True, single_stream=False, speculate=False, grammar=False):
+    """Feeds the corpus through a VoiceSession, handling each command inline.
+
+    Commands run synchronously on the feeding thread so every stage is timed
+    exactly once per utterance. Returns ({file: [intents...]}, wall seconds,
+    audio seconds, decode CPU seconds).
+    """
+    current = {"file": None}
+    detected = {}
+    handler_cpu = [0.0]
+
+    speculator = Speculator(main.generate_response, synthesize=lambda text: tts.get_voice().submit(text))
+
+    def on_command(text, woke_at=None):
+        cpu_start = time.thread_time()
+        intents = main.handle_command(text, woke_at, speculator.take() if speculate else None)
+        handler_cpu[0] += time.thread_time() - cpu_start
+        detected.setdefault(os.path.basename(current["file"]), []).extend(i["intent"] for i in intents)
+
+    session = VoiceSession(model, on_wake=main.play_chime if single_stream else main.acknowledge_wake,
+                           on_command=on_command, muted=main.SPEAKING,
+                           vad=EnergyVAD() if use_vad else None, single_stream=single_stream,
+                           on_partial=speculator.on_partial if speculate else None,
+                           grammar=CommandGrammar(WAKE_WORDS) if grammar else None)
+
+    source = WavReplaySource(None, corpus, realtime=realtime)
+    audio_seconds = 0.0
+    feed_cpu = 0.0
+    start = time.perf_counter()
+    for path, pcm in source.chunks():
+        current["file"] = path
+        audio_seconds += len(pcm) / 2 / SAMPLE_RATE
+        if realtime:
+            # A chunk only exists once its last sample has been "recorded"
+            time.sleep(max(0.0, start + audio_seconds - time.perf_counter()))
+        cpu_start = time.thread_time()
+        session.feed(pcm)
+        feed_cpu += time.thread_time() - cpu_start
+    # Commands run inline, so take their (and TTS's) CPU back out of the feed total
+    return detected, time.perf_counter() - start, audio_seconds, feed_cpu - handler_cpu[0]
+
+def build_report(corpus, detected, wall_seconds, audio_seconds, decode_cpu, expected):
+    utterances = STATS.percentiles("command_total")["count"]
+    report = {
+        "revision": git_revision(),
+        "corpus": os.path.abspath(corpus),
+        "files": len(WavReplaySource(None, corpus).files),
+        "utterances": utterances,
+        "audio_seconds": round(audio_seconds, 2),
+        "wall_seconds": round(wall_seconds, 2),
+        "realtime_factor": round(wall_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+        "decode_cpu_seconds": round(decode_cpu, 3),
+        "throughput_utt_per_s": round(utterances / wall_seconds, 3) if wall_seconds else 0.0,
+        "stages_ms": {stage: {k: round(v, 2) for k, v in STATS.percentiles(stage).items()}
+                      for stage in REPORT_STAGES},
+        "counters": dict(STATS.counters),
+    }
+    if expected:
+        correct = sum(1 for name, intents in expected.items() if detected.get(name, []) == intents)
+        report["accuracy"] = round(correct / len(expected), 4)
+        report["misses"] = {name: detected.get(name, []) for name, intents in expected.items()
+                            if detected.get(name, []) != intents}
+    return report
+
+def print_report(report):
+    print("\n" + "=" * 72)
+    print(f"📼 REPLAY @ {report['revision']}: {report['files']} files, {report['utterances']} utterances, "
+          f"{report['audio_seconds']} s audio in {report['wall_seconds']} s "
+          f"(RTF {report['realtime_factor']}, {report['throughput_utt_per_s']} utt/s)")
+    print(f"   decode CPU {report['decode_cpu_seconds']} s "
+          f"({report['counters'].get('grammar_fallbacks', 0)} grammar fallbacks)")
+    for stage, p in report["stages_ms"].items():
+        print(f"   {stage:<16} n={p['count']:<5} p50={p['p50']:8.1f} ms  "
+              f"p95={p['p95']:8.1f} ms  p99={p['p99']:8.1f} ms")
+    if "accuracy" in report:
+        print(f"   intent accuracy  {report['accuracy']:.1%}")
+    print("=" * 72)
+
+# ==========================================
+# SPECULATION CHECKS (PARTIALS VS FINAL TRANSCRIPT)
+# ==========================================
+# (name, relay states before, stable partial hypotheses, final transcript, relay states expected after)
+SPECULATION_CASES = [
+    ("partial disagrees with final", {"LIGHT": "ON"}, ["बत्ती जलाओ", "बत्ती जलाओ"], "बत्ती बुझाओ", {"LIGHT": "OFF"}),
+    ("partial disagrees, light was off", {"LIGHT": "OFF"}, ["बत्ती बुझाओ", "बत्ती बुझाओ"], "बत्ती जलाओ", {"LIGHT": "ON"}),
+    ("partial confirmed by final", {"FAN": "OFF"}, ["पंखा चलाओ", "पंखा चलाओ"], "पंखा चलाओ", {"FAN": "ON"}),
+    ("partial abandoned", {"FAN": "OFF"}, ["पंखा चलाओ", "पंखा चलाओ"], "टाइम बताओ", {"FAN": "OFF"}),
+]
+
+def check_speculation(cases=SPECULATION_CASES):
+    """Replays partial hypotheses and a final transcript through the live speculation path.
+
+    Every case must leave the relays where the final command says and speak
+    the final command's reply. Returns the names of the failing cases.
+    """
+    speculator = Speculator(main.generate_response)
+    failures = []
+    for name, before, partials, final, after in cases:
+        for device, state in before.items():
+            hardware.control_appliance(device, state)
+        hardware.ACTUATORS.flush()
+        for partial in partials:
+            speculator.on_partial(partial)
+        spoken = []
+        intents = main.handle_command(final, speculation=speculator.take(),
+                                      speak=lambda parts: spoken.extend(part.result() for part in parts))
+        hardware.ACTUATORS.flush()
+        states = {device: hardware.ACTUATORS.applied[device] for device in after}
+        expected_reply = " ".join(main.generate_response(i["intent"], i["phrase"]) for i in intents)
+        ok = states == after and " ".join(spoken) == expected_reply
+        print(f"   {'✅' if ok else '❌'} {name}: relays {states}, expected {after}; said {' '.join(spoken)!r}")
+        if not ok:
+            failures.append(name)
+    return failures
+
+# ==========================================
+# ORDERING CHECKS (POOLED PHRASES VS INLINE ONES)
+# ==========================================
+# Phrases below FUZZY_THRESHOLD that the scripted LLM answers, after LLM_DELAY_SECONDS
+SLOW_TIER_ANSWERS = {"हवा रोक दीजिए": "FAN_OFF", "ठंड लग रही है": "FAN_OFF"}
+LLM_DELAY_SECONDS = 0.05
+# (name, relay states before, utterance, relay states expected after)
+ORDERING_CASES = [
+    ("pooled OFF before inline ON", {"FAN": "ON"}, "हवा रोक दीजिए और फिर पंखा चालू करो", {"FAN": "ON"}),
+    ("inline ON before pooled OFF", {"FAN": "OFF"}, "पंखा चालू करो और फिर हवा रोक दीजिए", {"FAN": "OFF"}),
+    ("pooled OFF, inline ON, pooled OFF", {"FAN": "OFF"},
+     "ठंड लग रही है और पंखा चालू करो और फिर हवा रोक दीजिए", {"FAN": "OFF"}),
+    ("pooled OFF before another device", {"FAN": "ON", "LIGHT": "OFF"},
+     "हवा रोक दीजिए और बत्ती जलाओ", {"FAN": "OFF", "LIGHT": "ON"}),
+]
+
+def check_ordering(cases=ORDERING_CASES):
+    """Utterances whose phrases resolve on different tiers must still switch relays in spoken order.
+
+    The slow tier is scripted (no classifier, a fixed LLM delay), so a phrase
+    sent to the pool finishes well after the confident ones around it.
+    Returns the names of the failing cases.
+    """
+    def slow_llm(phrase):
+        time.sleep(LLM_DELAY_SECONDS)
+        # The splitter leaves joiners like "फिर" on the phrase
+        return next((intent for key, intent in SLOW_TIER_ANSWERS.items() if key in phrase), "UNKNOWN_COMMAND"), 90.0
+
+    real = intentparser.classify_intent, intentparser.llm_intent_parser
+    intentparser.classify_intent = lambda phrase, fuzzy_match=None, prediction=None: (None, 0.0)
+    intentparser.llm_intent_parser = slow_llm
+    failures = []
+    try:
+        for name, before, text, after in cases:
+            for device, state in before.items():
+                hardware.control_appliance(device, state)
+            hardware.ACTUATORS.flush()
+            main.handle_command(text, speak=lambda parts: [part.result() for part in parts])
+            hardware.ACTUATORS.flush()
+            states = {device: hardware.ACTUATORS.applied[device] for device in after}
+            print(f"   {'✅' if states == after else '❌'} {name}: relays {states}, expected {after}")
+            if states != after:
+                failures.append(name)
+    finally:
+        intentparser.classify_intent, intentparser.llm_intent_parser = real
+    return failures
+
+# ==========================================
+# LABEL DECODING CHECKS (CONSTRAINED LLM FALLBACK)
+# ==========================================
+class ScriptedLLM:
+    """Byte-level stand-in for the llama context whose logits always favour the next byte of `answer`."""
+
+    def __init__(self, answer):
+        self.answer = f" {answer}\n".encode("utf-8")
+        self.emitted = 0
+
+    def tokenize(self, text, add_bos=True):
+        return list(text)
+
+    def eval(self, tokens):
+        self.emitted += len(tokens)
+
+    def next_logits(self):
+        import numpy as np
+        row = np.zeros(256)
+        row[self.answer[self.emitted]] = 10.0
+        return row
+
+# Registry phrases the real model has to tell apart; a uniform softmax would give them all one label
+LLM_LABEL_CASES = [("बत्ती जलाओ", "LIGHT_ON"), ("पंखा बंद करो", "FAN_OFF"), ("टाइम बताओ", "TIME_ASK"),
+                   ("आवाज़ कम करो", "VOLUME_DOWN")]
+
+def check_labels():
+    """Label-trie decoding: every label of a set with prefix labels decodes to itself under a scripted
+    model, and, when llama_cpp and the Sarvam-1 gguf are present, the real model's logits separate
+    distinct phrases. Returns the names of the failing cases."""
+    failures = []
+    labels = ["FAN", "FAN_ON", "FAN_OFF", "AC_ON", "UNKNOWN_COMMAND"]
+    real_logits = intentparser._next_token_logits
+    intentparser._next_token_logits = lambda llm: llm.next_logits()
+    try:
+        for answer in labels:
+            got, probability = intentparser._score_labels(ScriptedLLM(answer), labels)
+            print(f"   {'✅' if got == answer else '❌'} scripted {answer} -> {got} ({probability:.0%})")
+            if got != answer:
+                failures.append(f"scripted {answer}")
+    finally:
+        intentparser._next_token_logits = real_logits
+        intentparser._label_trie.update(labels=None, root=None, end=None)
+
+    try:
+        import llama_cpp  # noqa: F401
+    except ImportError:
+        print("   ⏭️ llama_cpp not installed; real-model check skipped")
+        return failures
+    if not os.path.exists(intentparser.MODEL_PATH):
+        print(f"   ⏭️ {intentparser.MODEL_PATH} missing; real-model check skipped")
+        return failures
+    llm = intentparser.llm_loader.get(wait=True)
+    if llm is None:
+        return failures + ["Sarvam-1 failed to load"]
+    results = []
+    with intentparser.LLM_LOCK:
+        for phrase, expected in LLM_LABEL_CASES:
+            intentparser._eval_prompt(llm, phrase)
+            got, probability = intentparser._score_labels(llm)
+            results.append((got, round(probability, 4)))
+            print(f"   {'✅' if got == expected else '⚠️'} Sarvam-1 '{phrase}' -> {got} ({probability:.1%})")
+    if len(set(results)) == 1:
+        print("   ❌ every phrase decoded to the same label and probability: the logits are not being read")
+        failures.append("Sarvam-1 logits")
+    return failures
+
+def setup_offline(no_tts=False, realtime=False):
+    """Silent audio out, throwaway alarm store; optionally no piper at all."""
+    tts.set_output(tts.NullOutput(realtime=realtime))
+    if no_tts:
+        tts.set_voice(tts.SilentVoice())
+    main.DB_FILE = os.path.join(tempfile.mkdtemp(prefix="replay_"), "memory.db")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay WAV corpora through the voice pipeline.")
+    parser.add_argument("corpus", nargs="?", help="16 kHz mono WAV file or directory of them")
+    parser.add_argument("--model", default=main.VOSK_MODEL_PATH)
+    parser.add_argument("--realtime", action="store_true", help="pace input at 1x instead of max speed")
+    parser.add_argument("--no-tts", action="store_true", help="skip piper synthesis entirely")
+    parser.add_argument("--no-vad", action="store_true", help="feed every chunk to the wake recognizer")
+    parser.add_argument("--single-stream", action="store_true",
+                        help="one recognizer for wake word + command (compare wake_to_action with --realtime)")
+    parser.add_argument("--speculate", action="store_true", help="pre-execute relay commands on partial results")
+    parser.add_argument("--grammar", action="store_true",
+                        help="constrain the command recognizer to the registry vocabulary")
+    parser.add_argument("--check-speculation", action="store_true",
+                        help="replay scripted partial/final pairs and check the relays end up as the final says")
+    parser.add_argument("--check-ordering", action="store_true",
+                        help="check that relays switch in spoken order when phrases resolve on different tiers")
+    parser.add_argument("--check-labels", action="store_true",
+                        help="check constrained label decoding (scripted, and against Sarvam-1 when installed)")
+    parser.add_argument("--expected", help="JSON of file name -> expected intent list")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--metrics", help="write Prometheus text metrics here")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"cProfile every thread to {main.PROFILE_FILE}, spans to {main.TRACE_FILE}")
+    args = parser.parse_args()
+
+    setup_offline(args.no_tts, args.realtime)
+    checks = [check for flag, check in ((args.check_speculation, check_speculation),
+                                        (args.check_ordering, check_ordering),
+                                        (args.check_labels, check_labels)) if flag]
+    if checks:
+        failed = [name for check in checks for name in check()]
+        tts.shutdown()
+        raise SystemExit(1 if failed else 0)
+    if args.corpus is None:
+        parser.error("a corpus is required unless a --check-* option is given")
+    profiler = Profiler().start() if args.profile else None
+    detected, wall_seconds, audio_seconds, decode_cpu = replay(
+        args.corpus, Model(args.model), args.realtime, use_vad=not args.no_vad,
+        single_stream=args.single_stream, speculate=args.speculate, grammar=args.grammar)
+    report = build_report(args.corpus, detected, wall_seconds, audio_seconds, decode_cpu,
+                          load_expected(args.corpus, args.expected))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.metrics:
+        STATS.write_prometheus(args.metrics, main.llm_counters())
+    if profiler:
+        profiler.dump(main.PROFILE_FILE)
+        STATS.write_trace(main.TRACE_FILE)
+    tts.shutdown()
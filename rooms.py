@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import queue
+import itertools
+import threading
+
+from vosk import Model
+import main
+import tts
+import hardware
+from capture import RingBuffer, MicSource, SocketSource, WavReplaySource
+from pipeline import VoiceSession, WAKE_WORDS
+from vad import EnergyVAD
+from speculate import Speculator
+from grammar import CommandGrammar
+from intentparser import llm_loader
+from metrics import STATS
+
+# ==========================================
+# MULTI-ROOM SERVER MODE
+# ==========================================
+# Usage: python rooms.py rooms.json
+#
+# {"rooms": [{"name": "hall",    "input": "mic:1",               "output": 3, "priority": 0},
+#            {"name": "kitchen", "input": "socket:/tmp/kitchen.sock",         "priority": 1},
+#            {"name": "test",    "input": "wav:corpus/",         "output": null}]}
+#
+# One Vosk Model, one Piper engine and one LLM serve every room. Each room gets
+# its own KaldiRecognizer session (own wake state), ring buffer and speaker;
+# finished commands from all rooms share a small pool of workers through one
+# bounded priority queue (lower priority number = served first).
+ROOM_QUEUE_SIZE = 16   # Commands waiting across all rooms before new ones are dropped
+ROOM_WORKERS = 2
+ACK_PRIORITY = -1      # Wake acknowledgements jump ahead of every room's commands
+
+class RoomDispatcher:
+    """Bounded priority queue drained by a fixed pool of worker threads."""
+
+    def __init__(self, workers=ROOM_WORKERS, max_pending=ROOM_QUEUE_SIZE, stats=STATS):
+        self.jobs = queue.PriorityQueue(maxsize=max_pending)
+        self.order = itertools.count()   # FIFO within one priority
+        self.stats = stats
+        self.threads = [threading.Thread(target=self._run, name=f"room-worker-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def submit(self, priority, fn, *args):
+        """Queues fn(*args); returns False (and counts a drop) when the queue is full."""
+        try:
+            self.jobs.put_nowait((priority, next(self.order), fn, args))
+        except queue.Full:
+            self.stats.incr("room_queue_drops")
+            return False
+        self.stats.gauge("room_queue_depth", self.jobs.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            _, _, fn, args = self.jobs.get()
+            if fn is None:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                self.stats.incr("room_job_errors")
+                print(f"❌ [ROOMS]: {e}")
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        """Blocks until every queued job has run."""
+        self.jobs.join()
+
+    def stop(self):
+        for _ in self.threads:
+            self.jobs.put((float("inf"), next(self.order), None, ()))
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+def open_source(spec, ring, realtime=True):
+    """mic:<device index> | socket:<path> | wav:<file or dir>"""
+    kind, _, arg = spec.partition(":")
+    if kind == "mic":
+        return MicSource(ring, device_index=int(arg) if arg else None)
+    if kind == "socket":
+        return SocketSource(ring, arg)
+    if kind == "wav":
+        return WavReplaySource(ring, arg, realtime=realtime)
+    raise ValueError(f"unknown room input '{spec}'")
+
+class Room:
+    """One microphone + speaker pair with its own recognizer session and mute state."""
+
+    def __init__(self, name, model, dispatcher, source_spec, output=None, priority=0, grammar=None,
+                 realtime=True):
+        self.name = name
+        self.dispatcher = dispatcher
+        self.priority = priority
+        self.output = output
+        self.muted = threading.Event()
+        self.lock = threading.Lock()
+        self.speculator = Speculator(main.generate_response,
+                                     synthesize=lambda text: tts.get_voice().submit(text)) if main.SPECULATE else None
+        self.session = VoiceSession(model, on_wake=self.on_wake, on_command=self.on_command, muted=self.muted,
+                                    vad=EnergyVAD() if main.VAD_GATE else None,
+                                    single_stream=main.SINGLE_STREAM,
+                                    on_partial=self.speculator.on_partial if self.speculator else None,
+                                    grammar=grammar)
+        self.ring = RingBuffer()
+        self.source = open_source(source_spec, self.ring, realtime)
+        self.thread = threading.Thread(target=main.recognizer_loop, args=(self.ring, self.session),
+                                       name=f"recognizer-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.source.start()
+        return self
+
+    def speak(self, text):
+        main.speak_hindi(text, output=self.output, muted=self.muted, lock=self.lock)
+
+    def on_wake(self):
+        self.muted.set()
+        if not self.dispatcher.submit(ACK_PRIORITY, self.acknowledge):
+            self.muted.clear()
+
+    def acknowledge(self):
+        if main.SINGLE_STREAM:
+            main.play_chime(output=self.output, muted=self.muted, lock=self.lock)
+        else:
+            self.speak(main.WAKE_ACK)
+
+    def on_command(self, text, woke_at=None):
+        speculation = self.speculator.take() if self.speculator else None
+        if not self.dispatcher.submit(self.priority, self.handle, text, woke_at, speculation, time.perf_counter(),
+                                      STATS.current_trace()):
+            print(f"⚠️ [{self.name}] Busy, dropped '{text}'")
+            if speculation:
+                speculation.settle([])   # Undo relays switched for a command that will never run
+
+    def handle(self, text, woke_at, speculation, queued_at, trace=None):
+        with STATS.tracing(trace):
+            STATS.observe("room_queue_wait", time.perf_counter() - queued_at)
+            print(f"\n🏠 [{self.name}]")
+            main.handle_command(text, woke_at, speculation, speak=self.speak)
+            STATS.observe("room_command_total", time.perf_counter() - queued_at)
+
+    def stop(self):
+        self.source.stop()
+        self.thread.join(timeout=2)
+
+def build_rooms(config, model, dispatcher, realtime=True, output_factory=None):
+    """Rooms from a parsed rooms.json; output_factory(room_config) overrides the speakers (replays)."""
+    grammar = CommandGrammar(WAKE_WORDS) if main.COMMAND_GRAMMAR else None
+    rooms = []
+    for room in config["rooms"]:
+        if output_factory:
+            output = output_factory(room)
+        else:
+            output = tts.AudioOutput(tts.get_voice().sample_rate, device_index=room.get("output"))
+        rooms.append(Room(room["name"], model, dispatcher, room["input"], output=output,
+                          priority=room.get("priority", 0), grammar=grammar, realtime=realtime))
+    return rooms
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python rooms.py rooms.json")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    llm_loader.start()
+    hardware.get_poller()
+    if not os.path.exists(main.VOSK_MODEL_PATH):
+        print(f"Error: Vosk model not found at '{main.VOSK_MODEL_PATH}'.")
+        sys.exit(1)
+    model = Model(main.VOSK_MODEL_PATH)
+    tts.get_voice()
+    threading.Thread(target=main.prewarm_voice, daemon=True).start()
+    main.get_scheduler().start()
+
+    dispatcher = RoomDispatcher().start()
+    rooms = [room.start() for room in build_rooms(config, model, dispatcher)]
+    print(f"\n🟢 Serving {len(rooms)} rooms: {', '.join(room.name for room in rooms)}. Ctrl+C to stop.\n")
+
+    try:
+        while any(room.thread.is_alive() for room in rooms):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+    print("\n\nShutting down rooms...")
+    for room in rooms:
+        room.stop()
+    dispatcher.stop()
+    for room in rooms:
+        if room.output is not None:
+            room.output.close()
+    tts.shutdown()
+    STATS.summary()
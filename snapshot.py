@@ -0,0 +1,160 @@
+import os
+import sys
+import zlib
+import time
+import struct
+import marshal
+import threading
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PATH = os.environ.get("HINDIVA_SNAPSHOT", os.path.join(BASE_DIR, "registry.snap"))   # "" turns it off
+FORMAT_VERSION = 1   # Bump whenever the code that derives a section changes (normalize_text, clean_text, ...)
+
+MAGIC = b"HRS1"
+HEADER = struct.Struct("<4sHH")     # magic, format version, section count
+ENTRY = struct.Struct("<24sIII")    # section name, input fingerprint, offset, length
+
+def fingerprint(inputs):
+    """crc32 of the inputs' repr: dicts keep insertion order, so equal tables always agree."""
+    return zlib.crc32(repr((FORMAT_VERSION, inputs)).encode("utf-8"))
+
+# ==========================================
+# VERSIONED SNAPSHOT FILE
+# ==========================================
+class Snapshot:
+    """Tables derived from the registry and lexicons, kept in one file across boots.
+
+    Every section is marshal-encoded and tagged with a fingerprint of the
+    inputs it was built from. cached(name, inputs, build) decodes the stored
+    section when the fingerprint still matches and otherwise calls build().
+    Rebuilt sections are only kept in memory until save(), which the build
+    step and main.py's boot call, so importing a module never writes a file.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = b""
+        self.sections = {}   # name -> (fingerprint, offset, length) inside data
+        self.rebuilt = {}    # name -> (fingerprint, marshal bytes) not yet saved
+        self.warned = False
+        self._open()
+
+    def _open(self):
+        self.data, self.sections = b"", {}
+        if not self.path:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        sections = {}
+        try:
+            magic, version, count = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"not a v{FORMAT_VERSION} snapshot")
+            for i in range(count):
+                name, tag, offset, length = ENTRY.unpack_from(data, HEADER.size + i * ENTRY.size)
+                if offset + length > len(data):
+                    raise ValueError("truncated")
+                sections[name.rstrip(b"\0").decode("ascii")] = (tag, offset, length)
+        except (struct.error, ValueError, UnicodeDecodeError):
+            return
+        self.data, self.sections = data, sections
+
+    def cached(self, name, inputs, build):
+        """The section `name` if it was built from exactly `inputs`, else build() (kept for save())."""
+        tag = fingerprint(inputs)
+        with self.lock:
+            entry = self.sections.get(name)
+            if entry is not None and entry[0] == tag:
+                _, offset, length = entry
+                try:
+                    return marshal.loads(memoryview(self.data)[offset:offset + length])
+                except (EOFError, ValueError, TypeError):
+                    pass
+
+        value = build()
+        with self.lock:
+            self.rebuilt[name] = (tag, marshal.dumps(value))
+        return value
+
+    def save(self):
+        """Writes the sections rebuilt since the file was read; True if the file changed."""
+        with self.lock:
+            if not self.rebuilt or not self.path:
+                return False
+            sections = {name: (tag, self.data[offset:offset + length])
+                        for name, (tag, offset, length) in self.sections.items() if name not in self.rebuilt}
+            sections.update(self.rebuilt)
+            self.rebuilt = {}
+            return self._write(sections)
+
+    def _write(self, sections):
+        offset = HEADER.size + ENTRY.size * len(sections)
+        table = [HEADER.pack(MAGIC, FORMAT_VERSION, len(sections))]
+        for section, (section_tag, payload) in sections.items():
+            table.append(ENTRY.pack(section.encode("ascii"), section_tag, offset, len(payload)))
+            offset += len(payload)
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(table))
+                for _, payload in sections.values():
+                    f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            if not self.warned:
+                print(f"⚠️ [SNAPSHOT]: Could not write {self.path} ({e}); rebuilding tables on every boot")
+                self.warned = True
+            return False
+        self._open()
+        return True
+
+    def describe(self):
+        """(name, bytes) per stored section."""
+        with self.lock:
+            return [(name, length) for name, (_, _, length) in self.sections.items()]
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def get_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = Snapshot()
+    return _snapshot
+
+def cached(name, inputs, build):
+    """Shorthand for get_snapshot().cached()."""
+    return get_snapshot().cached(name, inputs, build)
+
+def save():
+    """Shorthand for get_snapshot().save()."""
+    return get_snapshot().save()
+
+if __name__ == "__main__":
+    # Build step: python snapshot.py (main.py also saves whatever its boot had to rebuild)
+    start = time.perf_counter()
+    import snapshot   # The instance the modules below fill, not this __main__ copy
+    import timeparse
+    import intentparser
+    import handlers
+    # Registers the handler table exactly as main.py does, so any handler phrases are in the registry.
+    # The memory callables only run when an alarm or reminder is set, which never happens here
+    handlers.register_builtin(save_event=None, save_scheduled_event=None)
+    from grammar import CommandGrammar
+    from pipeline import WAKE_WORDS
+    intentparser.get_phrase_index()
+    CommandGrammar(WAKE_WORDS).current()
+    snapshot.save()
+    print(f"Snapshot {SNAPSHOT_PATH} ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for name, length in snapshot.get_snapshot().describe():
+        print(f"   {name:<16} {length / 1024:7.1f} KiB")
+    sys.exit(0 if snapshot.get_snapshot().sections else 1)
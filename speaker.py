@@ -1,48 +1,27 @@
-import subprocess
-import os
 import sys
+import tts
+from modelhost import ModelClient
 
 def speak_hindi(text):
-    output_filename = "response.wav"
-    model_path = "hi_IN-pratham-medium.onnx"
-    
-    # --- OS COMPATIBILITY SWITCH ---
-    if sys.platform == "win32":
-        piper_exe = r"piper\piper.exe"
-        play_command = ["start", "/wait", output_filename]
-        is_windows = True
-    else:
-        # Raspberry Pi / Linux path
-        piper_exe = "./piper/piper" 
-        play_command = ["aplay", output_filename]
-        is_windows = False
-
     print(f"⚙️ Sending to Piper ({sys.platform})...")
-    
-    # 1. Pipeline to Executable
-    process = subprocess.Popen(
-        [piper_exe, "-m", model_path, "-f", output_filename],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    
-    # 2. Inject Hindi Text
-    stdout, stderr = process.communicate(input=text.encode('utf-8'))
-    
-    if process.returncode != 0:
-        print("❌ Piper Error:", stderr.decode('utf-8', errors='ignore'))
+
+    # Sentences stream straight from the resident Piper engine into the speaker
+    try:
+        stats = tts.speak(text)
+    except (RuntimeError, OSError) as e:
+        print("❌ Piper Error:", e)
         return
 
-    print("✅ Audio generated!")
-    
-    # 3. Playback Switch
-    if is_windows:
-        os.system(f"start /wait {output_filename}")
-    else:
-        # Standard Linux/Pi wave player
-        subprocess.run(["aplay", output_filename])
+    print(f"✅ Audio played! First audio after {stats['first_audio_ms']:.0f} ms, "
+          f"total {stats['total_ms']:.0f} ms.")
 
 if __name__ == "__main__":
+    # With main.py (or modelhost.py) running, render on its resident voice instead of starting a second piper
+    host = ModelClient.connect("speaker")
+    if host is not None:
+        tts.set_voice(host)
     test_phrase = "नमस्ते, मैं अब रास्पबेरी पाई के लिए तैयार हूँ।"
-    speak_hindi(test_phrase)
\ No newline at end of file
+    speak_hindi(test_phrase)
+    tts.shutdown()
+    if host is not None:
+        host.close()
@@ -0,0 +1,129 @@
+import time
+import hardware
+from intentparser import normalize_text, split_commands, intent_lead
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SPECULATE_MIN_SCORE = 90.0   # Partial must match a registry phrase this well...
+SPECULATE_MIN_LEAD = 15.0    # ...and beat every other intent by this much
+STABLE_PARTIALS = 2          # Consecutive partials that must agree before acting
+
+# Only relay toggles are idempotent and reversible; everything else waits for the final result
+RELAY_INTENTS = {
+    "LIGHT_ON": ("LIGHT", "ON"), "LIGHT_OFF": ("LIGHT", "OFF"),
+    "FAN_ON": ("FAN", "ON"), "FAN_OFF": ("FAN", "OFF"),
+    "AC_ON": ("AC", "ON"),
+}
+
+# ==========================================
+# SPECULATIVE DISPATCH ON PARTIAL RESULTS
+# ==========================================
+class Speculation:
+    """Relay actions already taken for one utterance, the replies they produced and how to undo them."""
+
+    def __init__(self):
+        self.replies = {}
+        self.previous = {}
+        self.started = time.perf_counter()
+
+    def _rollback(self, intent, stats):
+        device, _ = RELAY_INTENTS[intent]
+        hardware.control_appliance(device, self.previous[device])
+        stats.incr("speculation_rollbacks")
+
+    def settle(self, intent_list, stats=STATS):
+        """Reconciles with the final intents: keeps confirmed actions, rolls back the rest.
+
+        Returns {intent: reply} for the actions that need not be executed again.
+        """
+        final = {item["intent"] for item in intent_list}
+        confirmed = {}
+        for intent, reply in self.replies.items():
+            if intent in final:
+                confirmed[intent] = reply
+                stats.incr("speculation_hits")
+            else:
+                self._rollback(intent, stats)
+        return confirmed
+
+    def retain(self, intents, stats=STATS):
+        """Before any final intent runs: rolls back every speculated action outside `intents`.
+
+        Rolling back first means a final command on the same device (partial
+        "बत्ती जलाओ", final "बत्ती बुझाओ") is applied after the undo, not overwritten by it.
+        """
+        for intent in [intent for intent in self.replies if intent not in intents]:
+            del self.replies[intent]
+            self._rollback(intent, stats)
+
+    def claim(self, intent, stats=STATS):
+        """The reply already produced for `intent`, if it was speculated; the action is then kept."""
+        reply = self.replies.pop(intent, None)
+        if reply is not None:
+            stats.incr("speculation_hits")
+        return reply
+
+    def rollback_unclaimed(self, final_intents=(), stats=STATS):
+        """Once every phrase has resolved: undoes the actions no final intent claimed.
+
+        A device that one of `final_intents` switched itself is left as the final command set it.
+        """
+        touched = {RELAY_INTENTS[intent][0] for intent in final_intents if intent in RELAY_INTENTS}
+        for intent in list(self.replies):
+            del self.replies[intent]
+            if RELAY_INTENTS[intent][0] not in touched:
+                self._rollback(intent, stats)
+
+class Speculator:
+    """Watches partial hypotheses and pre-executes relay commands once they are unambiguous and stable.
+
+    on_partial() and take() are called from the recognizer thread only; the
+    Speculation that take() hands over is settled later on a responder thread.
+    `respond` is main.generate_response (it both switches the relay and returns
+    the reply text); `synthesize`, if given, pre-renders that reply.
+    """
+
+    def __init__(self, respond, synthesize=None, stats=STATS):
+        self.respond = respond
+        self.synthesize = synthesize
+        self.stats = stats
+        self.history = []
+        self.current = None
+
+    def on_partial(self, text):
+        guesses = []
+        for phrase in split_commands(normalize_text(text)):
+            intent, score, lead = intent_lead(phrase)
+            if intent not in RELAY_INTENTS or score < SPECULATE_MIN_SCORE or lead < SPECULATE_MIN_LEAD:
+                self.history.clear()
+                return
+            guesses.append((intent, phrase))
+        if not guesses:
+            return
+
+        self.history = (self.history + [tuple(intent for intent, _ in guesses)])[-STABLE_PARTIALS:]
+        if len(self.history) < STABLE_PARTIALS or len(set(self.history)) > 1:
+            return
+
+        if self.current is None:
+            self.current = Speculation()
+        for intent, phrase in guesses:
+            if intent in self.current.replies:
+                continue
+            device, _ = RELAY_INTENTS[intent]
+            self.current.previous.setdefault(device, hardware.get_state(device))
+            reply = self.respond(intent, phrase)
+            self.current.replies[intent] = reply
+            self.stats.incr("speculations")
+            if self.synthesize:
+                self.synthesize(reply)
+
+    def take(self):
+        """Hands over (and forgets) what was speculated for the utterance that just ended."""
+        speculation, self.current = self.current, None
+        self.history.clear()
+        if speculation is not None:
+            self.stats.observe("speculative_lead", time.perf_counter() - speculation.started)
+        return speculation
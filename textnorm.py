@@ -0,0 +1,51 @@
+import re
+import unicodedata
+
+# ==========================================
+# CANONICAL SPELLINGS
+# ==========================================
+# Applied after NFC, which leaves क़ ख़ ग़ ज़ ड़ ढ़ फ़ य़ as base letter + nukta
+CHAR_FOLDS = str.maketrans({
+    "़": None,       # nukta: आवाज़ -> आवाज, बढ़ाओ -> बढाओ
+    "ँ": "ं",   # chandrabindu -> anusvara: पाँच -> पांच
+    "ऩ": "न",   # ऩ -> न
+    "ऱ": "र",   # ऱ -> र
+    "ऴ": "ळ",   # ऴ -> ळ
+})
+
+# Romanized Hindi/English the recognizer or a typed test query may produce
+HINGLISH_WORDS = {
+    "light": "लाइट", "lights": "लाइट्स", "batti": "बत्ती", "bulb": "बल्ब", "fan": "फैन", "pankha": "पंखा",
+    "ac": "एसी", "on": "ऑन", "off": "ऑफ", "band": "बंद", "chalu": "चालू", "chalao": "चलाओ",
+    "jalao": "जलाओ", "bujhao": "बुझाओ", "karo": "करो", "kar": "कर", "do": "दो", "de": "दे",
+    "time": "टाइम", "date": "डेट", "day": "डे", "weather": "वेदर", "temperature": "टेंपरेचर",
+    "alarm": "अलार्म", "reminder": "रिमाइंडर", "set": "सेट", "stop": "स्टॉप", "volume": "वॉल्यूम",
+    "sound": "साउंड", "up": "अप", "down": "डाउन", "full": "फुल", "and": "और", "phir": "फिर", "aur": "और",
+}
+
+PUNCTUATION = re.compile(r"[^\w\sऀ-ॣ०-ॿ]")   # Keeps Devanagari except the dandas
+SPACES = re.compile(r"\s+")
+COMMAND_SEPARATOR = re.compile(r"\s+(?:और|तथा|फिर|and)\s+")
+
+def fold_chars(text):
+    """NFC plus nukta/chandrabindu folding; nothing else about the text changes."""
+    return unicodedata.normalize("NFC", text).translate(CHAR_FOLDS)
+
+HINGLISH_WORDS = {word: fold_chars(target) for word, target in HINGLISH_WORDS.items()}
+
+# ==========================================
+# FRONT-END STAGES
+# ==========================================
+def clean_text(text):
+    """Surface form: NFC, no punctuation, lower case, single spaces. Spellings are left alone
+    (the Vosk grammar has to use words the acoustic model knows)."""
+    text = PUNCTUATION.sub("", unicodedata.normalize("NFC", text))
+    return SPACES.sub(" ", text.lower()).strip()
+
+def normalize_text(text):
+    """Canonical form used for matching: clean_text plus spelling and transliteration folding."""
+    words = clean_text(text).translate(CHAR_FOLDS).split()
+    return " ".join(HINGLISH_WORDS.get(word, word) for word in words)
+
+def split_commands(text):
+    return [part.strip() for part in COMMAND_SEPARATOR.split(text) if part.strip()]
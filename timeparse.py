@@ -0,0 +1,204 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+import snapshot
+from textnorm import fold_chars, CHAR_FOLDS
+
+# ==========================================
+# HINDI TIME VOCABULARY
+# ==========================================
+NUMBER_WORDS = {
+    "शून्य": 0, "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, "छह": 6, "छः": 6, "छे": 6,
+    "सात": 7, "आठ": 8, "नौ": 9, "दस": 10, "ग्यारह": 11, "बारह": 12, "तेरह": 13, "चौदह": 14,
+    "पंद्रह": 15, "पन्द्रह": 15, "सोलह": 16, "सत्रह": 17, "अठारह": 18, "उन्नीस": 19, "बीस": 20,
+    "इक्कीस": 21, "बाईस": 22, "तेईस": 23, "चौबीस": 24, "पच्चीस": 25, "छब्बीस": 26, "सत्ताईस": 27,
+    "अट्ठाईस": 28, "उनतीस": 29, "तीस": 30, "इकतीस": 31, "बत्तीस": 32, "तैंतीस": 33, "चौंतीस": 34,
+    "पैंतीस": 35, "छत्तीस": 36, "सैंतीस": 37, "अड़तीस": 38, "उनतालीस": 39, "चालीस": 40,
+    "इकतालीस": 41, "बयालीस": 42, "तैंतालीस": 43, "चवालीस": 44, "चौवालीस": 44, "पैंतालीस": 45,
+    "छियालीस": 46, "सैंतालीस": 47, "अड़तालीस": 48, "उनचास": 49, "पचास": 50, "इक्यावन": 51,
+    "बावन": 52, "तिरपन": 53, "चौवन": 54, "पचपन": 55, "छप्पन": 56, "सत्तावन": 57, "अट्ठावन": 58,
+    "उनसठ": 59, "साठ": 60, "इकसठ": 61, "बासठ": 62, "तिरसठ": 63, "चौंसठ": 64, "पैंसठ": 65,
+    "छियासठ": 66, "सड़सठ": 67, "अड़सठ": 68, "उनहत्तर": 69, "सत्तर": 70, "इकहत्तर": 71,
+    "बहत्तर": 72, "तिहत्तर": 73, "चौहत्तर": 74, "पचहत्तर": 75, "छिहत्तर": 76, "सतहत्तर": 77,
+    "अठहत्तर": 78, "उन्यासी": 79, "अस्सी": 80, "इक्यासी": 81, "बयासी": 82, "तिरासी": 83,
+    "चौरासी": 84, "पचासी": 85, "छियासी": 86, "सत्तासी": 87, "अट्ठासी": 88, "नवासी": 89,
+    "नब्बे": 90, "इक्यानवे": 91, "बानवे": 92, "तिरानवे": 93, "चौरानवे": 94, "पचानवे": 95,
+    "छियानवे": 96, "सत्तानवे": 97, "अट्ठानवे": 98, "निन्यानवे": 99,
+}
+FRACTION_WORDS = {"आधा": 0.5, "आधे": 0.5, "डेढ़": 1.5, "ढाई": 2.5}
+MODIFIER_WORDS = {"साढ़े": 0.5, "सवा": 0.25, "पौने": -0.25}   # "साढ़े तीन" = 3.5, "पौने चार" = 3.75, "सवा घंटा" = 1.25
+UNIT_WORDS = {"सेकंड": 1, "सेकेंड": 1, "मिनट": 60, "मिनिट": 60, "घंटा": 3600, "घंटे": 3600, "घंटों": 3600}
+DAY_WORDS = {"आज": 0, "कल": 1, "परसों": 2}
+PERIOD_WORDS = {"सुबह": "सुबह", "दोपहर": "दोपहर", "शाम": "शाम", "रात": "रात"}
+CLOCK_WORDS = {"बजे": "बजे", "बज": "बजे", "बजकर": "बजकर"}
+
+# Hour used when a day is named without a clock time
+DEFAULT_HOUR = 10
+PERIOD_DEFAULT_HOURS = {"सुबह": 9, "दोपहर": 13, "शाम": 18, "रात": 21}
+
+# ==========================================
+# PRECOMPILED TOKEN TABLE
+# ==========================================
+# Phrases are whitespace-delimited words, so one dict lookup per token does the
+# job of a multi-pattern automaton: every vocabulary word maps straight to its role.
+# Keys are folded like the intent front-end (साढ़े -> साढे, पाँच -> पांच) so either spelling hits.
+NUM, FRAC, MOD, UNIT, DAY, PERIOD, CLOCK = range(7)
+_TABLES = ((NUM, NUMBER_WORDS), (FRAC, FRACTION_WORDS), (MOD, MODIFIER_WORDS), (UNIT, UNIT_WORDS),
+           (DAY, DAY_WORDS), (PERIOD, PERIOD_WORDS), (CLOCK, CLOCK_WORDS))
+
+def build_token_table():
+    """(TOKEN_TABLE, VOCABULARY): folded word -> (kind, value), and the surface spellings for the Vosk grammar."""
+    table, vocabulary = {}, []
+    for kind, words in _TABLES:
+        for word, value in words.items():
+            table[fold_chars(word)] = (kind, value)
+            vocabulary.append(word)
+    return table, sorted(vocabulary)
+
+TOKEN_TABLE, VOCABULARY = snapshot.cached("time_words", (_TABLES, CHAR_FOLDS), build_token_table)
+
+DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+# Phrases arrive through normalize_text, which drops punctuation, so "7:30" is never seen here
+TOKEN_PATTERN = re.compile(r"(\d+(?:\.\d+)?)|([ऀ-ॣ॰-ॿ]+)")
+
+TimeExpression = namedtuple("TimeExpression", ["seconds", "day_offset", "hour", "minute", "period"])
+
+# ==========================================
+# ONE-PASS PARSER
+# ==========================================
+def parse_time(text):
+    """Durations and clock times in one left-to-right pass over the phrase.
+
+    "डेढ़ घंटा" -> seconds=5400; "कल शाम साढ़े सात बजे" -> day_offset=1, hour=7,
+    minute=30, period="शाम". Durations add up ("एक घंटा दस मिनट"); the first
+    clock time wins. Fields that were not mentioned are None.
+    """
+    seconds = None
+    day_offset = None
+    hour = minute = None
+    period = None
+
+    number = None        # Last number not yet claimed by a unit or बजे
+    modifier = 0.0       # साढ़े / सवा / पौने waiting for its number
+    after_bajkar = False  # "सात बजकर दस मिनट": the next minutes belong to the clock
+
+    for match in TOKEN_PATTERN.finditer(fold_chars(text).translate(DEVANAGARI_DIGITS)):
+        digits, word = match.groups()
+        if digits is not None:
+            kind, value = NUM, float(digits)
+        else:
+            kind, value = TOKEN_TABLE.get(word, (None, None))
+
+        if kind == NUM:
+            number = value + modifier if modifier else value
+            modifier = 0.0
+        elif kind == FRAC:
+            number, modifier = value, 0.0
+        elif kind == MOD:
+            modifier, number = value, None
+        elif kind == UNIT:
+            if number is None and modifier:
+                number = 1 + modifier   # "सवा घंटा" is 1.25 hours, "पौने घंटे" 0.75
+            if number is not None:
+                if after_bajkar and value == 60:
+                    if hour is not None and number < 60:
+                        minute = int(number)
+                else:
+                    seconds = (seconds or 0) + number * value
+            number, modifier, after_bajkar = None, 0.0, False
+        elif kind == CLOCK:
+            if number is not None and hour is None:
+                whole = int(number)
+                fraction = round((number - whole) * 60)
+                if whole == 0 and fraction:
+                    whole = 12   # "पौने एक बजे" is 12:45
+                if 0 <= whole < 24:
+                    hour, minute = whole, fraction
+            after_bajkar = value == "बजकर" and hour is not None
+            number = None
+        elif kind == DAY:
+            if day_offset is None:
+                day_offset = value
+        elif kind == PERIOD:
+            if period is None:
+                period = value
+        else:
+            number, modifier, after_bajkar = None, 0.0, False
+
+    return TimeExpression(seconds, day_offset, hour, minute, period)
+
+def duration_minutes(text):
+    """Duration in minutes (an int when whole), or None if the phrase names no duration. For scheduling;
+    replies use duration_words()."""
+    seconds = parse_time(text).seconds
+    if not seconds:
+        return None
+    minutes = seconds / 60
+    return int(minutes) if minutes.is_integer() else round(minutes, 2)
+
+SPOKEN_UNITS = ("घंटे", "मिनट", "सेकंड")
+
+def spoken_duration(seconds):
+    """Whole hours, minutes and seconds as said in a reply: 4500 -> "1 घंटे 15 मिनट", 75 -> "1 मिनट 15 सेकंड".
+
+    The PCM cache splits replies around digit runs, so a "1.25" would be spoken as "1", ".", "25".
+    """
+    hours, rest = divmod(round(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return " ".join(f"{value} {unit}" for value, unit in zip((hours, minutes, seconds), SPOKEN_UNITS) if value)
+
+def duration_words(text):
+    """spoken_duration() of the phrase's duration, or None if it names none."""
+    seconds = parse_time(text).seconds
+    return spoken_duration(seconds) if seconds else None
+
+def resolve_datetime(expr, now=None):
+    """The next datetime matching a parsed expression (today's time already passed -> tomorrow)."""
+    now = now or datetime.now()
+    target_date = now + timedelta(days=expr.day_offset or 0)
+
+    hour, minute = expr.hour, expr.minute or 0
+    if hour is not None:
+        if hour < 12 and expr.period in ("शाम", "रात", "दोपहर"):
+            hour += 12
+        elif hour == 12 and expr.period == "सुबह":
+            hour = 0
+    else:
+        hour = PERIOD_DEFAULT_HOURS.get(expr.period, DEFAULT_HOUR)
+
+    trigger_time = target_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if trigger_time <= now:
+        trigger_time += timedelta(days=1)
+    return trigger_time
+
+if __name__ == "__main__":
+    # Self-check: python timeparse.py
+    from textnorm import normalize_text
+    CASES = [
+        ("डेढ़ घंटे का अलार्म", 5400, None),
+        ("सवा घंटे का अलार्म", 4500, None),
+        ("साढ़े घंटे बाद याद दिलाना", 5400, None),
+        ("पौने घंटे का टाइमर", 2700, None),
+        ("साढ़े तीन घंटे का टाइमर", 12600, None),
+        ("सवा मिनट", 75, None),
+        ("एक घंटा दस मिनट", 4200, None),
+        ("10 मिनट का अलार्म", 600, None),
+        ("कल शाम साढ़े सात बजे", None, (7, 30)),
+        ("पौने एक बजे", None, (12, 45)),
+        ("सात बजकर दस मिनट पर", None, (7, 10)),
+    ]
+    WORDS = [("सवा मिनट", "1 मिनट 15 सेकंड"), ("सवा घंटे का अलार्म", "1 घंटे 15 मिनट"),
+             ("पौने घंटे", "45 मिनट"), ("डेढ़ घंटे", "1 घंटे 30 मिनट"), ("10 मिनट", "10 मिनट"),
+             ("आधा मिनट", "30 सेकंड"), ("बत्ती जलाओ", None)]
+    failed = 0
+    for phrase, seconds, clock in CASES:
+        expr = parse_time(normalize_text(phrase))
+        got = (expr.seconds, None if expr.hour is None else (expr.hour, expr.minute))
+        ok = got == (seconds, clock)
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {phrase!r}: {got}, expected {(seconds, clock)}")
+    for phrase, words in WORDS:
+        got = duration_words(normalize_text(phrase))
+        failed += got != words
+        print(f"{'✅' if got == words else '❌'} {phrase!r}: {got!r}, expected {words!r}")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,349 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import array
+import wave
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future
+import audiocache
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+PIPER_MODEL = "hi_IN-pratham-medium.onnx"
+PIPER_CONFIG = PIPER_MODEL + ".json"
+
+if sys.platform == "win32":
+    PIPER_EXE = "piper\\piper.exe"
+else:
+    PIPER_EXE = "./piper/piper"
+
+def load_voice_config(config_path=PIPER_CONFIG):
+    """Reads the piper voice config (sample rate etc.) that ships next to the model."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"audio": {"sample_rate": 22050}}
+
+def _scratch_dir():
+    """Piper hands audio back as files, so keep them in RAM (tmpfs) where possible."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="piper_", dir=base)
+
+# ==========================================
+# RESIDENT PIPER ENGINE (VOICE STAYS LOADED)
+# ==========================================
+class PiperEngine:
+    """One long-lived piper process fed line-by-line over stdin.
+
+    The ONNX voice and espeak-ng data are loaded once at start(). Text jobs go
+    through a queue to a single worker thread and come back as raw 16-bit mono
+    PCM frames (bytes) through a Future.
+    """
+
+    def __init__(self, model_path=PIPER_MODEL, piper_exe=PIPER_EXE):
+        self.model_path = model_path
+        self.piper_exe = piper_exe
+        self.config = load_voice_config(model_path + ".json")
+        self.sample_rate = self.config["audio"]["sample_rate"]
+        self.jobs = queue.Queue()
+        self.process = None
+        self.worker = None
+        self.out_dir = None
+
+    def start(self):
+        if self.worker is not None:
+            return self
+        self.out_dir = _scratch_dir()
+        self._spawn()
+        self.worker = threading.Thread(target=self._worker_loop, name="piper-tts", daemon=True)
+        self.worker.start()
+        return self
+
+    def _spawn(self):
+        # In --output_dir mode piper writes one WAV per input line and prints its path
+        self.process = subprocess.Popen(
+            [self.piper_exe, "-m", self.model_path, "--output_dir", self.out_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+
+    def submit(self, text):
+        """Queues text for synthesis. Returns a Future resolving to PCM bytes."""
+        future = Future()
+        self.jobs.put((text, future, STATS.current_trace()))
+        return future
+
+    def synthesize(self, text):
+        return self.submit(text).result()
+
+    def close(self):
+        if self.worker is None:
+            return
+        self.jobs.put(None)
+        self.worker.join(timeout=5)
+        self.worker = None
+        if self.process and self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+
+    def _worker_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            text, future, trace = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with STATS.tracing(trace), STATS.timer("tts_render"):
+                    pcm = self._render(text)
+                future.set_result(pcm)
+            except Exception as e:
+                future.set_exception(e)
+
+    def _render(self, text):
+        # Piper treats every newline as a separate utterance
+        line = " ".join(text.split())
+        if not line:
+            return b""
+
+        if self.process.poll() is not None:
+            print("⚠️ [VOICE] Piper process died, restarting...")
+            self._spawn()
+
+        self.process.stdin.write((line + "\n").encode("utf-8"))
+        self.process.stdin.flush()
+        wav_path = self.process.stdout.readline().decode("utf-8", errors="ignore").strip()
+        if not wav_path:
+            raise RuntimeError("Piper TTS Engine failed to synthesize audio.")
+
+        with wave.open(wav_path, "rb") as wav:
+            frames = wav.readframes(wav.getnframes())
+        os.remove(wav_path)
+        return frames
+
+# ==========================================
+# STREAMING PLAYBACK (NO WAV ROUND-TRIP)
+# ==========================================
+SENTENCE_END = re.compile(r'(?<=[।?!.])\s+')
+
+def split_sentences(text):
+    """Splits a reply on Devanagari/Latin sentence marks so each can play as soon as it is ready."""
+    return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+
+class AudioOutput:
+    """Keeps one PyAudio output stream open and writes raw PCM straight into it."""
+
+    def __init__(self, sample_rate, device_index=None):
+        self.sample_rate = sample_rate
+        self.device_index = device_index
+        self.audio = None
+        self.stream = None
+
+    def write(self, pcm):
+        if self.stream is None:
+            import pyaudio
+            self.audio = pyaudio.PyAudio()
+            self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                                          output=True, output_device_index=self.device_index)
+        self.stream.write(pcm)
+
+    def drain(self):
+        """Waits for the tail still sitting in the device buffer so the mic doesn't hear it."""
+        if self.stream is not None:
+            time.sleep(self.stream.get_output_latency())
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.audio.terminate()
+            self.stream = None
+
+def chime_pcm(sample_rate, tone_ms=70):
+    """Two short rising tones with soft edges: the 'I'm listening' cue for single-stream mode."""
+    samples = array.array("h")
+    tone_len = sample_rate * tone_ms // 1000
+    fade = tone_len // 5
+    for freq in (880, 1320):
+        for i in range(tone_len):
+            envelope = min(1.0, i / fade, (tone_len - i) / fade)
+            samples.append(int(9000 * envelope * math.sin(2 * math.pi * freq * i / sample_rate)))
+    return samples.tobytes()
+
+class NullOutput:
+    """Discards audio (optionally at playback speed) for replay runs without a sound card."""
+
+    def __init__(self, sample_rate=22050, realtime=False):
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+
+    def write(self, pcm):
+        if self.realtime:
+            time.sleep(len(pcm) / 2 / self.sample_rate)
+
+    def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+class SilentVoice:
+    """Stands in for the voice when no piper binary is available; every sentence is empty."""
+    sample_rate = 22050
+
+    def submit(self, text):
+        future = Future()
+        future.set_result(b"")
+        return future
+
+    def synthesize(self, text):
+        return b""
+
+# ==========================================
+# SHARED ENGINE
+# ==========================================
+_engine = None
+_voice = None
+_output = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """Returns the process-wide piper engine, starting it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PiperEngine().start()
+    return _engine
+
+def get_voice():
+    """Returns the shared engine fronted by the on-disk PCM cache."""
+    global _voice
+    if _voice is not None:
+        return _voice
+    engine = get_engine()
+    with _engine_lock:
+        if _voice is None:
+            _voice = audiocache.CachedVoice(engine)
+    return _voice
+
+def get_output():
+    global _output
+    if _output is not None:
+        return _output
+    voice = get_voice()
+    with _engine_lock:
+        if _output is None:
+            _output = AudioOutput(voice.sample_rate)
+    return _output
+
+def engine_pid():
+    """pid of the resident piper process, or None when it is not running."""
+    with _engine_lock:
+        engine = _engine
+    if engine is None or engine.process is None or engine.process.poll() is not None:
+        return None
+    return engine.process.pid
+
+def set_voice(voice):
+    """Overrides what speak() synthesizes with (e.g. SilentVoice for replay runs)."""
+    global _voice
+    with _engine_lock:
+        _voice = voice
+
+def set_output(output):
+    """Overrides where speak() plays to (e.g. NullOutput for replay runs)."""
+    global _output
+    with _engine_lock:
+        _output = output
+
+def speak(text, voice=None, output=None):
+    """Synthesizes sentence by sentence and plays each one while the next is rendering.
+
+    Returns timing stats: time-to-first-audio and total wall time in ms.
+    """
+    voice = voice or get_voice()
+    output = output or get_output()
+    start = time.perf_counter()
+
+    # Queue every sentence up front; the engine worker renders ahead of playback
+    pending = [voice.submit(sentence) for sentence in split_sentences(text)]
+
+    first_audio_ms = None
+    for future in pending:
+        pcm = future.result()
+        if first_audio_ms is None:
+            first_audio_ms = (time.perf_counter() - start) * 1000
+        with STATS.timer("playback"):
+            output.write(pcm)
+    output.drain()
+
+    return {
+        "sentences": len(pending),
+        "first_audio_ms": first_audio_ms or 0.0,
+        "total_ms": (time.perf_counter() - start) * 1000
+    }
+
+def speak_parts(parts, voice=None, output=None):
+    """Like speak(), for a reply still being put together: `parts` are futures of text in speaking order.
+
+    Each part's sentences go to the engine the moment that part resolves, so
+    the first reply plays while later ones are still being computed.
+    """
+    voice = voice or get_voice()
+    output = output or get_output()
+    start = time.perf_counter()
+
+    def render(part, rendered):
+        try:
+            rendered.set_result([voice.submit(sentence) for sentence in split_sentences(part.result())])
+        except Exception as e:
+            rendered.set_exception(e)
+
+    pending = []
+    for part in parts:
+        rendered = Future()
+        part.add_done_callback(lambda part, rendered=rendered: render(part, rendered))
+        pending.append(rendered)
+
+    sentences = 0
+    first_audio_ms = None
+    for rendered in pending:
+        for future in rendered.result():
+            pcm = future.result()
+            if first_audio_ms is None:
+                first_audio_ms = (time.perf_counter() - start) * 1000
+            with STATS.timer("playback"):
+                output.write(pcm)
+            sentences += 1
+    output.drain()
+
+    return {
+        "sentences": sentences,
+        "first_audio_ms": first_audio_ms or 0.0,
+        "total_ms": (time.perf_counter() - start) * 1000
+    }
+
+def shutdown():
+    global _engine, _voice, _output
+    with _engine_lock:
+        _voice = None
+        if _output is not None:
+            _output.close()
+            _output = None
+        if _engine is not None:
+            _engine.close()
+            _engine = None
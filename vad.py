@@ -0,0 +1,92 @@
+from collections import deque
+import numpy as np
+from capture import SAMPLE_RATE
+from metrics import STATS
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+FRAME_MS = 20             # Analysis frame inside each 250 ms chunk
+SPEECH_RATIO = 3.0        # Frame RMS must beat the noise floor by this factor...
+MIN_SPEECH_RMS = 120.0    # ...and this absolute level (int16 units)
+MAX_SPEECH_ZCR = 0.35     # Loud but this "fizzy" is hiss/fan noise, not voice
+MIN_VOICED_FRAMES = 3     # Voiced frames needed in a chunk (~60 ms)
+FLOOR_ADAPT = 0.05        # EMA rate for the noise floor on non-speech chunks
+HANGOVER_CHUNKS = 3       # Keep the gate open this long after the last speech chunk
+PREROLL_CHUNKS = 2        # Chunks replayed on opening so wake-word onsets aren't clipped
+
+# ==========================================
+# ENERGY / ZERO-CROSSING VOICE ACTIVITY GATE
+# ==========================================
+class EnergyVAD:
+    """Cheap vectorized gate in front of the wake recognizer.
+
+    Each chunk is cut into 20 ms frames; a frame is voiced when its RMS is well
+    above an adaptive noise floor and its zero-crossing rate is speech-like.
+    process() returns the chunks to forward (pre-roll + current on opening,
+    nothing while the room is quiet) and sets `closed` on the chunk where the
+    gate shuts so the caller can flush its recognizer.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, stats=STATS):
+        self.frame_len = sample_rate * FRAME_MS // 1000
+        self.stats = stats
+        self.noise_floor = None
+        self.preroll = deque(maxlen=PREROLL_CHUNKS)
+        self.hangover = 0
+        self.open = False
+        self.closed = False
+
+    def is_speech(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        n_frames = len(samples) // self.frame_len
+        if n_frames == 0:
+            return False
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+
+        quiet_level = float(np.percentile(rms, 20))
+        if self.noise_floor is None:
+            self.noise_floor = quiet_level
+
+        threshold = max(self.noise_floor * SPEECH_RATIO, MIN_SPEECH_RMS)
+        voiced = int(np.count_nonzero((rms > threshold) & (zcr < MAX_SPEECH_ZCR)))
+        speech = voiced >= MIN_VOICED_FRAMES
+
+        if not speech:
+            self.noise_floor += FLOOR_ADAPT * (quiet_level - self.noise_floor)
+        return speech
+
+    def process(self, pcm):
+        self.closed = False
+        if self.is_speech(pcm):
+            self.hangover = HANGOVER_CHUNKS
+            if not self.open:
+                self.open = True
+                chunks = list(self.preroll) + [pcm]
+                self.preroll.clear()
+                self.stats.incr("vad_chunks_forwarded", len(chunks))
+                return chunks
+            self.stats.incr("vad_chunks_forwarded")
+            return [pcm]
+
+        if self.open:
+            self.hangover -= 1
+            if self.hangover <= 0:
+                self.open = False
+                self.closed = True
+            self.stats.incr("vad_chunks_forwarded")
+            return [pcm]
+
+        self.preroll.append(pcm)
+        self.stats.incr("vad_chunks_gated")
+        return []
+
+    def reset(self):
+        """Forget open/pre-roll state (the noise floor is kept)."""
+        self.preroll.clear()
+        self.hangover = 0
+        self.open = False
+        self.closed = False